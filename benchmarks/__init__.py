@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# 性能测试与离线压测工具
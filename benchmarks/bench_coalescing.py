@@ -0,0 +1,103 @@
+# benchmarks/bench_coalescing.py
+"""突发消息合并基准测试
+
+AI决策模式下，向同一个群按突发节奏投递未@机器人的消息
+（每次突发若干条、间隔很短，突发之间间隔较长），
+对比不同合并窗口下决策模型的调用次数。
+
+用法::
+
+    python -m benchmarks.bench_coalescing --bursts 5 --burst-size 6 --windows 0 500
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from ncatbot.core import GroupMessageEvent
+
+from benchmarks.bench_concurrency import BOT_USER_ID, MinimalBotAPI, configure_for_benchmark
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+_message_ids = itertools.count(1)
+
+
+def make_plain_event(group_id: str, user_id: str, text: str) -> GroupMessageEvent:
+    """构造一条未@机器人的群消息事件"""
+    return GroupMessageEvent({
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "message_id": next(_message_ids),
+        "self_id": BOT_USER_ID,
+        "time": int(time.time()),
+        "user_id": user_id,
+        "group_id": group_id,
+        "message": [{"type": "text", "data": {"text": text}}],
+        "raw_message": text,
+        "sender": {"user_id": user_id, "nickname": f"用户{user_id}", "card": ""},
+    })
+
+
+async def run(args, group_id: str, window_ms: int) -> tuple:
+    from bot.core.ai_client import AIClient
+    from bot.core.dispatcher import ConversationDispatcher
+    from bot.core.tracker import TargetTracker
+    from bot.handlers.group_handler import GroupMessageHandler
+
+    BotSettings.DECISION_COALESCE_WINDOW_MS = window_ms
+    dispatcher = ConversationDispatcher()
+    tracker = TargetTracker(pending_messages=dispatcher.pending)
+    handler = GroupMessageHandler(AIClient(), tracker)
+    bot_api = MinimalBotAPI()
+
+    start = time.perf_counter()
+    for burst in range(args.bursts):
+        for i in range(args.burst_size):
+            event = make_plain_event(group_id, str(100000 + i), f"第{burst}波第{i}条消息")
+            dispatcher.dispatch(f"group_{group_id}", handler.handle, event, bot_api)
+            await asyncio.sleep(args.gap)
+        await asyncio.sleep(args.burst_gap)
+    await dispatcher.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, tracker.coalescer.stats() if tracker.coalescer else None
+
+
+async def main_async(args):
+    server = StubModelServer(latency=args.latency, reply="NO")
+    base_url = await server.start(port=args.port)
+    group_id = "900000"
+    configure_for_benchmark(base_url, [group_id])
+    BotSettings.DEFAULT_RESPONSE_MODE = "ai_decide"
+    BotSettings.RANDOM_THRESHOLD = 1.0
+    BotSettings.TRIGGER_KEYWORDS = []
+
+    total = args.bursts * args.burst_size
+    print(f"消息数: {total}（{args.bursts} 次突发 × {args.burst_size} 条，间隔 {args.gap}s）")
+    print(f"{'窗口(ms)':>8} {'决策调用':>8} {'节省调用':>8} {'耗时(s)':>8}")
+    try:
+        for window_ms in args.windows:
+            before = server.requests_by_model[BotSettings.DECISION_MODEL]
+            elapsed, stats = await run(args, group_id, window_ms)
+            calls = server.requests_by_model[BotSettings.DECISION_MODEL] - before
+            saved = stats["saved_calls"] if stats else 0
+            print(f"{window_ms:>8} {calls:>8} {saved:>8} {elapsed:>8.2f}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="突发消息合并基准测试")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=6)
+    parser.add_argument("--gap", type=float, default=0.1, help="突发内消息间隔（秒）")
+    parser.add_argument("--burst-gap", type=float, default=1.5, help="突发之间的间隔（秒）")
+    parser.add_argument("--latency", type=float, default=0.2, help="桩服务模拟延迟（秒）")
+    parser.add_argument("--windows", type=int, nargs="+", default=[0, 500])
+    parser.add_argument("--port", type=int, default=8769)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
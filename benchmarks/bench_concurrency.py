@@ -0,0 +1,128 @@
+# benchmarks/bench_concurrency.py
+"""并发处理基准测试
+
+向 ``GroupMessageHandler.handle`` 并发投递 N 条伪造的群消息（每条来自不同的群），
+模型请求由本地桩服务应答，统计不同消息数量下的总耗时。
+模型调用不阻塞事件循环时，总耗时应接近单次模型延迟，而不是随消息数量线性增长。
+
+用法::
+
+    python -m benchmarks.bench_concurrency --latency 0.5 --counts 1 5 10 20 50
+"""
+import argparse
+import asyncio
+import atexit
+import itertools
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from ncatbot.core import GroupMessageEvent
+
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+BOT_USER_ID = "10000"
+_message_ids = itertools.count(1)
+
+
+class _LoginInfo:
+    user_id = BOT_USER_ID
+
+
+class MinimalBotAPI:
+    """仅实现处理器用到的接口，记录发送的消息"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def get_login_info(self):
+        return _LoginInfo()
+
+    async def post_group_array_msg(self, group_id, message):
+        self.sent.append((group_id, message))
+
+
+def make_group_event(group_id: str, user_id: str, text: str) -> GroupMessageEvent:
+    """构造一条@机器人的群消息事件"""
+    return GroupMessageEvent({
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "message_id": next(_message_ids),
+        "self_id": BOT_USER_ID,
+        "time": int(time.time()),
+        "user_id": user_id,
+        "group_id": group_id,
+        "message": [
+            {"type": "at", "data": {"qq": BOT_USER_ID}},
+            {"type": "text", "data": {"text": f" {text}"}},
+        ],
+        "raw_message": f"[CQ:at,qq={BOT_USER_ID}] {text}",
+        "sender": {"user_id": user_id, "nickname": f"用户{user_id}", "card": ""},
+    })
+
+
+def configure_for_benchmark(base_url: str, groups):
+    """关闭延迟、历史记录获取与摘要，只保留模型调用
+
+    对话状态不落盘，长期记忆与图片解读缓存写到进程退出时删除的临时目录，
+    不污染真实的data目录，也不会让下一次运行恢复过时的 response_id。
+    """
+    data_dir = Path(tempfile.mkdtemp(prefix="bionicbot-bench-"))
+    atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+    BotSettings.CONVERSATION_PERSISTENCE_ENABLED = False
+    BotSettings.LONG_TERM_MEMORY_PATH = str(data_dir / "long_term_memory.json")
+    BotSettings.IMAGE_CACHE_PATH = str(data_dir / "image_cache.json")
+    BotSettings.DECISION_LOG_PATH = ""
+    BotSettings.BASE_URL = base_url
+    BotSettings.TARGET_GROUPS = list(groups)
+    BotSettings.DEFAULT_RESPONSE_MODE = "at"
+    BotSettings.BASE_DELAY_SECONDS = 0
+    BotSettings.DELAY_PER_CHARACTER = 0
+    BotSettings.MIN_DELAY_SECONDS = 0
+    BotSettings.ENABLE_HISTORY_RETRIEVAL = False
+    BotSettings.SUMMARY_ENABLED = False
+
+
+async def run_once(handler, bot_api, count: int) -> float:
+    events = [make_group_event(str(900000 + i), str(100000 + i), "你好") for i in range(count)]
+    start = time.perf_counter()
+    await asyncio.gather(*(handler.handle(event, bot_api) for event in events))
+    return time.perf_counter() - start
+
+
+async def main_async(args):
+    server = StubModelServer(latency=args.latency)
+    base_url = await server.start(port=args.port)
+    configure_for_benchmark(base_url, (str(900000 + i) for i in range(max(args.counts))))
+
+    # 在修改配置之后再导入，确保客户端使用桩服务地址
+    from bot.core.ai_client import AIClient
+    from bot.core.tracker import TargetTracker
+    from bot.handlers.group_handler import GroupMessageHandler
+
+    handler = GroupMessageHandler(AIClient(), TargetTracker())
+    bot_api = MinimalBotAPI()
+
+    print(f"{'消息数':>8} {'总耗时(s)':>10} {'串行耗时(s)':>12} {'加速比':>8}")
+    try:
+        for count in args.counts:
+            wall = await run_once(handler, bot_api, count)
+            serial = count * args.latency
+            print(f"{count:>8} {wall:>10.3f} {serial:>12.3f} {serial / wall:>8.1f}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发处理基准测试")
+    parser.add_argument("--latency", type=float, default=0.5, help="桩服务模拟延迟（秒）")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
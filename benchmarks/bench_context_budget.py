@@ -0,0 +1,95 @@
+# benchmarks/bench_context_budget.py
+"""上下文token预算基准测试
+
+构造一个长短消息混杂、带长期记忆的群对话，在没有摘要与有摘要两种情况下，
+分别按原来的固定窗口（系统提示词 + get_messages(limit=10)）和不同的token预算拼装主模型请求的上下文，
+比较估计的token数、发送的消息数与舍弃的部分，并检查拼装结果不超过预算。
+最后测量本地token估计的速度。不访问网络。
+
+用法::
+
+    python -m benchmarks.bench_context_budget --messages 30 --budgets 300 600 1000 4000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from bot.config.settings import BotSettings
+from bot.core.model import Content, Message, ROLE_TYPE
+
+GROUP_KEY = "group_900000"
+
+SHORT_MESSAGES = ["哈哈哈", "确实", "草", "在吗", "+1", "好耶", "?", "晚安"]
+LONG_MESSAGE = "我觉得这个问题要分几方面来看，首先是性能，其次是可维护性，最后还要考虑团队成员的习惯。" * 6
+ENGLISH_MESSAGE = "Has anyone tried the new release? The changelog says startup time improved by about 40 percent."
+
+
+def build_conversation(memory_manager, count: int):
+    for i in range(count):
+        roll = random.random()
+        if roll < 0.15:
+            text = LONG_MESSAGE
+        elif roll < 0.3:
+            text = ENGLISH_MESSAGE
+        else:
+            text = random.choice(SHORT_MESSAGES)
+        role = ROLE_TYPE.ASSIST if i % 4 == 3 else ROLE_TYPE.USER
+        name = BotSettings.BOT_NAME if role == ROLE_TYPE.ASSIST else f"用户{i % 5}"
+        memory_manager.add_message(GROUP_KEY, Message(content=Content(f"{name}[2025-12-19/22:{i % 60:02d}]: {text}"), role=role))
+    for i in range(BotSettings.LONG_TERM_MEMORY_LIMIT):
+        memory_manager.long_term_memory.add_memory("900000", f"第{i}条记忆：用户{i}喜欢在周末打游戏，讨厌早起。")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上下文token预算基准测试")
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[300, 600, 1000, 4000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    from bot.core.context_assembler import estimate_message_tokens
+    from bot.core.memory import LongTermMemory, MemoryManager
+
+    BotSettings.CONVERSATION_PERSISTENCE_ENABLED = False
+    BotSettings.SHORT_TERM_MEMORY_LIMIT = max(BotSettings.SHORT_TERM_MEMORY_LIMIT, args.messages)
+    with tempfile.TemporaryDirectory() as tmp:
+        memory_manager = MemoryManager()
+        memory_manager.long_term_memory = LongTermMemory(storage_path=str(Path(tmp) / "memory.json"))
+        build_conversation(memory_manager, args.messages)
+
+        print(f"对话 {args.messages} 条消息，{BotSettings.LONG_TERM_MEMORY_LIMIT} 条长期记忆")
+        exceeded = 0
+        for with_summary in (False, True):
+            if with_summary:
+                # 摘要覆盖了前三分之二的消息
+                conv = memory_manager.get_conversation(GROUP_KEY)
+                conv.summary = "群友在讨论新版本的性能改进，有人担心兼容性问题，机器人解释了升级步骤。" * 3
+                conv.summary_watermark = conv.message_count - args.messages // 3
+            print(f"[{'有摘要' if with_summary else '无摘要'}]")
+            print(f"{'方式':<10} {'估计token':>10} {'消息数':>6}  组成")
+            # 原来的方式：完整的系统提示词 + get_messages(limit=10)
+            fixed = [memory_manager.build_system_prompt(GROUP_KEY), *memory_manager.get_messages(GROUP_KEY, limit=10)]
+            print(f"{'固定窗口':<10} {sum(map(estimate_message_tokens, fixed)):>10} {len(fixed):>6}")
+            for budget in args.budgets:
+                context, assembler = memory_manager.assemble_context(GROUP_KEY, True, budget)
+                actual = sum(map(estimate_message_tokens, context))
+                exceeded += actual > budget
+                print(f"{f'预算 {budget}':<10} {actual:>10} {len(context):>6}  {assembler.describe()}")
+
+        messages = list(memory_manager.get_conversation(GROUP_KEY).global_messages)
+        rounds = 2000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for message in messages:
+                estimate_message_tokens(message)
+        elapsed = time.perf_counter() - start
+        print(f"token估计: {elapsed / (rounds * len(messages)) * 1e6:.2f}µs/条消息")
+        memory_manager.long_term_memory.close()
+    print("结果: " + ("通过" if not exceeded else f"{exceeded} 个预算被超出"))
+
+
+if __name__ == "__main__":
+    main()
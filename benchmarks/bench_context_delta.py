@@ -0,0 +1,67 @@
+# benchmarks/bench_context_delta.py
+"""response_id 增量上下文基准测试
+
+在同一个群中进行多轮@机器人的对话。
+桩服务按服务端的方式统计 response_id 链的输入token数（链中此前的全部输入与输出加上本次输入），
+对比原来的方式（完整上下文 + previous_response_id）与增量方式每轮的输入token数。
+
+用法::
+
+    python -m benchmarks.bench_context_delta --turns 30
+"""
+import argparse
+import asyncio
+
+from benchmarks.bench_concurrency import MinimalBotAPI, configure_for_benchmark, make_group_event
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+
+async def run(args, group_id: str, server: StubModelServer, delta: bool) -> dict:
+    from bot.core.ai_client import AIClient
+    from bot.core.tracker import TargetTracker
+    from bot.handlers.group_handler import GroupMessageHandler
+
+    BotSettings.CONTEXT_DELTA_ENABLED = delta
+    handler = GroupMessageHandler(AIClient(), TargetTracker())
+    bot_api = MinimalBotAPI()
+    first = len(server.input_tokens)
+    for turn in range(args.turns):
+        await handler.handle(make_group_event(group_id, "100000", f"第{turn}轮的问题：你怎么看这件事"), bot_api)
+    tokens = server.input_tokens[first:]
+    stats = handler.ai_client.context_stats
+    await handler.ai_client.http_client.aclose()
+    return {"tokens": tokens, "stats": stats}
+
+
+async def main_async(args):
+    server = StubModelServer(latency=0.0, reply="我觉得还挺有意思的\n你们怎么看")
+    base_url = await server.start(port=args.port)
+    configure_for_benchmark(base_url, ["900000", "900001"])
+    BotSettings.CONTEXT_DELTA_MAX_TURNS = args.max_turns
+
+    print(f"{args.turns} 轮@机器人的对话；增量链最多 {args.max_turns} 轮后重建")
+    print(f"{'方式':<6} {'总输入token':>12} {'首轮':>8} {'末轮':>8} {'平均发送消息数':>14}")
+    try:
+        for group_id, delta in (("900000", False), ("900001", True)):
+            result = await run(args, group_id, server, delta)
+            tokens, stats = result["tokens"], result["stats"]
+            turns = stats["full_turns"] + stats["delta_turns"]
+            messages = stats["full_messages"] + stats["delta_messages"]
+            print(f"{'增量' if delta else '原方式':<6} {sum(tokens):>12} {tokens[0]:>8} {tokens[-1]:>8} {messages / max(1, turns):>14.1f}")
+            if delta:
+                print(f"    完整请求 {stats['full_turns']} 次，增量请求 {stats['delta_turns']} 次，链失效 {stats['broken_chains']} 次")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="response_id 增量上下文基准测试")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--max-turns", type=int, default=20, help="context_delta_max_turns")
+    parser.add_argument("--port", type=int, default=8773)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_decision_cache.py
+"""回复决策缓存基准测试
+
+AI决策模式下，向同一个群投递一组反复出现的常见消息（问候、复读接龙），
+对比关闭与开启决策缓存时决策模型的调用次数与总耗时，
+并检查机器人被@后的一段时间内不使用缓存。本地预筛与突发合并均关闭。
+
+用法::
+
+    python -m benchmarks.bench_decision_cache --messages 60 --latency 0.1
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.bench_concurrency import configure_for_benchmark
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+PHRASES = ["早上好呀", "早上好呀！", "晚安晚安", "哈哈哈哈哈哈", "哈哈哈哈", "今天好冷啊", "有人打游戏吗", "+1 +1"]
+
+
+async def run(messages, group_id: str, cache_enabled: bool, mention_at: int) -> tuple:
+    from bot.core.ai_client import AIClient
+    from bot.core.tracker import TargetTracker
+
+    BotSettings.DECISION_RESULT_CACHE_ENABLED = cache_enabled
+    ai_client = AIClient()
+    tracker = TargetTracker()
+    user_info = {"user_id": "100000", "nickname": "用户100000", "card": ""}
+
+    start = time.perf_counter()
+    for i, text in enumerate(messages):
+        await tracker.should_respond(
+            message_text=text,
+            is_at=i == mention_at,
+            ai_client=ai_client,
+            user_info=user_info,
+            group_id=group_id
+        )
+    elapsed = time.perf_counter() - start
+    cache = ai_client.decision_cache
+    await ai_client.http_client.aclose()
+    return elapsed, cache.stats() if cache is not None else None
+
+
+async def main_async(args):
+    server = StubModelServer(latency=args.latency, reply="NO")
+    base_url = await server.start(port=args.port)
+    group_id = "900000"
+    configure_for_benchmark(base_url, [group_id])
+    BotSettings.DEFAULT_RESPONSE_MODE = "ai_decide"
+    BotSettings.RANDOM_THRESHOLD = 1.0
+    BotSettings.TRIGGER_KEYWORDS = []
+    BotSettings.DECISION_COALESCE_WINDOW_MS = 0
+    BotSettings.DECISION_PREFILTER_ENABLED = False
+
+    random.seed(args.seed)
+    messages = [random.choice(PHRASES) for _ in range(args.messages)]
+    # 在中途@一次机器人，之后缓存有效期内的消息都应请求决策模型
+    mention_at = args.messages // 2
+
+    print(f"消息数: {args.messages}（{len(PHRASES)} 种常见说法，第 {mention_at} 条@机器人）")
+    print(f"{'决策缓存':>8} {'决策调用':>8} {'命中':>6} {'命中率':>8} {'耗时(s)':>8}")
+    try:
+        for cache_enabled in (False, True):
+            before = server.requests_by_model[BotSettings.DECISION_MODEL]
+            elapsed, stats = await run(messages, group_id, cache_enabled, mention_at)
+            calls = server.requests_by_model[BotSettings.DECISION_MODEL] - before
+            hits = stats["hits"] if stats else 0
+            hit_rate = stats["hit_rate"] if stats else 0.0
+            print(f"{'开启' if cache_enabled else '关闭':>8} {calls:>8} {hits:>6} {hit_rate:>8.1%} {elapsed:>8.2f}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回复决策缓存基准测试")
+    parser.add_argument("--messages", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.1, help="桩服务模拟延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8770)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_image_cache.py
+"""图片解读缓存基准测试
+
+模拟各群反复发送热门表情包：从一组图片中按长尾分布抽取，
+依次调用 ``AIClient.get_image_response``，对比启用与关闭缓存时
+模型调用次数、总耗时，并输出缓存命中率与节省的时间。
+
+用法::
+
+    python -m benchmarks.bench_image_cache --images 200 --pool 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+
+async def run(ai_client, stickers) -> float:
+    start = time.perf_counter()
+    for file_id in stickers:
+        await ai_client.get_image_response(
+            image_url=f"https://example.invalid/{file_id}",
+            image_file=file_id,
+        )
+    return time.perf_counter() - start
+
+
+async def main_async(args):
+    server = StubModelServer(latency=args.latency, reply="一个开心的表情包")
+    base_url = await server.start(port=args.port)
+    BotSettings.BASE_URL = base_url
+
+    from bot.core.ai_client import AIClient
+
+    random.seed(0)
+    pool = [f"{i:032x}.image" for i in range(args.pool)]
+    weights = [1 / (rank + 1) for rank in range(args.pool)]
+    stickers = random.choices(pool, weights=weights, k=args.images)
+
+    try:
+        print(f"图片数: {args.images}, 不同图片: {len(set(stickers))}, 模拟延迟: {args.latency}s")
+        for enabled in (False, True):
+            BotSettings.IMAGE_CACHE_ENABLED = enabled
+            BotSettings.IMAGE_CACHE_PATH = ""
+            ai_client = AIClient()
+            requests_before = server.request_count
+            elapsed = await run(ai_client, stickers)
+            line = f"[缓存{'开启' if enabled else '关闭'}] 模型调用 {server.request_count - requests_before} 次, 总耗时 {elapsed:.2f}s"
+            if ai_client.image_cache is not None:
+                stats = ai_client.image_cache.stats()
+                line += f", 命中率 {stats['hit_rate']:.1%}, 节省 {stats['saved_seconds']:.2f}s"
+            print(line)
+            await ai_client.http_client.aclose()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片解读缓存基准测试")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_keyword_matcher.py
+"""触发关键词匹配基准测试
+
+对比旧实现（逐个关键词判断是否为正则、未预编译地 re.search）与
+KeywordMatcher 在不同关键词数量下每条消息的匹配耗时。
+
+用法::
+
+    python -m benchmarks.bench_keyword_matcher --keywords 10 100 1000
+"""
+import argparse
+import random
+import re
+import time
+
+from bot.core.keyword_matcher import KeywordMatcher
+
+SPECIAL_CHARS = ['^', '$', '*', '+', '?', '.', '(', ')', '[', ']', '{', '}', '|', '\\']
+
+
+def legacy_contains_keyword(text: str, keywords, enable_regex: bool = True) -> bool:
+    """旧实现"""
+    text_lower = text.lower()
+    for keyword in keywords:
+        keyword_lower = keyword.lower()
+        is_regex = any(special_char in keyword for special_char in SPECIAL_CHARS)
+        if enable_regex and is_regex:
+            try:
+                if re.search(keyword, text, re.IGNORECASE):
+                    return True
+            except re.error:
+                if keyword_lower in text_lower:
+                    return True
+        else:
+            if keyword_lower in text_lower:
+                return True
+    return False
+
+
+def make_keywords(count: int, regex_ratio: float):
+    keywords = []
+    for i in range(count):
+        if random.random() < regex_ratio:
+            keywords.append(f"^关键{i}号.*问题$")
+        else:
+            keywords.append(f"Keyword{i}词")
+    return keywords
+
+
+def make_messages(count: int):
+    words = ["今天", "天气", "不错", "有人", "一起", "打游戏", "吗", "哈哈哈", "表情包", "晚饭", "吃什么"]
+    return ["".join(random.choices(words, k=random.randint(3, 20))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="触发关键词匹配基准测试")
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--regex-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    random.seed(0)
+    messages = make_messages(args.messages)
+    print(f"{'关键词数':>8} {'旧实现(us/条)':>14} {'匹配器(us/条)':>14} {'构建(ms)':>10}")
+    for count in args.keywords:
+        keywords = make_keywords(count, args.regex_ratio)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        legacy_hits = sum(legacy_contains_keyword(message, keywords) for message in messages)
+        legacy = (time.perf_counter() - start) / len(messages)
+
+        start = time.perf_counter()
+        hits = sum(matcher.contains(message) for message in messages)
+        compiled = (time.perf_counter() - start) / len(messages)
+
+        assert hits == legacy_hits, f"匹配结果不一致: {hits} != {legacy_hits}"
+        print(f"{count:>8} {legacy * 1e6:>14.1f} {compiled * 1e6:>14.1f} {build * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_long_term_memory.py
+"""长期记忆写入基准测试
+
+在不同规模的存储上测量 ``LongTermMemory.add_memory`` 的平均耗时，
+并与旧实现（每次新增都以 indent=2 重写整个 JSON 文件）对比。
+追加日志实现的耗时应基本不随存储规模增长。
+
+用法::
+
+    python -m benchmarks.bench_long_term_memory --groups 10 100 500 --adds 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bot.core.memory import LongTermMemory
+
+
+def populate(storage_path: str, groups: int, per_group: int):
+    """写入一份包含 groups 个群、每群 per_group 条记忆的快照"""
+    memory = {
+        str(100000 + g): [
+            {"content": f"群{g}的第{i}条记忆", "timestamp": "2025-12-19T22:45:00", "importance": 1.0, "hash": f"{g:04x}{i:04x}"}
+            for i in range(per_group)
+        ]
+        for g in range(groups)
+    }
+    with open(storage_path, "w", encoding="utf-8") as f:
+        json.dump(memory, f, ensure_ascii=False, indent=2)
+
+
+def bench_journal(storage_path: str, adds: int) -> float:
+    ltm = LongTermMemory(storage_path, backend="json")
+    start = time.perf_counter()
+    for i in range(adds):
+        ltm.add_memory(str(100000 + i % 10), f"新的记忆内容 {i}")
+    elapsed = time.perf_counter() - start
+    ltm.close()
+    return elapsed / adds
+
+
+def bench_full_rewrite(storage_path: str, adds: int) -> float:
+    """旧实现：每次新增后重写整个文件"""
+    ltm = LongTermMemory(storage_path, backend="json")
+    start = time.perf_counter()
+    for i in range(adds):
+        memory = ltm.storage.memory
+        memory.setdefault(str(100000 + i % 10), []).append({"content": f"新的记忆内容 {i}", "timestamp": "", "importance": 1.0, "hash": f"x{i}"})
+        with open(storage_path, "w", encoding="utf-8") as f:
+            json.dump(memory, f, ensure_ascii=False, indent=2)
+    elapsed = time.perf_counter() - start
+    ltm.close()
+    return elapsed / adds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长期记忆写入基准测试")
+    parser.add_argument("--groups", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--per-group", type=int, default=100)
+    parser.add_argument("--adds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'群数量':>8} {'记忆总数':>10} {'追加日志(ms)':>14} {'全量重写(ms)':>14}")
+    for groups in args.groups:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "long_term_memory.json")
+            populate(path, groups, args.per_group)
+            journal = bench_journal(path, args.adds)
+
+            populate(path, groups, args.per_group)
+            if os.path.exists(f"{path}.journal"):
+                os.remove(f"{path}.journal")
+            rewrite = bench_full_rewrite(path, args.adds)
+        print(f"{groups:>8} {groups * args.per_group:>10} {journal * 1000:>14.3f} {rewrite * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
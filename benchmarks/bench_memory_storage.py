@@ -0,0 +1,66 @@
+# benchmarks/bench_memory_storage.py
+"""长期记忆存储后端基准测试
+
+生成一份包含大量群的 JSON 长期记忆，分别测量 JSON 后端与 SQLite 后端的
+加载（含首次迁移）、按群查询、去重写入耗时。
+
+用法::
+
+    python -m benchmarks.bench_memory_storage --groups 10000 --per-group 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_long_term_memory import populate
+from bot.core.memory import LongTermMemory
+
+
+def bench_backend(storage_path: str, backend: str, groups: int, queries: int):
+    results = {}
+
+    start = time.perf_counter()
+    ltm = LongTermMemory(storage_path, backend=backend)
+    results["首次加载(s)"] = time.perf_counter() - start
+    ltm.close()
+
+    start = time.perf_counter()
+    ltm = LongTermMemory(storage_path, backend=backend)
+    results["再次加载(s)"] = time.perf_counter() - start
+
+    group_ids = [str(100000 + random.randrange(groups)) for _ in range(queries)]
+    start = time.perf_counter()
+    for group_id in group_ids:
+        ltm.get_memory(group_id, limit=5)
+    results["查询(us/次)"] = (time.perf_counter() - start) / queries * 1e6
+
+    # 一半为重复内容，测试去重路径
+    start = time.perf_counter()
+    for i, group_id in enumerate(group_ids):
+        ltm.add_memory(group_id, f"基准测试记忆 {i // 2}")
+    results["写入(us/次)"] = (time.perf_counter() - start) / queries * 1e6
+
+    ltm.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长期记忆存储后端基准测试")
+    parser.add_argument("--groups", type=int, default=10000)
+    parser.add_argument("--per-group", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"群数量: {args.groups}, 每群记忆: {args.per_group}")
+    for backend in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "long_term_memory.json")
+            populate(path, args.groups, args.per_group)
+            results = bench_backend(path, backend, args.groups, args.queries)
+        print(f"[{backend}] " + ", ".join(f"{name}={value:.3f}" for name, value in results.items()))
+
+
+if __name__ == "__main__":
+    main()
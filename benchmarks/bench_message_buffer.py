@@ -0,0 +1,78 @@
+# benchmarks/bench_message_buffer.py
+"""短期记忆消息存储微基准测试
+
+对比旧实现（列表追加 + 超限时重新切片，读取时 copy）与 MessageBuffer
+（环形缓冲区追加 + 窗口视图）的写入与读取吞吐。
+
+用法::
+
+    python -m benchmarks.bench_message_buffer --limit 30 --get-limit 10 30 --ops 200000
+"""
+import argparse
+import time
+
+from bot.core.message_buffer import MessageBuffer
+from bot.core.model import Content, Message
+
+
+class ListStore:
+    """旧实现"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.messages = []
+
+    def add(self, message: Message):
+        self.messages.append(message)
+        if len(self.messages) > self.limit:
+            self.messages = self.messages[-self.limit:]
+
+    def get(self, limit: int):
+        if limit and len(self.messages) > limit:
+            return self.messages[-limit:]
+        return self.messages.copy()
+
+
+class BufferStore:
+    def __init__(self, limit: int):
+        self.messages = MessageBuffer(limit)
+
+    def add(self, message: Message):
+        self.messages.append(message)
+
+    def get(self, limit: int):
+        return self.messages.window(limit)
+
+
+def bench(store, ops: int, get_limit: int):
+    messages = [Message(Content(f"用户[2025-12-19/22:45]: 消息{i}")) for i in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(ops):
+        store.add(messages[i % 1000])
+    add_rate = ops / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        for _ in store.get(get_limit):
+            pass
+    get_rate = ops / (time.perf_counter() - start)
+    return add_rate, get_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="短期记忆消息存储微基准测试")
+    parser.add_argument("--limit", type=int, default=30, help="短期记忆消息上限")
+    parser.add_argument("--get-limit", type=int, nargs="+", default=[10, 30], help="每次读取的消息数")
+    parser.add_argument("--ops", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'实现':<14} {'读取条数':>8} {'写入(次/秒)':>14} {'读取(次/秒)':>14}")
+    for get_limit in args.get_limit:
+        for name, store in (("list", ListStore(args.limit)), ("MessageBuffer", BufferStore(args.limit))):
+            add_rate, get_rate = bench(store, args.ops, get_limit)
+            print(f"{name:<14} {get_limit:>8} {add_rate:>14,.0f} {get_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
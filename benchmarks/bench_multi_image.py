@@ -0,0 +1,105 @@
+# benchmarks/bench_multi_image.py
+"""多图消息解读基准测试
+
+向 ``GroupMessageHandler.handle`` 投递一条包含 N 张图片的群消息，
+在不同的单消息并发上限下测量解读全部图片的耗时，并检查解读结果
+按图片顺序存入上下文。桩服务按请求中的图片地址返回不同内容，
+并随机抖动延迟。
+
+用法::
+
+    python -m benchmarks.bench_multi_image --images 9 --latency 0.5 --limits 1 3 9
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+from ncatbot.core import GroupMessageEvent
+
+from benchmarks.bench_concurrency import BOT_USER_ID, MinimalBotAPI, configure_for_benchmark
+from benchmarks.stub_server import StubModelServer, build_response
+from bot.config.settings import BotSettings
+
+
+class ImageEchoServer(StubModelServer):
+    """以图片地址作为解读内容返回的桩服务，延迟随机抖动使完成顺序与请求顺序不同"""
+
+    async def _handle_responses(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.request_count += 1
+        image_url = next(
+            (part["image_url"] for item in payload.get("input", []) for part in item.get("content", [])
+             if isinstance(part, dict) and part.get("type") == "input_image"),
+            "",
+        )
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        return web.json_response(build_response(image_url, payload.get("model", "stub")))
+
+
+def make_image_event(group_id: str, user_id: str, count: int, round_id: int) -> GroupMessageEvent:
+    images = [
+        {"type": "image", "data": {"file": f"r{round_id}_{i}.image", "url": f"https://example.invalid/r{round_id}/{i}"}}
+        for i in range(count)
+    ]
+    return GroupMessageEvent({
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "message_id": round_id,
+        "self_id": BOT_USER_ID,
+        "time": int(time.time()),
+        "user_id": user_id,
+        "group_id": group_id,
+        "message": images,
+        "raw_message": "".join(f"[CQ:image,file={image['data']['file']}]" for image in images),
+        "sender": {"user_id": user_id, "nickname": f"用户{user_id}", "card": ""},
+    })
+
+
+async def main_async(args):
+    server = ImageEchoServer(latency=args.latency)
+    base_url = await server.start(port=args.port)
+    group_id = "900000"
+    configure_for_benchmark(base_url, [group_id])
+    BotSettings.IMAGE_INTERPRETATION_PROBABILITY = 1.0
+    BotSettings.IMAGE_CACHE_ENABLED = False
+    BotSettings.IMAGE_MAX_CONCURRENCY = max(args.limits)
+
+    from bot.core.ai_client import AIClient
+    from bot.core.tracker import TargetTracker
+    from bot.handlers.group_handler import GroupMessageHandler
+
+    handler = GroupMessageHandler(AIClient(), TargetTracker())
+    bot_api = MinimalBotAPI()
+    memory_manager = handler.ai_client.memory_manager
+
+    print(f"{'单消息并发':>10} {'耗时(s)':>10} {'串行耗时(s)':>12} {'顺序正确':>8}")
+    try:
+        for round_id, limit in enumerate(args.limits, 1):
+            BotSettings.IMAGE_MAX_CONCURRENCY_PER_MESSAGE = limit
+            event = make_image_event(group_id, "100000", args.images, round_id)
+            start = time.perf_counter()
+            await handler.handle(event, bot_api)
+            elapsed = time.perf_counter() - start
+
+            stored = list(memory_manager.get_messages(f"group_{group_id}", limit=args.images))
+            expected = [f"https://example.invalid/r{round_id}/{i}" for i in range(args.images)]
+            in_order = [message.content.msg.rsplit("：", 1)[-1] for message in stored] == expected
+            print(f"{limit:>10} {elapsed:>10.3f} {args.images * args.latency:>12.3f} {str(in_order):>8}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多图消息解读基准测试")
+    parser.add_argument("--images", type=int, default=9)
+    parser.add_argument("--latency", type=float, default=0.5, help="桩服务模拟延迟（秒）")
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 3, 9], help="单消息并发上限")
+    parser.add_argument("--port", type=int, default=8767)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# benchmarks/bench_replay.py
+"""端到端消息流重放基准测试
+
+按 BionicBot 的方式组装分发器、追踪器、群聊/私聊处理器与 AIClient，BotAPI 换成进程内的
+``FakeBotAPI``，模型请求由本地桩服务应答。按时间重放合成的或保存的群聊消息流，统计：
+
+- 吞吐：处理的消息数 / 处理完全部消息的耗时；
+- 处理延迟：消息到达到处理器返回（含信箱排队）；
+- 决策到发送：回复决策通过到发出第一条消息，以及消息到达到发出第一条消息；
+- 内存增长：进程常驻内存（RSS）的初值、峰值与终值，以及记忆中保存的对话与消息数；
+- 阶段耗时：``bot.core.metrics`` 记录的各处理阶段的次数、总耗时与 p50/p95。
+
+用法::
+
+    python -m benchmarks.bench_replay --groups 20 --rate 30 --duration 20 --image-ratio 0.1 --at-ratio 0.1
+    python -m benchmarks.bench_replay --trace trace.jsonl --speed 10
+    python -m benchmarks.bench_replay --groups 5 --rate 10 --duration 60 --save-trace trace.jsonl
+"""
+import argparse
+import asyncio
+import bisect
+import resource
+import time
+from collections import defaultdict
+
+from benchmarks.bench_concurrency import configure_for_benchmark
+from benchmarks.fake_napcat import FakeBotAPI, load_trace, save_trace, synthetic_trace
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+
+def rss_mb() -> float:
+    """当前进程的常驻内存（MB），无法读取时返回历史峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"count": len(values), "mean": sum(values) / len(values), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": values[-1]}
+
+
+async def replay(trace, speed: float = 1.0, api_latency: float = 0.0) -> dict:
+    """重放消息流并返回统计结果，调用前需已配置好 BotSettings（目标群、模型地址等）"""
+    from bot.core.ai_client import AIClient
+    from bot.core.dispatcher import ConversationDispatcher
+    from bot.core.metrics import metrics
+    from bot.core.tracker import TargetTracker
+    from bot.handlers.group_handler import GroupMessageHandler
+    from bot.handlers.private_handler import PrivateMessageHandler
+
+    metrics.reset()
+    ai_client = AIClient()
+    dispatcher = ConversationDispatcher(BotSettings.MAX_CONCURRENT_CONVERSATIONS)
+    tracker = TargetTracker(pending_messages=dispatcher.pending)
+    group_handler = GroupMessageHandler(ai_client, tracker)
+    private_handler = PrivateMessageHandler(ai_client, tracker)
+    bot_api = FakeBotAPI(api_latency=api_latency)
+
+    # 正在处理的消息的到达时间，以及每次回复决策的 (对话键, 到达时间, 决策时间)
+    arrivals = {}
+    decisions = []
+    original_should_respond = tracker.should_respond
+
+    async def should_respond(*args, **kwargs):
+        decision = await original_should_respond(*args, **kwargs)
+        if decision:
+            group_id = kwargs.get("group_id")
+            key = f"group_{group_id}" if group_id else f"user_{kwargs['user_info']['user_id']}"
+            decisions.append((key, arrivals.get(key), time.perf_counter()))
+        return decision
+
+    tracker.should_respond = should_respond
+
+    async def handle(handler, key, event, arrived):
+        arrivals[key] = arrived
+        return await handler.handle(event, bot_api)
+
+    memory = {"start": rss_mb()}
+    memory["peak"] = memory["start"]
+    max_queue_depth = 0
+    handler_latencies = []
+
+    def sample():
+        nonlocal max_queue_depth
+        memory["peak"] = max(memory["peak"], rss_mb())
+        max_queue_depth = max(max_queue_depth, dispatcher.queue_depth)
+
+    start = time.perf_counter()
+    futures = []
+    for item in trace:
+        delay = start + item.t / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sample()
+        event = item.to_event(bot_api.bot_user_id)
+        bot_api.remember(item.key, event)
+        handler = group_handler if item.group_id else private_handler
+        arrived = time.perf_counter()
+        future = dispatcher.dispatch(item.key, handle, handler, item.key, event, arrived)
+        future.add_done_callback(lambda _, arrived=arrived: handler_latencies.append(time.perf_counter() - arrived))
+        futures.append(future)
+
+    while dispatcher.active_conversations:
+        sample()
+        await asyncio.sleep(0.1)
+    await dispatcher.join()
+    elapsed = time.perf_counter() - start
+    sample()
+    memory["end"] = rss_mb()
+
+    # 每次回复决策之后该对话发出的第一条消息
+    sends = defaultdict(list)
+    for message in bot_api.sent:
+        sends[message.key].append(message.sent_at)
+    decision_to_send, arrival_to_send = [], []
+    for key, arrived, decided in decisions:
+        index = bisect.bisect_left(sends[key], decided)
+        if index < len(sends[key]):
+            decision_to_send.append(sends[key][index] - decided)
+            if arrived is not None:
+                arrival_to_send.append(sends[key][index] - arrived)
+
+    conversations = ai_client.memory_manager.conversations
+    await ai_client.http_client.aclose()
+    return {
+        "events": len(trace),
+        "elapsed": elapsed,
+        "throughput": len(trace) / elapsed if elapsed else 0.0,
+        "handled": sum(1 for future in futures if future.result()),
+        "replies": len(decisions),
+        "sent_messages": len(bot_api.sent),
+        "bot_api_calls": dict(bot_api.calls),
+        "handler_latency": percentiles(handler_latencies),
+        "decision_to_send": percentiles(decision_to_send),
+        "arrival_to_send": percentiles(arrival_to_send),
+        "max_queue_depth": max_queue_depth,
+        "memory_mb": memory,
+        "conversations": len(conversations),
+        "stored_messages": sum(len(conv.global_messages) for conv in conversations.values()),
+        "stages": metrics.stage_summary(),
+    }
+
+
+def print_results(results: dict, server_stats: dict):
+    print(f"消息 {results['events']} 条，耗时 {results['elapsed']:.2f}s，吞吐 {results['throughput']:.1f} 条/秒，"
+          f"处理器返回True {results['handled']} 条，信箱最大积压 {results['max_queue_depth']}")
+    print(f"回复 {results['replies']} 次，发出 {results['sent_messages']} 条消息；"
+          f"模型请求 {server_stats['requests']} 次 {server_stats['by_role']}")
+    print(f"{'延迟(s)':<12} {'次数':>6} {'平均':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'最大':>8}")
+    for name, label in (("handler_latency", "到达→处理完"), ("decision_to_send", "决策→发送"), ("arrival_to_send", "到达→发送")):
+        stats = results[name]
+        if not stats["count"]:
+            print(f"{label:<12} {0:>6}")
+            continue
+        print(f"{label:<12} {stats['count']:>6} {stats['mean']:>8.3f} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['p99']:>8.3f} {stats['max']:>8.3f}")
+    memory = results["memory_mb"]
+    print(f"内存(MB): 开始 {memory['start']:.1f}，峰值 {memory['peak']:.1f}，结束 {memory['end']:.1f}（增长 {memory['end'] - memory['start']:+.1f}）；"
+          f"记忆中 {results['conversations']} 个对话，{results['stored_messages']} 条消息")
+    print(f"{'阶段':<22} {'次数':>6} {'总耗时(s)':>10} {'平均(ms)':>9} {'p50(ms)':>9} {'p95(ms)':>9}")
+    for stage, stats in sorted(results["stages"].items(), key=lambda item: -item[1]["sum"]):
+        print(f"{stage:<22} {stats['count']:>6} {stats['sum']:>10.3f} {stats['mean'] * 1000:>9.2f} {stats['p50'] * 1000:>9.2f} {stats['p95'] * 1000:>9.2f}")
+
+
+async def main_async(args):
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.groups, args.rate, args.duration, args.image_ratio, args.at_ratio, seed=args.seed)
+    if args.save_trace:
+        save_trace(trace, args.save_trace)
+    if not trace:
+        print("消息流为空")
+        return
+
+    server = StubModelServer(latency=args.latency, role_latency={"decision": args.decision_latency}, yes_rate=args.yes_rate, seed=args.seed)
+    base_url = await server.start(port=args.port)
+    configure_for_benchmark(base_url, sorted({item.group_id for item in trace if item.group_id}))
+    BotSettings.TARGET_USERS = sorted({item.user_id for item in trace if not item.group_id})
+    BotSettings.DEFAULT_RESPONSE_MODE = args.mode
+
+    duration = trace[-1].t
+    print(f"重放 {len(trace)} 条消息，{len({item.key for item in trace})} 个对话，时长 {duration:.1f}s（{args.speed:g} 倍速），"
+          f"回复模式 {args.mode}，模型延迟 {args.latency}，决策延迟 {args.decision_latency}")
+    try:
+        results = await replay(trace, args.speed, args.api_latency)
+    finally:
+        await server.stop()
+    print_results(results, server.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端消息流重放基准测试")
+    parser.add_argument("--trace", help="重放的 JSONL 消息流文件（或决策日志），不指定则生成合成消息流")
+    parser.add_argument("--save-trace", help="把本次重放的消息流保存到该文件")
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=30, help="所有群合计的消息速率（条/秒）")
+    parser.add_argument("--duration", type=float, default=20, help="合成消息流的时长（秒）")
+    parser.add_argument("--image-ratio", type=float, default=0.1)
+    parser.add_argument("--at-ratio", type=float, default=0.1)
+    parser.add_argument("--speed", type=float, default=1.0, help="重放倍速")
+    parser.add_argument("--mode", default="ai_decide", help="回复模式")
+    parser.add_argument("--latency", default="lognormal:0.3,0.4", help="模型延迟分布，见 stub_server.LatencyDistribution")
+    parser.add_argument("--decision-latency", default="uniform:0.05,0.15", help="决策请求的延迟分布")
+    parser.add_argument("--yes-rate", type=float, default=0.3, help="决策模型返回 YES 的比例")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="BotAPI 每次调用的模拟延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8774)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_resilience.py
+"""模型调用重试、超时与熔断测试
+
+用注入故障的桩服务依次验证：
+1. 偶发 503 时，重试把决策调用的成功率恢复到接近 100%；
+2. 请求挂起时，单次时限让调用在预算内返回，而不是一直占住处理协程；
+3. 服务持续不可用时，熔断器打开后调用快速失败，不再打到服务端；
+4. 熔断时间过后放行探测请求，服务恢复时熔断器关闭。
+
+每一项都会打印是否符合预期，全部通过时退出码为0。
+
+用法::
+
+    python -m benchmarks.bench_resilience --calls 50 --error-rate 0.3
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks.bench_concurrency import configure_for_benchmark
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+USER_INFO = {"user_id": "100000", "nickname": "用户100000", "card": ""}
+
+
+async def decide(ai_client, text: str) -> tuple:
+    start = time.perf_counter()
+    decision = await ai_client.should_respond(message=text, user_info=USER_INFO, group_id="900000")
+    return decision, time.perf_counter() - start
+
+
+async def check_transient_errors(args, server) -> bool:
+    from bot.core.ai_client import AIClient
+
+    print(f"[1] 偶发错误：{args.error_rate:.0%} 的请求返回 503，{args.calls} 次决策调用")
+    server.error_rate = args.error_rate
+    results = {}
+    for max_retries in (0, 3):
+        BotSettings.MODEL_CALL_POLICIES = {"decision": {"timeout": 2, "max_retries": max_retries, "deadline": 10}}
+        ai_client = AIClient()
+        succeeded = 0
+        for i in range(args.calls):
+            decision, _ = await decide(ai_client, f"重试测试{max_retries}-{i}")
+            succeeded += decision
+        results[max_retries] = succeeded / args.calls
+        print(f"    最多重试 {max_retries} 次: 成功率 {results[max_retries]:.0%}, 重试 {ai_client.caller.counters['retries']} 次")
+        await ai_client.http_client.aclose()
+    server.error_rate = 0.0
+    return results[3] >= 0.95 and results[3] > results[0]
+
+
+async def check_hang(args, server) -> bool:
+    from bot.core.ai_client import AIClient
+
+    print("[2] 请求挂起：单次时限 0.5s，最多重试 1 次，总时限 1.2s")
+    BotSettings.MODEL_CALL_POLICIES = {"decision": {"timeout": 0.5, "max_retries": 1, "deadline": 1.2}}
+    server.hang_rate = 1.0
+    ai_client = AIClient()
+    decision, elapsed = await decide(ai_client, "挂起测试")
+    server.hang_rate = 0.0
+    print(f"    返回 {decision}，耗时 {elapsed:.2f}s，超时 {ai_client.caller.counters['timeouts']} 次")
+    await ai_client.http_client.aclose()
+    return decision is False and elapsed < 1.5
+
+
+async def check_breaker(args, server) -> bool:
+    from bot.core.ai_client import AIClient
+
+    BotSettings.MODEL_CALL_POLICIES = {"decision": {"timeout": 2, "max_retries": 0, "deadline": 5}}
+    BotSettings.CIRCUIT_BREAKER_THRESHOLD = 5
+    BotSettings.CIRCUIT_BREAKER_RESET_SECONDS = args.reset
+    ai_client = AIClient()
+    breaker = ai_client.caller.breaker(BotSettings.DECISION_MODEL)
+
+    print(f"[3] 持续不可用：所有请求返回 503，{args.calls} 次决策调用，连续失败 5 次熔断")
+    server.error_rate = 1.0
+    before = server.request_count
+    latencies = []
+    for i in range(args.calls):
+        _, elapsed = await decide(ai_client, f"熔断测试{i}")
+        latencies.append(elapsed)
+    reached = server.request_count - before
+    fast = latencies[5:]
+    print(f"    打到服务端 {reached} 次，快速失败 {ai_client.caller.counters['short_circuits']} 次，"
+          f"熔断后平均耗时 {sum(fast) / max(1, len(fast)) * 1000:.1f}ms，熔断器状态 {breaker.state}")
+    opened = reached == 5 and breaker.state == breaker.OPEN
+
+    print(f"[4] 恢复：服务恢复正常，等待 {args.reset}s 后放行探测请求")
+    server.error_rate = 0.0
+    await asyncio.sleep(args.reset)
+    decision, _ = await decide(ai_client, "恢复测试")
+    print(f"    探测请求返回 {decision}，熔断器状态 {breaker.state}")
+    await ai_client.http_client.aclose()
+    return opened, decision is True and breaker.state == breaker.CLOSED
+
+
+async def main_async(args) -> bool:
+    server = StubModelServer(latency=args.latency, reply="YES")
+    base_url = await server.start(port=args.port)
+    configure_for_benchmark(base_url, ["900000"])
+    BotSettings.DECISION_RESULT_CACHE_ENABLED = False
+    BotSettings.RETRY_BASE_DELAY = 0.05
+    BotSettings.RETRY_MAX_DELAY = 0.5
+    try:
+        results = [await check_transient_errors(args, server), await check_hang(args, server)]
+        results.extend(await check_breaker(args, server))
+    finally:
+        await server.stop()
+    print("结果: " + " ".join(f"[{i}]{'通过' if ok else '失败'}" for i, ok in enumerate(results, 1)))
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型调用重试、超时与熔断测试")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.3, help="偶发错误的比例")
+    parser.add_argument("--latency", type=float, default=0.02, help="桩服务模拟延迟（秒）")
+    parser.add_argument("--reset", type=float, default=1.0, help="熔断持续时间（秒）")
+    parser.add_argument("--port", type=int, default=8771)
+    sys.exit(0 if asyncio.run(main_async(parser.parse_args())) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_routing.py
+"""模型后备与延迟路由基准测试
+
+桩服务按请求中的模型名模拟不同的延迟与故障，依次测试决策调用的三种路由：
+1. 后备：主模型持续返回 503 时改用后备模型，决策仍然成功；
+2. 延迟路由：同一档的两个模型延迟不同，较快的模型第一次请求很慢（冷连接），
+   过时的估计被重新探测后，请求集中到较快的模型；
+3. 对冲：主模型偶尔很慢，超过阈值后并发请求后备模型，比较开启前后的尾延迟。
+
+每一项都会打印是否符合预期，全部通过时退出码为0。
+
+用法::
+
+    python -m benchmarks.bench_routing --calls 40
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.bench_concurrency import configure_for_benchmark
+from benchmarks.stub_server import StubModelServer, build_response
+from bot.config.settings import BotSettings
+
+USER_INFO = {"user_id": "100000", "nickname": "用户100000", "card": ""}
+
+
+class MultiModelServer(StubModelServer):
+    """按模型名模拟延迟与故障的桩服务"""
+
+    def __init__(self, reply: str = "YES"):
+        super().__init__(latency=0.0, reply=reply)
+        # 模型名 -> (正常延迟, 慢请求比例, 慢请求延迟, 是否故障)
+        self.profiles = {}
+        # 模型名 -> 该模型第一次请求的延迟，模拟冷连接
+        self.cold_latency = {}
+
+    async def _handle_responses(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        model = payload.get("model", "stub")
+        self.request_count += 1
+        self.requests_by_model[model] += 1
+        latency, slow_rate, slow_latency, failing = self.profiles.get(model, (0.05, 0.0, 0.0, False))
+        if failing:
+            return web.json_response({"error": {"code": "StubInjectedError", "message": "模型不可用"}}, status=503)
+        if self.requests_by_model[model] == 1 and model in self.cold_latency:
+            latency = self.cold_latency[model]
+        elif random.random() < slow_rate:
+            latency = slow_latency
+        await asyncio.sleep(latency)
+        return web.json_response(build_response(self.reply, model))
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_calls(args, tag: str) -> tuple:
+    from bot.core.ai_client import AIClient
+
+    ai_client = AIClient()
+    latencies, succeeded = [], 0
+    for i in range(args.calls):
+        start = time.perf_counter()
+        succeeded += await ai_client.should_respond(message=f"{tag}{i}", user_info=USER_INFO, group_id="900000")
+        latencies.append(time.perf_counter() - start)
+    await ai_client.http_client.aclose()
+    return ai_client.router, latencies, succeeded
+
+
+async def main_async(args) -> bool:
+    random.seed(args.seed)
+    server = MultiModelServer()
+    base_url = await server.start(port=args.port)
+    configure_for_benchmark(base_url, ["900000"])
+    BotSettings.DECISION_RESULT_CACHE_ENABLED = False
+    BotSettings.DECISION_MODEL = "model-a"
+    BotSettings.MODEL_CALL_POLICIES = {"decision": {"timeout": 5, "max_retries": 0, "deadline": 10}}
+    BotSettings.LATENCY_PROBE_SECONDS = args.probe_seconds
+    results = []
+    try:
+        print("[1] 后备：model-a 持续返回 503，后备 model-b")
+        server.profiles = {"model-a": (0.05, 0, 0, True), "model-b": (0.05, 0, 0, False)}
+        BotSettings.MODEL_FALLBACKS = {"decision": ["model-b"]}
+        BotSettings.MODEL_HEDGE_MS = {}
+        server.requests_by_model = Counter()
+        router, _, succeeded = await run_calls(args, "后备")
+        print(f"    成功 {succeeded}/{args.calls}，换用后备 {router.fallbacks} 次，"
+              f"请求分布 {dict(server.requests_by_model)}（熔断后 model-a 不再被请求）")
+        results.append(succeeded == args.calls and server.requests_by_model["model-a"] <= BotSettings.CIRCUIT_BREAKER_THRESHOLD)
+
+        print(f"[2] 延迟路由：model-a 与 model-b 同档，延迟分别为 0.20s 与 0.05s，model-b 第一次请求需要 0.5s，"
+              f"估计 {args.probe_seconds}s 未更新时重新探测")
+        server.profiles = {"model-a": (0.20, 0, 0, False), "model-b": (0.05, 0, 0, False)}
+        server.cold_latency = {"model-b": 0.5}
+        BotSettings.MODEL_FALLBACKS = {"decision": [["model-a", "model-b"]]}
+        server.requests_by_model = Counter()
+        router, latencies, _ = await run_calls(args, "路由")
+        server.cold_latency = {}
+        share = server.requests_by_model["model-b"] / args.calls
+        print(f"    请求分布 {dict(server.requests_by_model)}（model-b 占 {share:.0%}），平均耗时 {sum(latencies) / len(latencies):.3f}s，"
+              f"p50 估计 a={router.tracker('model-a').p50:.3f}s b={router.tracker('model-b').p50:.3f}s")
+        results.append(share >= 0.7)
+
+        print(f"[3] 对冲：model-a 有 {args.slow_rate:.0%} 的请求需要 1s，其余 0.05s；后备 model-b 稳定 0.05s")
+        server.profiles = {"model-a": (0.05, args.slow_rate, 1.0, False), "model-b": (0.05, 0, 0, False)}
+        BotSettings.MODEL_FALLBACKS = {"decision": ["model-b"]}
+        print(f"    {'对冲阈值':>8} {'p50(s)':>8} {'p95(s)':>8} {'最大(s)':>8} {'对冲次数':>8}")
+        tails = []
+        for hedge_ms in (0, args.hedge_ms):
+            BotSettings.MODEL_HEDGE_MS = {"decision": hedge_ms} if hedge_ms else {}
+            router, latencies, _ = await run_calls(args, f"对冲{hedge_ms}")
+            print(f"    {hedge_ms:>8} {percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.95):>8.3f} "
+                  f"{max(latencies):>8.3f} {router.hedges:>8}")
+            tails.append(percentile(latencies, 0.95))
+        results.append(tails[1] < tails[0])
+    finally:
+        await server.stop()
+    print("结果: " + " ".join(f"[{i}]{'通过' if ok else '失败'}" for i, ok in enumerate(results, 1)))
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型后备与延迟路由基准测试")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--slow-rate", type=float, default=0.15, help="对冲测试中主模型慢请求的比例")
+    parser.add_argument("--hedge-ms", type=int, default=200, help="对冲阈值（毫秒）")
+    parser.add_argument("--probe-seconds", type=float, default=1.0, help="延迟估计过时后重新探测的间隔（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8772)
+    sys.exit(0 if asyncio.run(main_async(parser.parse_args())) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_scheduler.py
+"""模型请求调度基准测试
+
+同一个模型限速为 rpm 次每分钟，同时到达一批请求：先到的是大量后台摘要与图片解读，
+随后是回复决策与@回复。对比先来先服务（所有请求同一优先级、不丢弃）
+与按优先级调度并丢弃低优先级请求时，各类请求的平均排队时间与丢弃数量。
+只测试准入控制，请求本身不访问网络。
+
+用法::
+
+    python -m benchmarks.bench_scheduler --rpm 600 --burst 5
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+from bot.core.scheduler import Priority, RequestScheduler, RequestShed
+
+MODEL = "stub-model"
+
+
+async def run(args, prioritized: bool) -> dict:
+    scheduler = RequestScheduler(
+        {MODEL: {"rpm": args.rpm, "burst": args.burst}},
+        {"image": args.shed_image, "summary": args.shed_summary} if prioritized else {},
+    )
+    waits = defaultdict(list)
+    shed = defaultdict(int)
+
+    async def request(priority: Priority):
+        start = time.perf_counter()
+        try:
+            await scheduler.acquire(MODEL, priority if prioritized else Priority.REPLY)
+        except RequestShed:
+            shed[priority] += 1
+            return
+        waits[priority].append(time.perf_counter() - start)
+
+    # 按到达顺序创建任务：低优先级的请求先到
+    arrivals = (
+        [Priority.SUMMARY] * args.summaries
+        + [Priority.IMAGE] * args.images
+        + [Priority.DECISION] * args.decisions
+        + [Priority.REPLY] * args.replies
+    )
+    tasks = [asyncio.create_task(request(priority)) for priority in arrivals]
+    await asyncio.gather(*tasks)
+    return {
+        priority: (sum(waits[priority]) / len(waits[priority]) if waits[priority] else 0.0, max(waits[priority], default=0.0), shed[priority])
+        for priority in Priority
+    }
+
+
+async def main_async(args):
+    total = args.summaries + args.images + args.decisions + args.replies
+    print(f"限速 {args.rpm} 次/分钟（突发 {args.burst} 次），同时到达 {total} 个请求："
+          f"摘要 {args.summaries}，图片 {args.images}，决策 {args.decisions}，@回复 {args.replies}")
+    print(f"{'调度':<6} {'类型':<10} {'平均排队(s)':>12} {'最长排队(s)':>12} {'丢弃':>6}")
+    for prioritized in (False, True):
+        results = await run(args, prioritized)
+        for priority, (mean_wait, max_wait, shed) in results.items():
+            print(f"{'优先级' if prioritized else '先到先得':<6} {priority.name.lower():<10} {mean_wait:>12.2f} {max_wait:>12.2f} {shed:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型请求调度基准测试")
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--burst", type=float, default=5)
+    parser.add_argument("--summaries", type=int, default=20)
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--decisions", type=int, default=10)
+    parser.add_argument("--replies", type=int, default=5)
+    parser.add_argument("--shed-image", type=int, default=20, help="图片解读的丢弃队列长度")
+    parser.add_argument("--shed-summary", type=int, default=5, help="摘要的丢弃队列长度")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_streaming.py
+"""流式回复基准测试
+
+桩服务逐段生成一条多行回复，分别在关闭与开启流式模式时处理一条@机器人的群消息，
+测量从收到消息到发出第一个气泡、最后一个气泡的耗时。打字延迟设为0，
+只比较生成时间的影响。
+
+用法::
+
+    python -m benchmarks.bench_streaming --latency 0.3 --chunk-interval 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.bench_concurrency import MinimalBotAPI, configure_for_benchmark, make_group_event
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+
+REPLY = "哈哈这个问题问得好\n我觉得可以先从最简单的办法试起\n不行的话再换个思路\n有进展记得告诉我哦"
+
+
+class TimedBotAPI(MinimalBotAPI):
+    """记录每个气泡的发送时间"""
+
+    async def post_group_array_msg(self, group_id, message):
+        await super().post_group_array_msg(group_id, message)
+        self.sent_times.append(time.perf_counter())
+
+
+async def main_async(args):
+    server = StubModelServer(latency=args.latency, reply=REPLY, chunk_chars=args.chunk_chars, chunk_interval=args.chunk_interval)
+    base_url = await server.start(port=args.port)
+    group_id = "900000"
+    configure_for_benchmark(base_url, [group_id])
+
+    from bot.core.ai_client import AIClient
+    from bot.core.tracker import TargetTracker
+    from bot.handlers.group_handler import GroupMessageHandler
+
+    handler = GroupMessageHandler(AIClient(), TargetTracker())
+
+    print(f"回复 {len(REPLY)} 字 {len(REPLY.splitlines())} 行, 首段延迟 {args.latency}s, 每 {args.chunk_chars} 字间隔 {args.chunk_interval}s")
+    print(f"{'模式':<6} {'首个气泡(s)':>12} {'最后气泡(s)':>12} {'气泡数':>6}")
+    try:
+        for streaming in (False, True):
+            BotSettings.ENABLE_STREAMING = streaming
+            bot_api = TimedBotAPI()
+            bot_api.sent_times = []
+            start = time.perf_counter()
+            await handler.handle(make_group_event(group_id, "100000", "怎么办"), bot_api)
+            first = bot_api.sent_times[0] - start
+            last = bot_api.sent_times[-1] - start
+            print(f"{'流式' if streaming else '非流式':<6} {first:>12.3f} {last:>12.3f} {len(bot_api.sent):>6}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式回复基准测试")
+    parser.add_argument("--latency", type=float, default=0.3, help="首段延迟（秒）")
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="每段间隔（秒）")
+    parser.add_argument("--port", type=int, default=8768)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_summary_incremental.py
+"""增量摘要测试
+
+模拟一个持续活跃的对话：每个摘要周期新增若干条消息，随后生成一次摘要。
+桩服务记录每次摘要请求的输入字符数，分别在全量模式和增量模式下运行，
+对比每个周期发送给摘要模型的输入量。
+
+用法::
+
+    python -m benchmarks.bench_summary_incremental --cycles 6 --per-cycle 10
+"""
+import argparse
+import asyncio
+
+from benchmarks.stub_server import StubModelServer
+from bot.config.settings import BotSettings
+from bot.core.model import Content, Message, ROLE_TYPE
+
+
+async def run_mode(ai_client, server: StubModelServer, incremental: bool, cycles: int, per_cycle: int):
+    """运行若干摘要周期，返回每个周期的输入字符数"""
+    BotSettings.SUMMARY_INCREMENTAL = incremental
+    key = f"group_bench_{'incremental' if incremental else 'full'}"
+    memory_manager = ai_client.memory_manager
+    chars = []
+    seq = 0
+    for _ in range(cycles):
+        for _ in range(per_cycle):
+            seq += 1
+            memory_manager.add_message(key, Message(
+                content=Content(f"用户{seq % 7}[2025-12-19/22:45]: 这是第{seq}条测试消息，内容用于填充摘要输入"),
+                role=ROLE_TYPE.USER
+            ))
+        before = len(server.input_chars)
+        await memory_manager.generate_conversation_summary(key, ai_client)
+        chars.append(sum(server.input_chars[before:]))
+    return chars
+
+
+async def main_async(args):
+    server = StubModelServer(latency=0, reply="这是一份测试摘要：用户们在进行压力测试。")
+    BotSettings.BASE_URL = await server.start(port=args.port)
+    BotSettings.SUMMARY_ENABLED = True
+    BotSettings.SUMMARY_MIN_MESSAGES = 1
+    BotSettings.SHORT_TERM_MEMORY_LIMIT = args.memory_limit
+    BotSettings.SUMMARY_MAX_MESSAGES = args.memory_limit
+
+    from bot.core.ai_client import AIClient
+    ai_client = AIClient()
+
+    try:
+        full = await run_mode(ai_client, server, False, args.cycles, args.per_cycle)
+        incremental = await run_mode(ai_client, server, True, args.cycles, args.per_cycle)
+    finally:
+        await server.stop()
+
+    print(f"{'周期':>4} {'全量输入字符':>12} {'增量输入字符':>12} {'节省':>8}")
+    for i, (f, inc) in enumerate(zip(full, incremental), 1):
+        saved = 1 - inc / f if f else 0
+        print(f"{i:>4} {f:>12} {inc:>12} {saved:>8.1%}")
+    total_full, total_inc = sum(full), sum(incremental)
+    print(f"合计 {total_full:>12} {total_inc:>12} {1 - total_inc / total_full:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量摘要输入量对比")
+    parser.add_argument("--cycles", type=int, default=6)
+    parser.add_argument("--per-cycle", type=int, default=10, help="每个摘要周期新增的消息数")
+    parser.add_argument("--memory-limit", type=int, default=30, help="短期记忆消息上限")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/eval_prefilter.py
+"""决策预筛离线评估
+
+读取 ``decision_log_path`` 记录的决策（JSONL），用当前的预筛特征与给定阈值重新分类，
+与记录中决策模型的结论比较，统计可省下的模型调用比例与预筛结论和模型不一致的比例。
+只有请求过决策模型的记录（``model_decision`` 不为空）参与评估，
+因此评估数据建议在影子模式（``decision_prefilter_shadow: true``）下收集。
+
+用法::
+
+    python -m benchmarks.eval_prefilter bot/data/decisions.jsonl --thresholds 0.9:0.1 0.8:0.2
+"""
+import argparse
+import json
+from typing import List, Tuple
+
+from bot.core.prefilter import DecisionPrefilter, Verdict
+
+
+def load_records(path: str) -> List[dict]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("model_decision") is not None:
+                records.append(record)
+    return records
+
+
+def evaluate(records: List[dict], yes_threshold: float, no_threshold: float, bot_name: str = None) -> dict:
+    prefilter = DecisionPrefilter(yes_threshold, no_threshold, bot_name)
+    decided = false_yes = false_no = 0
+    disagreements: List[Tuple[str, str, bool]] = []
+    for record in records:
+        result = prefilter.classify(record["message"], record.get("recent", []), record.get("seconds_since_reply"))
+        if result.verdict == Verdict.UNSURE:
+            continue
+        decided += 1
+        local_decision = result.verdict == Verdict.YES
+        if local_decision != record["model_decision"]:
+            if local_decision:
+                false_yes += 1
+            else:
+                false_no += 1
+            disagreements.append((record["message"], result.verdict.value, record["model_decision"]))
+    return {
+        "total": len(records),
+        "decided": decided,
+        "false_yes": false_yes,
+        "false_no": false_no,
+        "disagreements": disagreements,
+    }
+
+
+def parse_threshold(value: str) -> Tuple[float, float]:
+    yes_threshold, no_threshold = value.split(":")
+    return float(yes_threshold), float(no_threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="决策预筛离线评估")
+    parser.add_argument("log", help="决策记录文件（JSONL）")
+    parser.add_argument("--thresholds", type=parse_threshold, nargs="+", default=[(0.9, 0.1)], help="yes:no 阈值对")
+    parser.add_argument("--bot-name", default=None, help="机器人名称，默认读取配置")
+    parser.add_argument("--show", type=int, default=5, help="每组阈值显示的不一致样例数")
+    args = parser.parse_args()
+
+    records = load_records(args.log)
+    if not records:
+        print("没有包含决策模型结论的记录，请在影子模式下收集决策记录")
+        return
+
+    print(f"记录数: {len(records)}（模型决定回复 {sum(r['model_decision'] for r in records)} 条）")
+    print(f"{'阈值(yes:no)':>12} {'本地决策':>8} {'省调用':>8} {'误回复':>6} {'漏回复':>6} {'不一致率':>8}")
+    for yes_threshold, no_threshold in args.thresholds:
+        result = evaluate(records, yes_threshold, no_threshold, args.bot_name)
+        decided = result["decided"]
+        wrong = result["false_yes"] + result["false_no"]
+        print(f"{f'{yes_threshold}:{no_threshold}':>12} {decided:>8} {decided / result['total']:>8.1%} "
+              f"{result['false_yes']:>6} {result['false_no']:>6} {(wrong / decided if decided else 0):>8.1%}")
+        for message, verdict, model_decision in result["disagreements"][:args.show]:
+            print(f"    预筛={verdict} 模型={'回复' if model_decision else '不回复'}: {message[:40]}")
+
+
+if __name__ == "__main__":
+    main()
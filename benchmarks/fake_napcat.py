@@ -0,0 +1,206 @@
+# benchmarks/fake_napcat.py
+"""进程内的 NapCat/BotAPI 替身与消息流生成
+
+- ``FakeBotAPI``：实现处理器与 AIClient 用到的 BotAPI 接口（``get_login_info``、
+  ``post_group_array_msg``、``send_private_text``、``get_group_msg_history``、
+  ``get_friend_msg_history``），记录发出的每条消息，可模拟接口延迟；
+- ``TraceEvent``：消息流中的一条消息，可保存为 JSONL 并重放；
+- ``synthetic_trace``：按群数量、消息速率、图片比例与@比例生成泊松到达的群聊消息流；
+- ``load_trace``：读取保存的消息流，也接受 ``decision_log_path`` 记录的决策日志。
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional
+
+from ncatbot.core import GroupMessageEvent, PrivateMessageEvent
+
+BOT_USER_ID = "10000"
+_message_ids = itertools.count(1)
+
+# 合成消息的文本，问句与陈述句混合
+SYNTHETIC_TEXTS = (
+    "哈哈哈", "确实", "草", "有人吗", "今天吃什么", "这个怎么弄啊？", "好耶", "晚上开黑吗",
+    "刚下班，累死了", "有没有人看昨天的比赛", "这道题谁会？", "明天要下雨了", "+1", "笑死我了",
+    "你们用的什么输入法", "周末有什么安排", "这个bug修了吗？", "推荐个耳机", "在吗在吗", "晚安",
+)
+
+
+class _LoginInfo:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+
+
+@dataclass
+class SentMessage:
+    """机器人发出的一条消息"""
+    # group_<id> 或 user_<id>
+    key: str
+    text: str
+    sent_at: float
+
+
+class FakeBotAPI:
+    """进程内的 BotAPI 替身
+
+    发出的消息按对话键记录；``api_latency`` 为每次接口调用的模拟延迟（秒）。
+    群历史记录接口返回通过 ``remember`` 记下的最近消息事件。
+    """
+
+    def __init__(self, bot_user_id: str = BOT_USER_ID, api_latency: float = 0.0, history_size: int = 50):
+        self.bot_user_id = bot_user_id
+        self.api_latency = api_latency
+        self.sent: List[SentMessage] = []
+        self.calls = defaultdict(int)
+        self._history: Dict[str, Deque] = defaultdict(lambda: deque(maxlen=history_size))
+
+    async def _call(self, name: str):
+        self.calls[name] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    def remember(self, key: str, event):
+        """记下收到的消息事件，供历史记录接口返回"""
+        self._history[key].append(event)
+
+    async def get_login_info(self):
+        await self._call("get_login_info")
+        return _LoginInfo(self.bot_user_id)
+
+    async def post_group_array_msg(self, group_id, message):
+        await self._call("post_group_array_msg")
+        text = "".join(getattr(segment, "text", "") for segment in message)
+        self.sent.append(SentMessage(f"group_{group_id}", text, time.perf_counter()))
+
+    async def send_private_text(self, user_id, text):
+        await self._call("send_private_text")
+        self.sent.append(SentMessage(f"user_{user_id}", text, time.perf_counter()))
+
+    async def get_group_msg_history(self, group_id, count: int = 20, reverseOrder: bool = True, **kwargs):
+        await self._call("get_group_msg_history")
+        return list(self._history[f"group_{group_id}"])[-count:]
+
+    async def get_friend_msg_history(self, user_id, message_seq: int = 0, count: int = 20, reverseOrder: bool = True, **kwargs):
+        await self._call("get_friend_msg_history")
+        return list(self._history[f"user_{user_id}"])[-count:]
+
+
+@dataclass
+class TraceEvent:
+    """消息流中的一条消息"""
+    # 相对消息流开始的时间（秒）
+    t: float
+    group_id: Optional[str]
+    user_id: str
+    text: str
+    at: bool = False
+    images: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"group_{self.group_id}" if self.group_id else f"user_{self.user_id}"
+
+    def to_event(self, bot_user_id: str = BOT_USER_ID):
+        """构造 ncatbot 的消息事件，group_id 为空时构造私聊事件"""
+        message_id = next(_message_ids)
+        segments = []
+        raw = ""
+        if self.at:
+            segments.append({"type": "at", "data": {"qq": bot_user_id}})
+            raw += f"[CQ:at,qq={bot_user_id}] "
+        if self.text:
+            segments.append({"type": "text", "data": {"text": self.text}})
+            raw += self.text
+        for i in range(self.images):
+            file = f"trace_{message_id}_{i}.image"
+            segments.append({"type": "image", "data": {"file": file, "url": f"https://example.invalid/{file}"}})
+            raw += f"[CQ:image,file={file}]"
+        data = {
+            "post_type": "message",
+            "message_type": "group" if self.group_id else "private",
+            "sub_type": "normal" if self.group_id else "friend",
+            "message_id": message_id,
+            "self_id": bot_user_id,
+            "time": int(time.time()),
+            "user_id": self.user_id,
+            "message": segments,
+            "raw_message": raw,
+            "sender": {"user_id": self.user_id, "nickname": f"用户{self.user_id}", "card": ""},
+        }
+        if self.group_id:
+            return GroupMessageEvent({**data, "group_id": self.group_id})
+        return PrivateMessageEvent(data)
+
+
+def synthetic_trace(
+    groups: int,
+    rate: float,
+    duration: float,
+    image_ratio: float = 0.1,
+    at_ratio: float = 0.1,
+    users_per_group: int = 8,
+    seed: Optional[int] = None
+) -> List[TraceEvent]:
+    """生成 duration 秒内总速率为 rate 条/秒的群聊消息流
+
+    消息按泊松过程到达，随机分配到各群（群号 900000 起）；
+    每条消息以 image_ratio 的概率为一张图片，以 at_ratio 的概率@机器人。
+    """
+    rng = random.Random(seed)
+    events = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        group = rng.randrange(groups)
+        images = 1 if rng.random() < image_ratio else 0
+        events.append(TraceEvent(
+            t=round(t, 4),
+            group_id=str(900000 + group),
+            user_id=str(100000 + group * users_per_group + rng.randrange(users_per_group)),
+            text="" if images else rng.choice(SYNTHETIC_TEXTS),
+            at=not images and rng.random() < at_ratio,
+            images=images,
+        ))
+        t += rng.expovariate(rate)
+    return events
+
+
+def save_trace(events: Iterable[TraceEvent], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(asdict(event), ensure_ascii=False) + "\n")
+
+
+def load_trace(path: str) -> List[TraceEvent]:
+    """读取 JSONL 消息流
+
+    每行为 TraceEvent 的字段；没有 t 字段而有 ISO 格式的 time 字段的行（如决策日志）
+    按 time 换算相对时间，文本取 text 或 message 字段。
+    """
+    events = []
+    start = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            t = entry.get("t")
+            if t is None:
+                stamp = datetime.fromisoformat(entry["time"]).timestamp()
+                start = stamp if start is None else start
+                t = stamp - start
+            events.append(TraceEvent(
+                t=float(t),
+                group_id=str(entry["group_id"]) if entry.get("group_id") else None,
+                user_id=str(entry.get("user_id", "100000")),
+                text=entry.get("text", entry.get("message", "")),
+                at=bool(entry.get("at", False)),
+                images=int(entry.get("images", 0)),
+            ))
+    events.sort(key=lambda event: event.t)
+    return events
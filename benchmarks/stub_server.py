@@ -0,0 +1,425 @@
+# benchmarks/stub_server.py
+"""本地模型桩服务
+
+实现 AIClient 使用到的 ``POST /responses`` 接口，模拟网络延迟并返回确定的内容，
+用于在没有火山方舟账号的情况下测试吞吐与延迟。请求带 ``stream`` 时以 SSE
+逐段返回文本，``latency`` 为首段延迟，之后每段间隔 ``chunk_interval`` 秒。
+
+``latency`` 可以是固定秒数，也可以是延迟分布（见 ``LatencyDistribution``），
+``role_latency`` 可为回复、决策、摘要与图片解读请求分别指定分布。
+未指定 ``reply`` 时按请求类型返回确定的预设内容：同样的输入总是得到同样的输出，
+决策请求按输入哈希以 ``yes_rate`` 的比例返回 YES。指定 ``reply`` 时所有请求都返回该内容。
+``GET /api/v3/stub/stats`` 返回请求计数等统计。
+带 ``previous_response_id`` 的请求按服务端的方式计费：输入token数为链中此前全部输入、
+输出与本次输入之和（按字符数计），引用不存在的响应时返回 404。
+可按比例注入错误响应（``error_rate``，状态码 ``error_status``）或挂起不响应的请求
+（``hang_rate``），也可用 ``fail_next`` 让接下来的若干个请求失败，用于测试重试与熔断。
+
+用法::
+
+    python -m benchmarks.stub_server --port 8765 --latency lognormal:0.5,0.4 --role-latency decision=uniform:0.05,0.2
+
+然后把配置中的 ``base_url`` 指向 ``http://127.0.0.1:8765/api/v3``。
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional, Union
+
+from aiohttp import web
+
+_response_counter = itertools.count(1)
+
+# 请求类型，与 AIClient 中的模型调用类型一致
+ROLES = ("main", "decision", "summary", "image")
+
+CANNED_REPLIES = (
+    "好的\n收到啦",
+    "哈哈确实\n我也这么觉得",
+    "这个我不太确定诶\n你们怎么看",
+    "可以的\n等我想想怎么说\n大概就是这样",
+    "草\n笑死",
+)
+
+_SPEAKER_PATTERN = re.compile(r"^(.+?)\[\d{4}-\d{2}-\d{2}/\d{2}:\d{2}\]:")
+
+
+class LatencyDistribution:
+    """模拟延迟的分布
+
+    规格字符串的格式为 ``名称:参数1,参数2``，单位均为秒：
+
+    - ``0.5`` 或 ``fixed:0.5``：固定延迟
+    - ``uniform:低,高``：均匀分布
+    - ``normal:均值,标准差``：正态分布（截断为非负）
+    - ``lognormal:中位数,sigma``：对数正态分布，常见的长尾延迟
+    - ``exponential:均值``：指数分布
+    - ``pareto:最小值,alpha``：帕累托分布，alpha 越小尾部越重
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential", "pareto")
+
+    def __init__(self, kind: str, *params: float):
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的延迟分布: {kind}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: Union[str, float, "LatencyDistribution"]) -> "LatencyDistribution":
+        if isinstance(spec, LatencyDistribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", float(spec))
+        kind, _, params = spec.partition(":")
+        if not params:
+            return cls("fixed", float(kind))
+        return cls(kind, *(float(param) for param in params.split(",")))
+
+    @property
+    def mean(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            return p[0]
+        if self.kind == "uniform":
+            return (p[0] + p[1]) / 2
+        if self.kind == "normal":
+            return max(0.0, p[0])
+        if self.kind == "lognormal":
+            return p[0] * math.exp(p[1] ** 2 / 2)
+        if self.kind == "exponential":
+            return p[0]
+        return p[0] * p[1] / (p[1] - 1) if p[1] > 1 else math.inf
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            return p[0]
+        if self.kind == "uniform":
+            return rng.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(p[0], p[1]))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+        if self.kind == "exponential":
+            return rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        return p[0] * rng.paretovariate(p[1])
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+def count_input_chars(payload: dict) -> int:
+    """统计请求 input 中所有文本的字符数"""
+    total = 0
+    for item in payload.get("input", []):
+        content = item.get("content", "")
+        if isinstance(content, str):
+            total += len(content)
+        else:
+            total += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return total
+
+
+def input_texts(payload: dict) -> list:
+    """按顺序返回请求 input 中的 (角色, 文本)"""
+    texts = []
+    for item in payload.get("input", []):
+        content = item.get("content", "")
+        if isinstance(content, str):
+            texts.append((item.get("role", "user"), content))
+        else:
+            texts.extend((item.get("role", "user"), part.get("text", "")) for part in content if isinstance(part, dict))
+    return texts
+
+
+def classify_request(payload: dict) -> str:
+    """根据请求内容判断 AIClient 的调用类型
+
+    带图片的是图片解读；开启思考的是回复（主模型）；关闭思考的请求中，
+    系统提示词提到摘要的是摘要，其余为回复决策。
+    """
+    for item in payload.get("input", []):
+        content = item.get("content")
+        if isinstance(content, list) and any(isinstance(part, dict) and part.get("type") == "input_image" for part in content):
+            return "image"
+    if (payload.get("thinking") or {}).get("type", "enabled") == "enabled":
+        return "main"
+    system = next((text for role, text in input_texts(payload) if role == "system"), "")
+    return "summary" if "摘要" in system else "decision"
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+def canned_output(role: str, payload: dict, yes_rate: float = 0.3) -> str:
+    """按请求类型生成确定的预设输出，只取决于请求内容（不含消息前的发言人与时间戳）"""
+    texts = input_texts(payload)
+    last = _SPEAKER_PATTERN.sub("", texts[-1][1]).strip() if texts else ""
+    if role == "decision":
+        return "YES" if _digest(last) % 10000 < yes_rate * 10000 else "NO"
+    if role == "summary":
+        messages = [text for role_, text in texts if role_ != "system"]
+        speakers = []
+        for text in messages:
+            match = _SPEAKER_PATTERN.match(text)
+            if match and match.group(1) not in speakers:
+                speakers.append(match.group(1))
+        return f"{len(messages)}条聊天记录的摘要：{'、'.join(speakers[:5]) or '群友'}在聊天，最后说的是「{last[:20]}」。"
+    if role == "image":
+        url = next(
+            (part.get("image_url", "") for item in payload.get("input", []) for part in item.get("content", [])
+             if isinstance(part, dict) and part.get("type") == "input_image"),
+            "",
+        )
+        return f"一张图片（{_digest(url) % 100000:05d}），看起来很开心"
+    return CANNED_REPLIES[_digest(last) % len(CANNED_REPLIES)]
+
+
+def build_response(text: str, model: str, input_tokens: int = 0) -> dict:
+    """构建与方舟 Responses API 兼容的响应体"""
+    response_id = f"resp_stub_{next(_response_counter)}"
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "output": [
+            {
+                "id": f"msg_{response_id}",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "usage": {"input_tokens": input_tokens, "output_tokens": len(text), "total_tokens": input_tokens + len(text)},
+    }
+
+
+def _sse(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class StubModelServer:
+    """模型桩服务"""
+
+    def __init__(
+        self,
+        latency: Union[float, str] = 0.5,
+        reply: Optional[str] = None,
+        chunk_chars: int = 4,
+        chunk_interval: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        hang_rate: float = 0.0,
+        role_latency: Optional[Dict[str, Union[float, str]]] = None,
+        yes_rate: float = 0.3,
+        seed: Optional[int] = None
+    ):
+        self.latency_dist = LatencyDistribution.parse(latency)
+        # 平均延迟，供按固定延迟估算耗时的调用方使用
+        self.latency = self.latency_dist.mean
+        self.role_latency = {role: LatencyDistribution.parse(spec) for role, spec in (role_latency or {}).items()}
+        self.rng = random.Random(seed)
+        self.reply = reply
+        self.yes_rate = yes_rate
+        # 故障注入：按比例返回错误状态码或挂起请求
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self._fail_next = []
+        self.injected_errors = 0
+        self.injected_hangs = 0
+        # 模拟逐段生成：每段 chunk_chars 个字符，间隔 chunk_interval 秒
+        self.chunk_chars = chunk_chars
+        self.chunk_interval = chunk_interval
+        self.request_count = 0
+        self.requests_by_model = Counter()
+        self.requests_by_role = Counter()
+        self.streamed_requests = 0
+        # 每次请求的输入字符数，按到达顺序记录
+        self.input_chars = []
+        # 响应id -> 链中累积的上下文长度；每次请求服务端统计的输入token数
+        self._contexts = {}
+        self.input_tokens = []
+        self._runner: web.AppRunner | None = None
+
+    def fail_next(self, count: int, status: int = 503):
+        """让接下来的 count 个请求返回 status"""
+        self._fail_next.extend([status] * count)
+
+    async def _inject_fault(self) -> web.Response | None:
+        """按配置注入故障，返回错误响应；挂起的请求一直等待直到客户端断开"""
+        status = self._fail_next.pop(0) if self._fail_next else None
+        if status is None and self.rng.random() < self.error_rate:
+            status = self.error_status
+        if status is not None:
+            self.injected_errors += 1
+            return web.json_response(
+                {"error": {"code": "StubInjectedError", "message": f"注入的错误 {status}", "type": "stub"}},
+                status=status,
+            )
+        if self.rng.random() < self.hang_rate:
+            self.injected_hangs += 1
+            await asyncio.sleep(3600)
+        return None
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v3/responses", self._handle_responses)
+        app.router.add_get("/api/v3/stub/stats", self._handle_stats)
+        return app
+
+    def sample_latency(self, role: str) -> float:
+        """按请求类型的延迟分布抽取一次延迟"""
+        return self.role_latency.get(role, self.latency_dist).sample(self.rng)
+
+    def reply_for(self, payload: dict, role: Optional[str] = None) -> str:
+        """请求的回复内容：指定了 reply 时总是返回它，否则返回按请求类型预设的内容"""
+        if self.reply is not None:
+            return self.reply
+        return canned_output(role or classify_request(payload), payload, self.yes_rate)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.request_count,
+            "streamed": self.streamed_requests,
+            "by_model": dict(self.requests_by_model),
+            "by_role": dict(self.requests_by_role),
+            "injected_errors": self.injected_errors,
+            "injected_hangs": self.injected_hangs,
+            "input_tokens": sum(self.input_tokens),
+        }
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def _handle_responses(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        role = classify_request(payload)
+        self.request_count += 1
+        self.requests_by_model[payload.get("model", "stub")] += 1
+        self.requests_by_role[role] += 1
+        self.input_chars.append(count_input_chars(payload))
+        fault = await self._inject_fault()
+        if fault is not None:
+            return fault
+        previous = payload.get("previous_response_id")
+        if previous is not None and previous not in self._contexts:
+            return web.json_response(
+                {"error": {"code": "NotFound", "message": f"previous response {previous} not found", "type": "stub"}},
+                status=404,
+            )
+        input_tokens = self._contexts.get(previous, 0) + self.input_chars[-1]
+        self.input_tokens.append(input_tokens)
+        text = self.reply_for(payload, role)
+        latency = self.sample_latency(role)
+        if payload.get("stream"):
+            self.streamed_requests += 1
+            return await self._stream_response(request, payload, input_tokens, text, latency)
+        # 非流式请求等待全部内容生成完毕
+        chunks = max(1, -(-len(text) // self.chunk_chars))
+        await asyncio.sleep(latency + (chunks - 1) * self.chunk_interval)
+        return web.json_response(self._respond(payload, input_tokens, text))
+
+    def _respond(self, payload: dict, input_tokens: int, text: Optional[str] = None) -> dict:
+        """构建响应并记录链中累积的上下文长度"""
+        text = self.reply_for(payload) if text is None else text
+        response = build_response(text, payload.get("model", "stub"), input_tokens)
+        self._contexts[response["id"]] = input_tokens + len(text)
+        return response
+
+    async def _stream_response(
+        self,
+        request: web.Request,
+        payload: dict,
+        input_tokens: int = 0,
+        text: Optional[str] = None,
+        latency: Optional[float] = None
+    ) -> web.StreamResponse:
+        text = self.reply_for(payload) if text is None else text
+        response = self._respond(payload, input_tokens, text)
+        item_id = response["output"][0]["id"]
+        stream = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await stream.prepare(request)
+        await stream.write(_sse({"type": "response.created", "response": {**response, "status": "in_progress", "output": []}}))
+        await asyncio.sleep(self.latency if latency is None else latency)
+        for index in range(0, len(text), self.chunk_chars):
+            if index:
+                await asyncio.sleep(self.chunk_interval)
+            await stream.write(_sse({
+                "type": "response.output_text.delta",
+                "item_id": item_id,
+                "output_index": 0,
+                "content_index": 0,
+                "delta": text[index:index + self.chunk_chars],
+            }))
+        await stream.write(_sse({"type": "response.completed", "response": response}))
+        await stream.write(b"data: [DONE]\n\n")
+        await stream.write_eof()
+        return stream
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> str:
+        """启动服务并返回可用作 base_url 的地址"""
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return f"http://{host}:{port}/api/v3"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模型桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="0.5", help="每次请求的模拟延迟：秒数或分布，如 lognormal:0.5,0.4")
+    parser.add_argument("--role-latency", nargs="*", default=[], metavar="ROLE=SPEC",
+                        help=f"按请求类型（{'/'.join(ROLES)}）指定延迟分布，如 decision=uniform:0.05,0.2")
+    parser.add_argument("--reply", default=None, help="所有请求都返回该内容，不指定则按请求类型返回预设内容")
+    parser.add_argument("--yes-rate", type=float, default=0.3, help="决策请求返回 YES 的比例")
+    parser.add_argument("--seed", type=int, default=None, help="延迟与故障注入的随机种子")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="流式输出每段的字符数")
+    parser.add_argument("--chunk-interval", type=float, default=0.0, help="流式输出每段的间隔（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误状态码的请求比例")
+    parser.add_argument("--error-status", type=int, default=503, help="注入错误的状态码")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="挂起不响应的请求比例")
+    args = parser.parse_args()
+
+    role_latency = {}
+    for item in args.role_latency:
+        role, _, spec = item.partition("=")
+        if role not in ROLES or not spec:
+            parser.error(f"无效的 --role-latency: {item}")
+        role_latency[role] = spec
+    server = StubModelServer(
+        latency=args.latency,
+        reply=args.reply,
+        role_latency=role_latency,
+        yes_rate=args.yes_rate,
+        seed=args.seed,
+        chunk_chars=args.chunk_chars,
+        chunk_interval=args.chunk_interval,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        hang_rate=args.hang_rate,
+    )
+    web.run_app(server.build_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+# benchmarks/suite.py
+"""热点路径基准测试套件
+
+微基准测量单个函数每次调用的耗时：关键词匹配、消息清理、敏感数据掩码、日志文本截断、
+记忆的读写与系统提示词构建、请求上下文拼装、ApiModel.export、长期记忆的写入与加载。
+场景基准用本地桩服务与 FakeBotAPI 跑完整的处理流程：@回复的吞吐与延迟、合成消息流的端到端重放。
+
+结果保存为 JSON；compare 对比两份结果，按各项的方向（越低越好或越高越好）
+把变差超过阈值的项标记为回归，存在回归时退出码为1。微基准记录多轮重复的最小值与中位数，
+两者的相对差作为测量噪声；对比时阈值放宽到两份结果的噪声之和，避免在繁忙的机器上误报。
+
+用法::
+
+    python -m benchmarks.suite run --output base.json
+    python -m benchmarks.suite run --filter memory --output new.json
+    python -m benchmarks.suite compare base.json new.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bot.config.settings import BotSettings
+
+# 默认的回归阈值：微基准取多次重复中的最小值，较稳定；场景基准受调度与网络影响，波动较大
+MICRO_THRESHOLD = 0.10
+SCENARIO_THRESHOLD = 0.30
+
+MICRO_BENCHMARKS: Dict[str, Callable] = {}
+SCENARIO_BENCHMARKS: Dict[str, Callable] = {}
+
+
+def micro(name: str):
+    """注册微基准：被装饰的函数在临时目录中完成准备工作，返回要计时的无参函数"""
+    def decorator(func):
+        MICRO_BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def scenario(name: str):
+    """注册场景基准：被装饰的协程返回 {指标名: (值, 单位, 是否越高越好)}"""
+    def decorator(func):
+        SCENARIO_BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def time_call(func: Callable[[], object], min_time: float, repeats: int) -> List[float]:
+    """每次调用的耗时（秒）：先确定每轮调用次数使一轮约 min_time 秒，再重复 repeats 轮"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 5 or number >= 1 << 20:
+            break
+        number *= 4
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+# ---------------------------------------------------------------- 微基准
+
+SAMPLE_MESSAGES = [
+    "[CQ:at,qq=10000] 今天天气怎么样？",
+    "哈哈哈哈哈哈笑死我了",
+    "有人知道这个bug怎么修吗 https://example.com/issue/123",
+    "@小明 晚上开黑吗，我的QQ是123456789，手机13812345678",
+    "[CQ:image,file=abc.image,url=https://example.invalid/a.png]",
+    "This is an English message with several words in it.",
+]
+
+
+def _memory_manager(tmp: str, messages: int = 30):
+    from bot.core.memory import LongTermMemory, MemoryManager
+    from bot.core.model import Content, Message, ROLE_TYPE
+
+    BotSettings.CONVERSATION_PERSISTENCE_ENABLED = False
+    memory_manager = MemoryManager()
+    memory_manager.long_term_memory = LongTermMemory(storage_path=str(Path(tmp) / "memory.json"))
+    for i in range(BotSettings.LONG_TERM_MEMORY_LIMIT):
+        memory_manager.long_term_memory.add_memory("900000", f"第{i}条记忆：用户{i}喜欢在周末打游戏。")
+    for i in range(messages):
+        memory_manager.add_message("group_900000", Message(Content(f"用户{i % 5}[2025-12-19/22:45]: {SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]}"), ROLE_TYPE.USER))
+    return memory_manager
+
+
+@micro("tracker.contains_keyword")
+def bench_contains_keyword(tmp: str):
+    from bot.core.tracker import TargetTracker
+
+    BotSettings.TRIGGER_KEYWORDS = [f"关键词{i}" for i in range(100)] + [r"^bot\s", r"机器人(在吗|出来)", r"\d{6}号"]
+    BotSettings.ENABLE_REGEX_KEYWORDS = True
+    tracker = TargetTracker()
+    texts = SAMPLE_MESSAGES
+    return lambda: [tracker._contains_keyword(text) for text in texts]
+
+
+@micro("tracker.clean_message")
+def bench_clean_message(tmp: str):
+    from bot.core.tracker import TargetTracker
+
+    tracker = TargetTracker()
+    return lambda: [tracker.clean_message(text) for text in SAMPLE_MESSAGES]
+
+
+@micro("helpers.mask_sensitive_data")
+def bench_mask_sensitive_data(tmp: str):
+    from bot.utils.helpers import mask_sensitive_data
+
+    return lambda: [mask_sensitive_data(text) for text in SAMPLE_MESSAGES]
+
+
+@micro("helpers.format_log_text")
+def bench_format_log_text(tmp: str):
+    from bot.utils.helpers import format_log_text
+
+    return lambda: [format_log_text(text, 30) for text in SAMPLE_MESSAGES]
+
+
+@micro("memory.add_message")
+def bench_add_message(tmp: str):
+    from bot.core.model import Content, Message, ROLE_TYPE
+
+    memory_manager = _memory_manager(tmp)
+    message = Message(Content("用户1[2025-12-19/22:45]: 新消息"), ROLE_TYPE.USER)
+    return lambda: memory_manager.add_message("group_900000", message, user_id="100001")
+
+
+@micro("memory.get_messages")
+def bench_get_messages(tmp: str):
+    memory_manager = _memory_manager(tmp)
+    return lambda: list(memory_manager.get_messages("group_900000", limit=10))
+
+
+@micro("memory.build_system_prompt")
+def bench_build_system_prompt(tmp: str):
+    memory_manager = _memory_manager(tmp)
+    return lambda: memory_manager.build_system_prompt("group_900000")
+
+
+@micro("memory.assemble_context")
+def bench_assemble_context(tmp: str):
+    memory_manager = _memory_manager(tmp)
+    return lambda: memory_manager.assemble_context("group_900000", True, 4000)
+
+
+@micro("model.api_model_export")
+def bench_api_model_export(tmp: str):
+    from bot.core.model import ApiModel
+
+    memory_manager = _memory_manager(tmp)
+    messages = [memory_manager.build_system_prompt("group_900000"), *memory_manager.get_messages("group_900000", limit=10)]
+    return lambda: ApiModel(model="stub", messages=messages, temperature=0.7).export
+
+
+@micro("long_term_memory.add_memory")
+def bench_add_memory(tmp: str):
+    from bot.core.memory import LongTermMemory
+
+    memory = LongTermMemory(storage_path=str(Path(tmp) / "add.json"), backend="json")
+    counter = iter(range(1 << 40))
+    return lambda: memory.add_memory(str(900000 + next(counter) % 50), f"记忆内容{next(counter)}")
+
+
+@micro("long_term_memory.load")
+def bench_load_memory(tmp: str):
+    from bot.core.memory_storage import JsonMemoryStorage
+
+    path = Path(tmp) / "load.json"
+    snapshot = {
+        str(900000 + g): [
+            {"content": f"群{g}的第{i}条记忆", "timestamp": "2025-12-19T22:45:00", "importance": 1.0, "hash": f"{g:04x}{i:04x}"}
+            for i in range(50)
+        ]
+        for g in range(100)
+    }
+    path.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+    storage = JsonMemoryStorage(str(path))
+    return storage._load_memory
+
+
+@micro("context.estimate_text_tokens")
+def bench_estimate_tokens(tmp: str):
+    from bot.core.context_assembler import estimate_text_tokens
+
+    return lambda: [estimate_text_tokens(text) for text in SAMPLE_MESSAGES]
+
+
+# ---------------------------------------------------------------- 场景基准
+
+async def _with_stub(latency, body):
+    from benchmarks.bench_concurrency import configure_for_benchmark
+    from benchmarks.stub_server import StubModelServer
+
+    server = StubModelServer(latency=latency, seed=0)
+    base_url = await server.start(port=8779)
+    try:
+        return await body(server, base_url, configure_for_benchmark)
+    finally:
+        await server.stop()
+
+
+@scenario("handler.at_reply")
+async def bench_at_reply():
+    """10 个群各 10 条@机器人的消息同时到达，经分发器处理"""
+    from benchmarks.fake_napcat import FakeBotAPI, TraceEvent
+
+    async def body(server, base_url, configure):
+        from bot.core.ai_client import AIClient
+        from bot.core.dispatcher import ConversationDispatcher
+        from bot.core.tracker import TargetTracker
+        from bot.handlers.group_handler import GroupMessageHandler
+
+        groups = [str(900000 + g) for g in range(10)]
+        configure(base_url, groups)
+        dispatcher = ConversationDispatcher(BotSettings.MAX_CONCURRENT_CONVERSATIONS)
+        handler = GroupMessageHandler(AIClient(), TargetTracker(pending_messages=dispatcher.pending))
+        bot_api = FakeBotAPI()
+        latencies = []
+        start = time.perf_counter()
+        for i in range(10):
+            for group_id in groups:
+                event = TraceEvent(0, group_id, str(100000 + i), f"第{i}个问题", at=True).to_event()
+                arrived = time.perf_counter()
+                future = dispatcher.dispatch(f"group_{group_id}", handler.handle, event, bot_api)
+                future.add_done_callback(lambda _, arrived=arrived: latencies.append(time.perf_counter() - arrived))
+        await dispatcher.join()
+        elapsed = time.perf_counter() - start
+        await handler.ai_client.http_client.aclose()
+        latencies.sort()
+        return {
+            "throughput": (len(latencies) / elapsed, "msg/s", True),
+            "latency_p50": (latencies[len(latencies) // 2], "s", False),
+            "latency_p95": (latencies[int(len(latencies) * 0.95)], "s", False),
+        }
+
+    return await _with_stub("uniform:0.02,0.05", body)
+
+
+@scenario("replay.synthetic")
+async def bench_replay_synthetic():
+    """20 个群合计 100 条/秒的合成消息流重放 3 秒（AI决策模式）"""
+    from benchmarks.bench_replay import replay
+    from benchmarks.fake_napcat import synthetic_trace
+
+    async def body(server, base_url, configure):
+        trace = synthetic_trace(20, 100, 3, image_ratio=0.1, at_ratio=0.1, seed=0)
+        configure(base_url, sorted({item.group_id for item in trace}))
+        BotSettings.DEFAULT_RESPONSE_MODE = "ai_decide"
+        results = await replay(trace)
+        return {
+            "throughput": (results["throughput"], "msg/s", True),
+            "handler_p95": (results["handler_latency"]["p95"], "s", False),
+            "arrival_to_send_p95": (results["arrival_to_send"].get("p95", 0.0), "s", False),
+            "memory_growth": (results["memory_mb"]["end"] - results["memory_mb"]["start"], "MB", False),
+        }
+
+    return await _with_stub("uniform:0.02,0.05", body)
+
+
+# ---------------------------------------------------------------- 运行与对比
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _settings_snapshot() -> Dict[str, object]:
+    return {name: value for name, value in vars(BotSettings).items() if name.isupper()}
+
+
+def _restore_settings(snapshot: Dict[str, object]):
+    """还原基准测试修改过的配置，避免影响后面的基准"""
+    for name, value in snapshot.items():
+        setattr(BotSettings, name, value)
+
+
+def run(args) -> dict:
+    random.seed(0)
+    settings = _settings_snapshot()
+    results = {}
+    for name, setup in MICRO_BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            samples = time_call(setup(tmp), args.min_time, args.repeats)
+        _restore_settings(settings)
+        results[name] = {
+            "kind": "micro",
+            "value": min(samples) * 1e6,
+            "median": statistics.median(samples) * 1e6,
+            "unit": "us/op",
+            "higher_is_better": False,
+            "threshold": MICRO_THRESHOLD,
+        }
+        print(f"{name:<36} {results[name]['value']:>12.3f} us/op（中位数 {results[name]['median']:.3f}）")
+
+    for name, bench in SCENARIO_BENCHMARKS.items():
+        if args.filter and args.filter not in name or args.micro_only:
+            continue
+        metrics = asyncio.run(bench())
+        _restore_settings(settings)
+        for metric, (value, unit, higher_is_better) in metrics.items():
+            key = f"{name}.{metric}"
+            results[key] = {"kind": "scenario", "value": value, "unit": unit, "higher_is_better": higher_is_better, "threshold": SCENARIO_THRESHOLD}
+            print(f"{key:<36} {value:>12.3f} {unit}")
+
+    return {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def _noise(result: dict) -> float:
+    """微基准的测量噪声：中位数相对最小值的偏差"""
+    if "median" not in result or not result["value"]:
+        return 0.0
+    return (result["median"] - result["value"]) / result["value"]
+
+
+def compare(base: dict, new: dict, threshold: Optional[float] = None) -> List[dict]:
+    """逐项对比两份结果，change 为相对基线的变化比例（正数表示变差），limit 为该项实际使用的阈值"""
+    rows = []
+    for name, current in new["results"].items():
+        baseline = base["results"].get(name)
+        if baseline is None or not baseline["value"]:
+            rows.append({"name": name, "base": None, "new": current["value"], "unit": current["unit"], "change": None, "limit": None, "regression": False})
+            continue
+        ratio = (current["value"] - baseline["value"]) / abs(baseline["value"])
+        change = -ratio if current["higher_is_better"] else ratio
+        limit = threshold if threshold is not None else current.get("threshold", MICRO_THRESHOLD)
+        limit = max(limit, _noise(baseline) + _noise(current))
+        rows.append({"name": name, "base": baseline["value"], "new": current["value"], "unit": current["unit"], "change": change, "limit": limit, "regression": change > limit})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点路径基准测试套件")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="运行基准测试并保存结果")
+    run_parser.add_argument("--output", default="bench_results.json")
+    run_parser.add_argument("--filter", help="只运行名称包含该字符串的基准")
+    run_parser.add_argument("--micro-only", action="store_true", help="跳过场景基准")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="微基准每轮的目标耗时（秒）")
+    run_parser.add_argument("--repeats", type=int, default=7, help="微基准重复轮数，取最小值")
+    compare_parser = commands.add_parser("compare", help="对比两份结果，变差超过阈值时退出码为1")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=None,
+                                help=f"回归阈值（比例），默认微基准 {MICRO_THRESHOLD}、场景基准 {SCENARIO_THRESHOLD}")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args)
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"结果已保存到 {args.output}")
+        return
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    print(f"基线 {base['meta'].get('commit')}（{base['meta']['time']}） -> {new['meta'].get('commit')}（{new['meta']['time']}）")
+    print(f"{'基准':<44} {'基线':>12} {'当前':>12} {'单位':>8} {'变化':>8} {'阈值':>8}")
+    rows = compare(base, new, args.threshold)
+    for row in rows:
+        if row["change"] is None:
+            print(f"{row['name']:<44} {'-':>12} {row['new']:>12.3f} {row['unit']:>8} {'新增':>8}")
+            continue
+        flag = "  回归" if row["regression"] else ""
+        print(f"{row['name']:<44} {row['base']:>12.3f} {row['new']:>12.3f} {row['unit']:>8} {row['change']:>+8.1%} {row['limit']:>8.0%}{flag}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"回归 {len(regressions)} 项" if regressions else "没有回归")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
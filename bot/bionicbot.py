@@ -1,10 +1,14 @@
 # bot/bionicbot.py
 import asyncio
+from typing import Dict, Iterator, Tuple
+
 from ncatbot.core import BotClient, GroupMessageEvent, PrivateMessageEvent
 from ncatbot.utils import get_log
 
 from .config.settings import BotSettings
 from .core.ai_client import AIClient
+from .core.dispatcher import ConversationDispatcher
+from .core.metrics import MetricsServer, metrics
 from .core.tracker import TargetTracker
 from .core.language_manager import language_manager
 from .handlers.group_handler import GroupMessageHandler
@@ -27,7 +31,8 @@ class BionicBot:
         # 初始化核心组件
         self.bot = BotClient()
         self.ai_client = AIClient()
-        self.tracker = TargetTracker()
+        self.dispatcher = ConversationDispatcher(BotSettings.MAX_CONCURRENT_CONVERSATIONS)
+        self.tracker = TargetTracker(pending_messages=self.dispatcher.pending)
         
         # 初始化处理器
         self.group_handler = GroupMessageHandler(self.ai_client, self.tracker)
@@ -36,6 +41,10 @@ class BionicBot:
         # 注册事件处理器
         self._register_handlers()
         
+        # 队列深度、对话数等瞬时指标在导出时读取
+        metrics.add_collector(self._collect_metrics)
+        self.metrics_server = MetricsServer(metrics, BotSettings.METRICS_HOST, BotSettings.METRICS_PORT) if BotSettings.METRICS_ENABLED else None
+        
         logger.info("Bionic Bot 初始化完成")
         # 掩码处理目标群组ID，避免泄露真实群号
         masked_groups = [mask_sensitive_data(group) for group in BotSettings.TARGET_GROUPS]
@@ -45,15 +54,36 @@ class BionicBot:
     def _register_handlers(self):
         """注册事件处理器"""
         
+        # 消息投递到对应对话的信箱：同一对话内按顺序处理，不同对话之间并行处理
         @self.bot.on_group_message() # type: ignore
         async def handle_group_message(event: GroupMessageEvent):
             """处理群聊消息"""
-            await self.group_handler.handle(event, self.bot.api)
+            self.dispatcher.dispatch(f"group_{event.group_id}", self.group_handler.handle, event, self.bot.api)
         
         @self.bot.on_private_message() # type: ignore
         async def handle_private_message(event: PrivateMessageEvent):
             """处理私聊消息"""
-            await self.private_handler.handle(event, self.bot.api)
+            self.dispatcher.dispatch(f"user_{event.user_id}", self.private_handler.handle, event, self.bot.api)
+        
+        if BotSettings.METRICS_ENABLED:
+            @self.bot.on_startup() # type: ignore
+            async def start_metrics_server(event):
+                """连接成功后在事件循环中启动指标服务"""
+                await self.metrics_server.start()
+    
+    def _collect_metrics(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """瞬时指标：对话数、信箱与模型请求队列深度、摘要队列与缓存命中率"""
+        yield "conversations", {}, len(self.ai_client.memory_manager.conversations)
+        yield "dispatcher_queue_depth", {}, self.dispatcher.queue_depth
+        yield "dispatcher_active_conversations", {}, self.dispatcher.active_conversations
+        yield "dispatcher_running", {}, self.dispatcher.running
+        for model, depth in self.ai_client.scheduler.stats()["queue_depth"].items():
+            yield "model_queue_depth", {"model": model}, depth
+        yield "summary_queue_depth", {}, self.ai_client.summary_scheduler.queue_depth
+        yield "summary_lag_seconds", {}, self.ai_client.summary_scheduler.lag
+        for name, cache in (("decision", self.ai_client.decision_cache), ("image", self.ai_client.image_cache)):
+            if cache is not None:
+                yield "cache_hit_rate", {"cache": name}, cache.hit_rate
     
     def run(self):
         """启动机器人"""
@@ -66,4 +96,9 @@ class BionicBot:
         except Exception as e:
             logger.error(f"机器人运行异常: {e}", exc_info=True)
         finally:
+            # 确保对话状态、长期记忆日志和图片解读缓存落盘
+            self.ai_client.memory_manager.flush()
+            self.ai_client.memory_manager.long_term_memory.close()
+            if self.ai_client.image_cache is not None:
+                self.ai_client.image_cache.flush()
             logger.info("机器人已关闭")
@@ -69,6 +69,34 @@ DEFAULT_CONFIG = {
     "decision_model": "doubao-seed-1-6-flash-250828",
     "base_url": "https://ark.cn-beijing.volces.com/api/v3",
     "api_key_path": "../key",
+    "max_concurrent_requests": 16,  # 同时进行的模型请求数上限（连接池大小）
+    # 各类模型调用的时间预算：单次时限、最多重试次数、含重试的总时限（秒）
+    "model_call_policies": {
+        "main": {"timeout": 60, "max_retries": 2, "deadline": 150},
+        "decision": {"timeout": 10, "max_retries": 1, "deadline": 15},
+        "summary": {"timeout": 120, "max_retries": 3, "deadline": 400},
+        "image": {"timeout": 30, "max_retries": 2, "deadline": 75},
+    },
+    "retry_base_delay": 0.5,  # 重试退避的基础间隔（秒），每次翻倍并随机抖动
+    "retry_max_delay": 8.0,  # 重试退避的最大间隔（秒）
+    "circuit_breaker_threshold": 5,  # 同一模型连续失败多少次后熔断
+    "circuit_breaker_reset_seconds": 30,  # 熔断后多久放行一个探测请求（秒）
+    "context_delta_enabled": True,  # response_id 链有效时只发送上次回复之后新增的消息，不重复发送完整上下文
+    "context_delta_max_turns": 20,  # 链上连续增量请求达到该次数后重新发送完整上下文，限制链中累积的上下文长度
+    "context_delta_max_age_hours": 24,  # 链建立超过该时间后重新发送完整上下文，避免引用服务端已过期的响应
+    # 调用类型 -> 输入token预算，系统提示词、摘要、长期记忆与最近的消息按优先级在预算内拼装
+    "context_token_budgets": {"main": 4000, "decision": 1000},
+    "context_max_messages": 10,  # 主模型请求最多发送的最近消息数（含当前消息），预算有余时也不超过该数量
+    # 后备模型：调用类型(main/decision/summary/image) -> 按档次排列的模型，每档为模型名或同等质量的模型名列表
+    "model_fallbacks": {},
+    "model_hedge_ms": {},  # 调用类型 -> 毫秒，请求超过该时间未完成时并发请求下一个候选模型，未配置则不并发
+    "latency_ewma_alpha": 0.1,  # 估计各模型近期延迟时新样本的权重
+    "latency_probe_seconds": 30,  # 同档模型的延迟估计超过该时间（秒）未更新时，下一次调用先试该模型重新测量
+    # 按模型限速：模型名 -> {"rpm": 每分钟请求数, "tpm": 每分钟token数, "burst": 可突发的请求数（默认10秒的配额）}，未配置的模型不限速
+    "model_rate_limits": {},
+    # 超出配额排队时，队列长度达到该值就丢弃新的低优先级请求（image/summary），@回复与决策不丢弃
+    "scheduler_shed_queue_depth": {"image": 20, "summary": 5},
+    "enable_streaming": False,  # 流式获取回复，每生成完整的一行就立即发送
     
     # 模型配置 - Main model
     "temperature": 0.8,
@@ -101,6 +129,8 @@ DEFAULT_CONFIG = {
     "summary_interval_hours": 2,
     "summary_short_interval_minutes": 60,
     "summary_check_frequency": 50,
+    "summary_max_concurrency": 2,  # 后台同时生成摘要的数量上限
+    "summary_incremental": True,  # 增量摘要：只发送已有摘要和上次摘要之后的新消息
     
     # 图片解读配置
     "image_model": "doubao-seed-1-6-flash-250828",
@@ -109,12 +139,23 @@ DEFAULT_CONFIG = {
     "image_max_tokens": 200,
     "enable_image_interpretation": True,  # 是否启用图片解读
     "image_interpretation_probability": 1.0,  # 图片解读的概率 (0.0-1.0)，1.0表示总是解读
+    "image_max_concurrency": 4,  # 所有消息合计同时解读的图片数上限
+    "image_max_concurrency_per_message": 3,  # 单条消息同时解读的图片数上限
+    "image_cache_enabled": True,  # 缓存图片解读结果，重复的图片/表情包不再调用模型
+    "image_cache_max_entries": 2048,
+    "image_cache_ttl_hours": 24,
+    "image_cache_path": "image_cache.json",  # 缓存文件，相对于bot/data，留空则只缓存在内存中
+    "image_cache_hash_content": False,  # 下载图片并以内容哈希为键，否则以图片段的file标识为键
     
     # 记忆配置
     "short_term_memory_limit": 30,
     "long_term_memory_path": "long_term_memory.json",
+    "long_term_memory_backend": "json",  # 长期记忆存储后端：json（快照+追加日志）或 sqlite
     "long_term_memory_limit": 5,
     "long_term_memory_default_importance": 1.0,
+    "long_term_memory_fsync_batch": 16,  # 累计多少条日志记录后fsync一次
+    "long_term_memory_fsync_interval": 1.0,  # 距上次fsync超过该秒数时立即fsync
+    "long_term_memory_compact_threshold": 1000,  # 日志记录达到该数量后压缩进快照
     
     # 历史记录配置
     "enable_history_retrieval": True,
@@ -125,6 +166,9 @@ DEFAULT_CONFIG = {
     
     # 上下文管理
     "context_timeout_hours": 2,
+    "conversation_persistence_enabled": True,  # 是否将短期对话状态保存到磁盘，重启后按需恢复
+    "conversation_state_dir": "conversations",  # 对话状态目录，相对于bot/data
+    "conversation_flush_interval": 5,  # 对话状态写盘间隔（秒）
     "context_switch_threshold": 0.2,
     "context_switch_min_messages": 5,
     "context_switch_analyze_count": 3,
@@ -138,6 +182,7 @@ DEFAULT_CONFIG = {
     # 机器人配置
     "bot_name": "AI助手",
     "soul_doc_path": "soul_doc/yuki.md",
+    "soul_doc_check_interval": 5,  # 检查灵魂文档是否修改的间隔（秒），0表示每次都检查
     
     # 目标配置
     "target_groups": [],
@@ -160,10 +205,22 @@ DEFAULT_CONFIG = {
     
     # 随机回复
     "random_threshold": 0.1,
+    "decision_coalesce_window_ms": 800,  # AI决策模式下合并同一群突发消息的等待窗口（毫秒），0表示不合并
+    # AI决策前先用本地特征预筛，明显的消息不请求决策模型。特征权重尚未用实际数据校准，默认关闭，
+    # 建议先开启影子模式并记录决策（decision_log_path），用 benchmarks.eval_prefilter 评估后再正式启用
+    "decision_prefilter_enabled": False,
+    "decision_prefilter_shadow": False,  # 影子模式：仍请求决策模型，只记录预筛结论用于评估
+    "decision_prefilter_yes_threshold": 0.9,  # 预筛分数不低于该值时直接回复
+    "decision_prefilter_no_threshold": 0.1,  # 预筛分数不高于该值时直接不回复
+    "decision_result_cache_enabled": True,  # 缓存回复决策结果，相同上下文下重复的消息不再请求决策模型
+    "decision_result_cache_ttl_seconds": 60,  # 决策缓存有效期（秒），机器人被@后同样时间内不使用缓存
+    "decision_result_cache_max_entries": 512,  # 决策缓存最多条目数
+    "decision_log_path": "",  # 决策记录文件（JSONL，相对data目录），空字符串表示不记录
     
     # 消息处理
     "max_message_length": 2000,
     "enable_at_reply": True,
+    "max_concurrent_conversations": 8,  # 同时处理的对话数上限，同一对话内的消息始终按顺序处理
     # 日志配置
     "log_max_length": 30,  # 日志输出最大长度，超过该长度用...省略
     
@@ -185,6 +242,10 @@ DEFAULT_CONFIG = {
     "napcat_ws_uri": "ws://localhost:3001",
     "webui_enabled": False,
     "webui_port": 6099,
+    "metrics_enabled": True,  # 在本地HTTP端口上以 Prometheus 文本格式导出各阶段耗时等指标（GET /metrics）
+    "metrics_host": "127.0.0.1",
+    "metrics_port": 9464,
+    "metrics_max_conversations": 200,  # 按对话统计的指标中最多区分的对话数，超出的计入 other
     "language": "en_us",  # 语言配置，如 zh_cn, en_us
     
     # AI决策提示词
@@ -227,6 +288,24 @@ class BotSettings:
     MODEL: str = CONFIG.get("model", DEFAULT_CONFIG["model"])
     DECISION_MODEL: str = CONFIG.get("decision_model", DEFAULT_CONFIG["decision_model"])
     BASE_URL: str = CONFIG.get("base_url", DEFAULT_CONFIG["base_url"])
+    MAX_CONCURRENT_REQUESTS: int = CONFIG.get("max_concurrent_requests", DEFAULT_CONFIG["max_concurrent_requests"])
+    MODEL_CALL_POLICIES: Dict[str, Dict[str, float]] = CONFIG.get("model_call_policies", DEFAULT_CONFIG["model_call_policies"])
+    RETRY_BASE_DELAY: float = CONFIG.get("retry_base_delay", DEFAULT_CONFIG["retry_base_delay"])
+    RETRY_MAX_DELAY: float = CONFIG.get("retry_max_delay", DEFAULT_CONFIG["retry_max_delay"])
+    CIRCUIT_BREAKER_THRESHOLD: int = CONFIG.get("circuit_breaker_threshold", DEFAULT_CONFIG["circuit_breaker_threshold"])
+    CIRCUIT_BREAKER_RESET_SECONDS: float = CONFIG.get("circuit_breaker_reset_seconds", DEFAULT_CONFIG["circuit_breaker_reset_seconds"])
+    CONTEXT_DELTA_ENABLED: bool = CONFIG.get("context_delta_enabled", DEFAULT_CONFIG["context_delta_enabled"])
+    CONTEXT_DELTA_MAX_TURNS: int = CONFIG.get("context_delta_max_turns", DEFAULT_CONFIG["context_delta_max_turns"])
+    CONTEXT_DELTA_MAX_AGE_HOURS: float = CONFIG.get("context_delta_max_age_hours", DEFAULT_CONFIG["context_delta_max_age_hours"])
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = CONFIG.get("context_token_budgets", DEFAULT_CONFIG["context_token_budgets"])
+    CONTEXT_MAX_MESSAGES: int = CONFIG.get("context_max_messages", DEFAULT_CONFIG["context_max_messages"])
+    MODEL_FALLBACKS: Dict[str, List[Any]] = CONFIG.get("model_fallbacks", DEFAULT_CONFIG["model_fallbacks"])
+    MODEL_HEDGE_MS: Dict[str, float] = CONFIG.get("model_hedge_ms", DEFAULT_CONFIG["model_hedge_ms"])
+    LATENCY_EWMA_ALPHA: float = CONFIG.get("latency_ewma_alpha", DEFAULT_CONFIG["latency_ewma_alpha"])
+    LATENCY_PROBE_SECONDS: float = CONFIG.get("latency_probe_seconds", DEFAULT_CONFIG["latency_probe_seconds"])
+    MODEL_RATE_LIMITS: Dict[str, Dict[str, float]] = CONFIG.get("model_rate_limits", DEFAULT_CONFIG["model_rate_limits"])
+    SCHEDULER_SHED_QUEUE_DEPTH: Dict[str, int] = CONFIG.get("scheduler_shed_queue_depth", DEFAULT_CONFIG["scheduler_shed_queue_depth"])
+    ENABLE_STREAMING: bool = CONFIG.get("enable_streaming", DEFAULT_CONFIG["enable_streaming"])
     
     # 模型配置 - Main model
     TEMPERATURE: float = CONFIG.get("temperature", DEFAULT_CONFIG["temperature"])
@@ -259,6 +338,8 @@ class BotSettings:
     SUMMARY_INTERVAL_HOURS: int = CONFIG.get("summary_interval_hours", DEFAULT_CONFIG["summary_interval_hours"])
     SUMMARY_SHORT_INTERVAL_MINUTES: int = CONFIG.get("summary_short_interval_minutes", DEFAULT_CONFIG["summary_short_interval_minutes"])
     SUMMARY_CHECK_FREQUENCY: int = CONFIG.get("summary_check_frequency", DEFAULT_CONFIG["summary_check_frequency"])
+    SUMMARY_MAX_CONCURRENCY: int = CONFIG.get("summary_max_concurrency", DEFAULT_CONFIG["summary_max_concurrency"])
+    SUMMARY_INCREMENTAL: bool = CONFIG.get("summary_incremental", DEFAULT_CONFIG["summary_incremental"])
     
     # 图片解读配置
     IMAGE_MODEL: str = CONFIG.get("image_model", DEFAULT_CONFIG["image_model"])
@@ -267,6 +348,14 @@ class BotSettings:
     IMAGE_MAX_TOKENS: Optional[int] = CONFIG.get("image_max_tokens", DEFAULT_CONFIG["image_max_tokens"])
     ENABLE_IMAGE_INTERPRETATION: bool = CONFIG.get("enable_image_interpretation", DEFAULT_CONFIG["enable_image_interpretation"])
     IMAGE_INTERPRETATION_PROBABILITY: float = CONFIG.get("image_interpretation_probability", DEFAULT_CONFIG["image_interpretation_probability"])
+    IMAGE_MAX_CONCURRENCY: int = CONFIG.get("image_max_concurrency", DEFAULT_CONFIG["image_max_concurrency"])
+    IMAGE_MAX_CONCURRENCY_PER_MESSAGE: int = CONFIG.get("image_max_concurrency_per_message", DEFAULT_CONFIG["image_max_concurrency_per_message"])
+    IMAGE_CACHE_ENABLED: bool = CONFIG.get("image_cache_enabled", DEFAULT_CONFIG["image_cache_enabled"])
+    IMAGE_CACHE_MAX_ENTRIES: int = CONFIG.get("image_cache_max_entries", DEFAULT_CONFIG["image_cache_max_entries"])
+    IMAGE_CACHE_TTL_HOURS: float = CONFIG.get("image_cache_ttl_hours", DEFAULT_CONFIG["image_cache_ttl_hours"])
+    image_cache_path = CONFIG.get("image_cache_path", DEFAULT_CONFIG["image_cache_path"])
+    IMAGE_CACHE_PATH: str = str(DATA_DIR / image_cache_path) if image_cache_path else ""
+    IMAGE_CACHE_HASH_CONTENT: bool = CONFIG.get("image_cache_hash_content", DEFAULT_CONFIG["image_cache_hash_content"])
     
     # AI决策提示词配置
     SHOULD_RESPOND_PROMPT_PATH: str = CONFIG.get("should_respond_prompt_path", DEFAULT_CONFIG["should_respond_prompt_path"])
@@ -278,6 +367,7 @@ class BotSettings:
     # 记忆配置
     SHORT_TERM_MEMORY_LIMIT: int = CONFIG.get("short_term_memory_limit", DEFAULT_CONFIG["short_term_memory_limit"])
     LONG_TERM_MEMORY_PATH: str = str(DATA_DIR / CONFIG.get("long_term_memory_path", DEFAULT_CONFIG["long_term_memory_path"]).replace("data/", ""))
+    LONG_TERM_MEMORY_BACKEND: str = CONFIG.get("long_term_memory_backend", DEFAULT_CONFIG["long_term_memory_backend"])
     
     # 灵魂文档路径
     soul_doc_path = CONFIG.get("soul_doc_path", DEFAULT_CONFIG["soul_doc_path"])
@@ -289,6 +379,7 @@ class BotSettings:
     else:
         # 默认处理，假设是相对于 bot/config/ 的路径
         SOUL_DOC_PATH: str = str(BASE_DIR / "bot" / "config" / soul_doc_path)
+    SOUL_DOC_CHECK_INTERVAL: float = CONFIG.get("soul_doc_check_interval", DEFAULT_CONFIG["soul_doc_check_interval"])
     
     # 回复模式配置
     RESPONSE_MODES = CONFIG.get("response_modes", DEFAULT_CONFIG["response_modes"])
@@ -296,10 +387,21 @@ class BotSettings:
     DEFAULT_RESPONSE_MODE: str = CONFIG.get("default_response_mode", DEFAULT_CONFIG["default_response_mode"])
     TRIGGER_KEYWORDS: List[str] = CONFIG.get("trigger_keywords", DEFAULT_CONFIG["trigger_keywords"])
     RANDOM_THRESHOLD: float = CONFIG.get("random_threshold", DEFAULT_CONFIG["random_threshold"])
+    DECISION_COALESCE_WINDOW_MS: int = CONFIG.get("decision_coalesce_window_ms", DEFAULT_CONFIG["decision_coalesce_window_ms"])
+    DECISION_PREFILTER_ENABLED: bool = CONFIG.get("decision_prefilter_enabled", DEFAULT_CONFIG["decision_prefilter_enabled"])
+    DECISION_PREFILTER_SHADOW: bool = CONFIG.get("decision_prefilter_shadow", DEFAULT_CONFIG["decision_prefilter_shadow"])
+    DECISION_PREFILTER_YES_THRESHOLD: float = CONFIG.get("decision_prefilter_yes_threshold", DEFAULT_CONFIG["decision_prefilter_yes_threshold"])
+    DECISION_PREFILTER_NO_THRESHOLD: float = CONFIG.get("decision_prefilter_no_threshold", DEFAULT_CONFIG["decision_prefilter_no_threshold"])
+    DECISION_RESULT_CACHE_ENABLED: bool = CONFIG.get("decision_result_cache_enabled", DEFAULT_CONFIG["decision_result_cache_enabled"])
+    DECISION_RESULT_CACHE_TTL_SECONDS: float = CONFIG.get("decision_result_cache_ttl_seconds", DEFAULT_CONFIG["decision_result_cache_ttl_seconds"])
+    DECISION_RESULT_CACHE_MAX_ENTRIES: int = CONFIG.get("decision_result_cache_max_entries", DEFAULT_CONFIG["decision_result_cache_max_entries"])
+    decision_log_path = CONFIG.get("decision_log_path", DEFAULT_CONFIG["decision_log_path"])
+    DECISION_LOG_PATH: str = str(DATA_DIR / decision_log_path) if decision_log_path else ""
     
     # 消息处理
     MAX_MESSAGE_LENGTH: int = CONFIG.get("max_message_length", DEFAULT_CONFIG["max_message_length"])
     ENABLE_AT_REPLY: bool = CONFIG.get("enable_at_reply", DEFAULT_CONFIG["enable_at_reply"])
+    MAX_CONCURRENT_CONVERSATIONS: int = CONFIG.get("max_concurrent_conversations", DEFAULT_CONFIG["max_concurrent_conversations"])
     # 日志配置
     LOG_MAX_LENGTH: int = CONFIG.get("log_max_length", DEFAULT_CONFIG["log_max_length"])
     
@@ -310,6 +412,9 @@ class BotSettings:
     
     # 上下文管理配置
     CONTEXT_TIMEOUT_HOURS: int = CONFIG.get("context_timeout_hours", DEFAULT_CONFIG["context_timeout_hours"])
+    CONVERSATION_PERSISTENCE_ENABLED: bool = CONFIG.get("conversation_persistence_enabled", DEFAULT_CONFIG["conversation_persistence_enabled"])
+    CONVERSATION_STATE_DIR: str = str(DATA_DIR / CONFIG.get("conversation_state_dir", DEFAULT_CONFIG["conversation_state_dir"]))
+    CONVERSATION_FLUSH_INTERVAL: float = CONFIG.get("conversation_flush_interval", DEFAULT_CONFIG["conversation_flush_interval"])
     CONTEXT_SWITCH_THRESHOLD: float = CONFIG.get("context_switch_threshold", DEFAULT_CONFIG["context_switch_threshold"])
     CONTEXT_SWITCH_MIN_MESSAGES: int = CONFIG.get("context_switch_min_messages", DEFAULT_CONFIG["context_switch_min_messages"])
     CONTEXT_SWITCH_ANALYZE_COUNT: int = CONFIG.get("context_switch_analyze_count", DEFAULT_CONFIG["context_switch_analyze_count"])
@@ -317,6 +422,9 @@ class BotSettings:
     # 长期记忆配置
     LONG_TERM_MEMORY_LIMIT: int = CONFIG.get("long_term_memory_limit", DEFAULT_CONFIG["long_term_memory_limit"])
     LONG_TERM_MEMORY_DEFAULT_IMPORTANCE: float = CONFIG.get("long_term_memory_default_importance", DEFAULT_CONFIG["long_term_memory_default_importance"])
+    LONG_TERM_MEMORY_FSYNC_BATCH: int = CONFIG.get("long_term_memory_fsync_batch", DEFAULT_CONFIG["long_term_memory_fsync_batch"])
+    LONG_TERM_MEMORY_FSYNC_INTERVAL: float = CONFIG.get("long_term_memory_fsync_interval", DEFAULT_CONFIG["long_term_memory_fsync_interval"])
+    LONG_TERM_MEMORY_COMPACT_THRESHOLD: int = CONFIG.get("long_term_memory_compact_threshold", DEFAULT_CONFIG["long_term_memory_compact_threshold"])
     
     # 对话线程配置
     THREAD_TIMEOUT_MINUTES: int = CONFIG.get("thread_timeout_minutes", DEFAULT_CONFIG["thread_timeout_minutes"])
@@ -358,6 +466,10 @@ class BotSettings:
     NAPCAT_WS_URI: str = CONFIG.get("napcat_ws_uri", DEFAULT_CONFIG["napcat_ws_uri"])
     WEBUI_ENABLED: bool = CONFIG.get("webui_enabled", DEFAULT_CONFIG["webui_enabled"])
     WEBUI_PORT: int = CONFIG.get("webui_port", DEFAULT_CONFIG["webui_port"])
+    METRICS_ENABLED: bool = CONFIG.get("metrics_enabled", DEFAULT_CONFIG["metrics_enabled"])
+    METRICS_HOST: str = CONFIG.get("metrics_host", DEFAULT_CONFIG["metrics_host"])
+    METRICS_PORT: int = CONFIG.get("metrics_port", DEFAULT_CONFIG["metrics_port"])
+    METRICS_MAX_CONVERSATIONS: int = CONFIG.get("metrics_max_conversations", DEFAULT_CONFIG["metrics_max_conversations"])
     # 语言配置
     LANGUAGE: str = CONFIG.get("language", DEFAULT_CONFIG["language"])
     
@@ -366,8 +478,33 @@ class BotSettings:
     def validate_config(cls):
         """验证配置有效性"""
         assert cls.MODEL, "模型名称不能为空"
+        assert cls.MAX_CONCURRENT_REQUESTS > 0, "最大并发请求数必须大于0"
+        for role, policy in cls.MODEL_CALL_POLICIES.items():
+            assert role in DEFAULT_CONFIG["model_call_policies"], f"未知的模型调用类型: {role}"
+            assert all(policy.get(key, 1) > 0 for key in ("timeout", "deadline")), f"{role} 调用时限必须大于0"
+            assert policy.get("max_retries", 0) >= 0, f"{role} 重试次数不能为负数"
+        assert cls.CIRCUIT_BREAKER_THRESHOLD > 0, "circuit_breaker_threshold必须大于0"
+        assert cls.CONTEXT_DELTA_MAX_TURNS > 0, "context_delta_max_turns必须大于0"
+        assert cls.CONTEXT_DELTA_MAX_AGE_HOURS > 0, "context_delta_max_age_hours必须大于0"
+        assert all(budget > 0 for budget in cls.CONTEXT_TOKEN_BUDGETS.values()), "context_token_budgets中的预算必须大于0"
+        assert cls.CONTEXT_MAX_MESSAGES > 0, "context_max_messages必须大于0"
+        for role in [*cls.MODEL_FALLBACKS, *cls.MODEL_HEDGE_MS]:
+            assert role in DEFAULT_CONFIG["model_call_policies"], f"未知的模型调用类型: {role}"
+        assert all(delay >= 0 for delay in cls.MODEL_HEDGE_MS.values()), "model_hedge_ms不能为负数"
+        assert 0 < cls.LATENCY_EWMA_ALPHA <= 1, "latency_ewma_alpha必须在(0, 1]之间"
+        assert cls.LATENCY_PROBE_SECONDS > 0, "latency_probe_seconds必须大于0"
+        for model, limits in cls.MODEL_RATE_LIMITS.items():
+            assert all(value > 0 for value in limits.values()), f"模型 {model} 的限速必须大于0"
+        for role in cls.SCHEDULER_SHED_QUEUE_DEPTH:
+            assert role in ("image", "summary"), f"只能丢弃 image 或 summary 请求，不能配置 {role}"
+        assert cls.MAX_CONCURRENT_CONVERSATIONS > 0, "最大并发对话数必须大于0"
+        assert cls.SUMMARY_MAX_CONCURRENCY > 0, "摘要并发数必须大于0"
         assert cls.SOUL_DOC_PATH and os.path.exists(cls.SOUL_DOC_PATH), "灵魂文档不存在"
         assert cls.RANDOM_THRESHOLD >= 0 and cls.RANDOM_THRESHOLD <= 1, "随机阈值必须在0-1之间"
+        assert cls.DECISION_COALESCE_WINDOW_MS >= 0, "decision_coalesce_window_ms不能为负数"
+        assert cls.DECISION_RESULT_CACHE_TTL_SECONDS > 0, "decision_result_cache_ttl_seconds必须大于0"
+        assert cls.DECISION_RESULT_CACHE_MAX_ENTRIES > 0, "decision_result_cache_max_entries必须大于0"
+        assert 0 <= cls.DECISION_PREFILTER_NO_THRESHOLD < cls.DECISION_PREFILTER_YES_THRESHOLD <= 1, "预筛阈值必须满足 0 <= no_threshold < yes_threshold <= 1"
         
         # 验证回复模式配置
         from bot.core.model import ResponseMode
@@ -386,6 +523,10 @@ class BotSettings:
         # 验证图片解读配置
         assert isinstance(cls.ENABLE_IMAGE_INTERPRETATION, bool), "图片解读开关必须是布尔类型"
         assert cls.IMAGE_INTERPRETATION_PROBABILITY >= 0 and cls.IMAGE_INTERPRETATION_PROBABILITY <= 1, "图片解读概率必须在0-1之间"
+        assert cls.IMAGE_MAX_CONCURRENCY > 0, "image_max_concurrency必须大于0"
+        assert cls.IMAGE_MAX_CONCURRENCY_PER_MESSAGE > 0, "image_max_concurrency_per_message必须大于0"
+        assert cls.IMAGE_CACHE_MAX_ENTRIES > 0, "image_cache_max_entries必须大于0"
+        assert cls.IMAGE_CACHE_TTL_HOURS > 0, "image_cache_ttl_hours必须大于0"
         
         # 验证昵称-地址映射表配置
         assert isinstance(cls.NICKNAME_ADDRESS_MAPPING, dict), "昵称-地址映射表必须是字典类型"
@@ -414,6 +555,13 @@ class BotSettings:
         assert isinstance(cls.ENABLE_NICKNAME_ADDRESS_INJECTION, bool), "enable_nickname_address_injection必须是布尔类型"
         assert cls.NICKNAME_ADDRESS_INJECTION_POSITION in ["top", "bottom"], "nickname_address_injection_position必须是'top'或'bottom'"
         
+        # 验证指标配置
+        assert 0 < cls.METRICS_PORT < 65536, "metrics_port必须在1-65535之间"
+        assert cls.METRICS_MAX_CONVERSATIONS > 0, "metrics_max_conversations必须大于0"
+        
+        assert cls.SOUL_DOC_CHECK_INTERVAL >= 0, "soul_doc_check_interval不能为负数"
+        assert cls.LONG_TERM_MEMORY_BACKEND in ["json", "sqlite"], "long_term_memory_backend必须是'json'或'sqlite'"
+        
         # 确保长期记忆目录存在
         os.makedirs(os.path.dirname(cls.LONG_TERM_MEMORY_PATH), exist_ok=True)
         
@@ -3,7 +3,9 @@
 from .ai_client import AIClient, AIResponse
 from .api_key import API_KEY
 from .conversation_manager import ConversationManager
+from .dispatcher import ConversationDispatcher
 from .memory import MemoryManager
+from .summary_scheduler import SummaryScheduler
 from .model import Message, Content, ApiModel, ROLE_TYPE, ABILITY, EFFORT
 from .tracker import TargetTracker, ResponseMode, UserInfo
 
@@ -15,8 +17,10 @@ __all__ = [
     'API_KEY',
     # Conversation Management
     'ConversationManager',
+    'ConversationDispatcher',
     # Memory Management
     'MemoryManager',
+    'SummaryScheduler',
     # Model Classes
     'Message',
     'Content',
@@ -1,18 +1,32 @@
 # core/ai_client.py
 import asyncio
+import hashlib
 import re
+import time
 import traceback
 from datetime import datetime
-from typing import Dict, Optional, Tuple, List
+from collections import Counter
+from datetime import timedelta
+from typing import AsyncIterator, Dict, Optional, Tuple, List
 from dataclasses import dataclass
 
-from volcenginesdkarkruntime import Ark
+import httpx
+from volcenginesdkarkruntime import AsyncArk
+from volcenginesdkarkruntime._exceptions import ArkBadRequestError, ArkNotFoundError
 from ncatbot.utils import get_log
 from bot.core.conversation_manager import ConversationManager
 from bot.core.model import Content, Message, ApiModel, ROLE_TYPE, ABILITY, EFFORT
 from bot.core.api_key import get_api_key, get_masked_api_key
 from bot.config.settings import BotSettings
-from bot.core.memory import MemoryManager
+from bot.core.memory import Conversation, MemoryManager
+from bot.core.image_cache import ImageInterpretationCache
+from bot.core.decision_cache import DecisionCache
+from bot.core.metrics import metrics
+from bot.core.context_assembler import ContextAssembler, context_budget, estimate_message_tokens
+from bot.core.resilience import ResilientCaller, CallPolicy, CircuitOpenError, iterate_with_timeout
+from bot.core.scheduler import RequestScheduler, estimate_tokens
+from bot.core.router import ModelRouter
+from bot.core.summary_scheduler import SummaryScheduler
 from bot.core.language_manager import language_manager
 
 logger = get_log("AIClient")
@@ -25,17 +39,112 @@ class AIResponse:
     response_id: Optional[str] = None
     contains_memory_tag: bool = False
     memory_content: Optional[str] = None
+    interrupted: bool = False  # 流式回复中途失败，content 只包含失败前已发出的行
+
+
+# 长期记忆标记：（开始标记, 结束标记）
+MEMORY_TAGS = (("【长期记忆】", "【/长期记忆】"), ("[长期记忆]", "[/长期记忆]"))
+_MEMORY_TAG_PATTERNS = [re.compile(re.escape(start) + ".+?" + re.escape(end), re.DOTALL) for start, end in MEMORY_TAGS]
+
+
+def strip_memory_tags(text: str) -> str:
+    """移除文本中的长期记忆标记及其内容"""
+    for pattern in _MEMORY_TAG_PATTERNS:
+        text = pattern.sub("", text)
+    return text
+
+
+class ReplyLineSplitter:
+    """把流式增量文本切分为完整的行
+
+    收到换行符时返回之前已完整的行；长期记忆标记尚未闭合时暂不输出，
+    避免把标记内容发送给用户。
+    """
+
+    def __init__(self, strip_tags: bool = True):
+        self.strip_tags = strip_tags
+        self._buffer = ""
+
+    def _has_open_tag(self) -> bool:
+        return any(self._buffer.count(start) > self._buffer.count(end) for start, end in MEMORY_TAGS)
+
+    def _split(self, text: str) -> List[str]:
+        if self.strip_tags:
+            text = strip_memory_tags(text)
+        return text.splitlines()
+
+    def feed(self, delta: str) -> List[str]:
+        """追加增量文本，返回新完成的行"""
+        self._buffer += delta
+        if "\n" not in delta or (self.strip_tags and self._has_open_tag()):
+            return []
+        completed, _, self._buffer = self._buffer.rpartition("\n")
+        return self._split(completed)
+
+    def close(self) -> List[str]:
+        """流结束，返回剩余的内容"""
+        text, self._buffer = self._buffer, ""
+        return self._split(text)
+
+
+class ResponseStream:
+    """流式回复
+
+    异步迭代得到已生成完整的回复行，迭代结束后 ``response`` 为完整的 AIResponse。
+    """
+
+    def __init__(self):
+        self.response: Optional[AIResponse] = None
+        self._lines: Optional[AsyncIterator[str]] = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._lines
 
 
 class AIClient:
     """AI客户端"""
     
     def __init__(self):
-        self.client = Ark(
+        # 使用异步客户端，避免模型调用阻塞事件循环；连接池大小限制并发请求数
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=BotSettings.MAX_CONCURRENT_REQUESTS,
+                max_keepalive_connections=BotSettings.MAX_CONCURRENT_REQUESTS,
+            ),
+            timeout=httpx.Timeout(timeout=600.0, connect=60.0),
+            follow_redirects=True,
+        )
+        # 重试由 ResilientCaller 统一处理，关闭SDK自带的重试避免重试次数相乘
+        self.client = AsyncArk(
             base_url=BotSettings.BASE_URL,
             api_key=get_api_key(),
+            http_client=self.http_client,
+            max_retries=0,
         )
+        # 所有模型请求按优先级排队限速，@回复优先于决策、图片解读与后台摘要
+        self.scheduler = RequestScheduler.from_settings()
+        self.caller = ResilientCaller(BotSettings.CIRCUIT_BREAKER_THRESHOLD, BotSettings.CIRCUIT_BREAKER_RESET_SECONDS, self.scheduler)
+        # 每类调用在主模型与后备模型间按健康状况和延迟路由
+        self.router = ModelRouter(self.caller, BotSettings.LATENCY_EWMA_ALPHA, BotSettings.LATENCY_PROBE_SECONDS)
         self.memory_manager = MemoryManager()
+        # 图片解读缓存：重复的图片/表情包直接复用之前的解读
+        self.image_cache = ImageInterpretationCache(
+            max_entries=BotSettings.IMAGE_CACHE_MAX_ENTRIES,
+            ttl_seconds=BotSettings.IMAGE_CACHE_TTL_HOURS * 3600,
+            persist_path=BotSettings.IMAGE_CACHE_PATH or None,
+        ) if BotSettings.IMAGE_CACHE_ENABLED else None
+        # 回复决策缓存：相同上下文下重复出现的消息直接复用之前的决策
+        self.decision_cache = DecisionCache(
+            max_entries=BotSettings.DECISION_RESULT_CACHE_MAX_ENTRIES,
+            ttl_seconds=BotSettings.DECISION_RESULT_CACHE_TTL_SECONDS,
+        ) if BotSettings.DECISION_RESULT_CACHE_ENABLED else None
+        # 所有消息共享的图片解读并发上限
+        self.image_semaphore = asyncio.Semaphore(BotSettings.IMAGE_MAX_CONCURRENCY)
+        # 请求上下文统计：主模型增量/完整请求次数、发送的消息数与服务端统计的输入token数，
+        # 以及各调用类型拼装的上下文token数与因预算舍弃的部分
+        self.context_stats = Counter()
+        # 摘要在后台生成，不阻塞回复
+        self.summary_scheduler = SummaryScheduler(self.memory_manager, self, BotSettings.SUMMARY_MAX_CONCURRENCY)
         
     def _get_conversation_key(self, user_info: dict, group_id: Optional[str] = None) -> str:
         """获取对话键名"""
@@ -43,14 +152,18 @@ class AIClient:
             return f"group_{group_id}"
         return f"user_{user_info['user_id']}"
     
-    async def get_response(
-        self, 
-        message: str, 
-        user_info: dict, 
-        group_id: Optional[str] = None,
-        bot_api = None
-    ) -> AIResponse:
-        """获取AI响应"""
+    async def _prepare_request(
+        self,
+        message: str,
+        user_info: dict,
+        group_id: Optional[str],
+        bot_api,
+        stream: bool = False
+    ) -> Tuple[str, Conversation, Dict, Optional[str]]:
+        """获取历史记录、记录用户消息并构建API请求
+
+        返回对话键名、对话、请求参数和上下文指纹（见 _build_request）。
+        """
         # 获取对话键名
         conv_key = self._get_conversation_key(user_info, group_id)
         conv = self.memory_manager.get_conversation(conv_key)
@@ -63,18 +176,20 @@ class AIClient:
             is_new_session = len(self.memory_manager.get_messages(conv_key)) == 0
             if is_new_session and BotSettings.HISTORY_RETRIEVAL_ON_NEW_SESSION:
                 need_history = True
-            elif BotSettings.HISTORY_RETRIEVAL_ON_FIRST_MESSAGE:
+            elif BotSettings.HISTORY_RETRIEVAL_ON_FIRST_MESSAGE and not conv.history_retrieved:
+                # 已获取过历史记录的对话（包括从磁盘恢复的对话）不再重复获取
                 need_history = True
         
         # 获取历史记录
         if need_history and bot_api:
             try:
-                await self._fetch_and_integrate_history(
-                    bot_api=bot_api,
-                    user_info=user_info,
-                    group_id=group_id,
-                    conv_key=conv_key
-                )
+                with metrics.stage("history_fetch"):
+                    await self._fetch_and_integrate_history(
+                        bot_api=bot_api,
+                        user_info=user_info,
+                        group_id=group_id,
+                        conv_key=conv_key
+                    )
             except Exception as e:
                 logger.error(language_manager.get("error.history_retrieval_failed", error=str(e)))
         
@@ -88,22 +203,63 @@ class AIClient:
             role=ROLE_TYPE.USER
         )
         
-        # 添加用户消息到记忆
+        # 添加用户消息到记忆，有变更的对话状态由后台任务定期写盘
         self.memory_manager.add_message(conv_key, user_message)
+        self.memory_manager.start_flusher()
         
-        # 获取对话历史
-        history_messages = self.memory_manager.get_messages(conv_key, limit=10)
-        
-        # 构建请求消息：每次对话前都添加系统提示词
-        # 构建系统提示词
-        system_message = self.memory_manager.build_system_prompt(conv_key, is_group)
-        messages = [system_message] + history_messages
-        
-        # 定期检查并生成对话摘要（每N条消息检查一次，N由配置指定）
+        # 定期检查需要摘要的对话（每N条消息检查一次，N由配置指定），交给后台调度器生成
         if BotSettings.SUMMARY_ENABLED:
             conv = self.memory_manager.get_conversation(conv_key)
-            if len(conv.global_messages) % BotSettings.SUMMARY_CHECK_FREQUENCY == 0:
-                await self.memory_manager.check_and_generate_summaries(self)
+            if conv.message_count % BotSettings.SUMMARY_CHECK_FREQUENCY == 0:
+                self.summary_scheduler.schedule_due()
+        
+        with metrics.stage("prompt_build"):
+            apimodel, fingerprint = self._build_request(conv_key, conv, is_group, stream)
+        return conv_key, conv, apimodel, fingerprint
+    
+    @staticmethod
+    def _context_fingerprint(system_message: Message, conv: Conversation) -> str:
+        """系统提示词与摘要的指纹，变化时 response_id 链中的上下文已过时"""
+        return hashlib.sha1(f"{system_message.content.msg}\x00{conv.summary or ''}".encode("utf-8")).hexdigest()
+    
+    def _context_delta(self, conv: Conversation, fingerprint: str) -> Optional[List[Message]]:
+        """response_id 链有效时返回上次回复之后新增的消息，需要重新发送完整上下文时返回None"""
+        if not BotSettings.CONTEXT_DELTA_ENABLED or not conv.response_id or conv.response_watermark is None:
+            return None
+        # 系统提示词或摘要已变化、链过长或可能已在服务端过期
+        if conv.response_fingerprint != fingerprint:
+            return None
+        if conv.response_chain_turns >= BotSettings.CONTEXT_DELTA_MAX_TURNS:
+            return None
+        if conv.response_chain_started and datetime.now() - conv.response_chain_started > timedelta(hours=BotSettings.CONTEXT_DELTA_MAX_AGE_HOURS):
+            return None
+        new_count = conv.message_count - conv.response_watermark
+        if new_count <= 0 or new_count > len(conv.global_messages):
+            return None
+        return list(conv.global_messages.window(new_count))
+    
+    def _build_request(self, conv_key: str, conv: Conversation, is_group: bool, stream: bool = False) -> Tuple[Dict, Optional[str]]:
+        """构建主模型请求
+
+        response_id 链有效时只发送上次回复之后新增的消息（增量请求，返回的指纹为None）；
+        否则在token预算内拼装系统提示词、摘要、长期记忆与最近的消息，并开始一条新链（返回新上下文的指纹）。
+        关闭 context_delta_enabled 时保持原来的方式：同时发送完整上下文与 previous_response_id。
+        """
+        budget = context_budget("main")
+        context, assembler = self.memory_manager.assemble_context(conv_key, is_group, budget)
+        fingerprint = self._context_fingerprint(context[0], conv)
+        delta = self._context_delta(conv, fingerprint)
+        if delta is not None:
+            # 增量消息同样受预算与消息数上限限制，最新一条必定发送
+            assembler = ContextAssembler(budget)
+            assembler.require("delta", estimate_message_tokens(delta[-1]))
+            messages = [*assembler.pack_recent("delta", delta[:-1], limit=BotSettings.CONTEXT_MAX_MESSAGES - 1), delta[-1]]
+            previous_response_id = conv.response_id
+            fingerprint = None
+        else:
+            messages = context
+            previous_response_id = None if BotSettings.CONTEXT_DELTA_ENABLED else conv.response_id
+        self._record_context("main", assembler)
         
         # 构建API请求
         # 只在支持的情况下使用reasoning参数
@@ -112,7 +268,7 @@ class AIClient:
         apimodel = ApiModel(
             model=BotSettings.MODEL,
             messages=messages,
-            previous_response_id=conv.response_id,
+            previous_response_id=previous_response_id,
             thinking=ABILITY.ENABLED,
             temperature=BotSettings.TEMPERATURE,
             reasoning=reasoning_value,
@@ -123,49 +279,193 @@ class AIClient:
             presence_penalty=BotSettings.PRESENCE_PENALTY,
             frequency_penalty=BotSettings.FREQUENCY_PENALTY,
             stop=BotSettings.STOP,
+            stream=stream,
         ).export
         
+        return apimodel, fingerprint
+    
+    def _record_context(self, role: str, assembler: ContextAssembler) -> None:
+        """记录一次请求拼装的上下文token数"""
+        self.context_stats[f"{role}_assembled_requests"] += 1
+        self.context_stats[f"{role}_assembled_tokens"] += assembler.tokens
+        self.context_stats[f"{role}_max_assembled_tokens"] = max(self.context_stats[f"{role}_max_assembled_tokens"], assembler.tokens)
+        for part, count in assembler.dropped.items():
+            self.context_stats[f"{role}_dropped_{part}"] += count
+        if assembler.overflow:
+            logger.warning(f"{role} 请求的必需上下文已超出预算: {assembler.describe()}")
+        else:
+            logger.debug(f"{role} 请求上下文: {assembler.describe()}")
+    
+    async def _create_main(self, conv_key: str, conv: Conversation, is_group: bool, apimodel: Dict, fingerprint: Optional[str], stream: bool = False):
+        """发起主模型请求，返回响应（或事件流）、实际使用的请求参数、上下文指纹和应答的模型
+
+        带 previous_response_id 的请求只发给生成上次回复的模型，不对冲也不换模型；
+        response_id 链已失效（服务端过期等）或该模型已熔断时丢弃链，用完整上下文重试一次。
+        流式请求不并发对冲。
+        """
+        served = {}
+        
+        async def request(model: str):
+            response = await self.client.responses.create(**{**apimodel, "model": model})
+            served["model"] = model
+            return response
+        
+        async def create():
+            pinned = (conv.response_model or self.router.candidates("main")[0]) if "previous_response_id" in apimodel else None
+            with metrics.stage("main_model"):
+                return await self.router.call("main", request, estimate_tokens(apimodel), hedge=not stream, model=pinned)
+        
+        try:
+            return await create(), apimodel, fingerprint, served.get("model")
+        except (ArkBadRequestError, ArkNotFoundError, CircuitOpenError) as e:
+            # 生成上次回复的模型已熔断时同样放弃链，完整上下文可以发给其他模型
+            if "previous_response_id" not in apimodel:
+                raise
+            logger.warning(f"response_id 链失效（{e}），重新发送完整上下文")
+            self.context_stats["broken_chains"] += 1
+            conv.reset_response_chain()
+            apimodel, fingerprint = self._build_request(conv_key, conv, is_group, stream)
+            return await create(), apimodel, fingerprint, served.get("model")
+    
+    def _advance_response_chain(self, conv_key: str, conv: Conversation, apimodel: Dict, fingerprint: Optional[str], usage) -> None:
+        """回复存入记忆后更新 response_id 链的水位，并记录本次请求的上下文统计"""
+        mode = "full" if fingerprint is not None or not BotSettings.CONTEXT_DELTA_ENABLED else "delta"
+        input_tokens = getattr(usage, "input_tokens", None) or 0
+        self.context_stats[f"{mode}_turns"] += 1
+        self.context_stats[f"{mode}_messages"] += len(apimodel["input"])
+        self.context_stats[f"{mode}_input_tokens"] += input_tokens
+        logger.debug(f"主模型请求: {mode}，发送 {len(apimodel['input'])} 条消息，输入 {input_tokens} tokens")
+        
+        if not BotSettings.CONTEXT_DELTA_ENABLED or not conv.response_id:
+            return
+        conv.response_watermark = conv.message_count
+        if fingerprint is None:
+            conv.response_chain_turns += 1
+        else:
+            conv.response_fingerprint = fingerprint
+            conv.response_chain_turns = 0
+            conv.response_chain_started = datetime.now()
+        self.memory_manager.mark_dirty(conv_key)
+    
+    def _complete_reply(self, conv_key: str, group_id: Optional[str], reply_text: str) -> AIResponse:
+        """处理完整的回复：提取长期记忆标记并将回复存入记忆"""
+        # 检查是否包含长期记忆标记
+        memory_content = None
+        if group_id is not None:
+            memory_content = self.memory_manager.long_term_memory.extract_memory_tags(reply_text)
+            if memory_content:
+                self.memory_manager.long_term_memory.add_memory(group_id, memory_content)
+                # 从回复中移除标记
+                reply_text = strip_memory_tags(reply_text).strip()
+        
+        # 添加AI回复到记忆
+        # 添加时间戳，格式：2025-12-19/22:45
+        current_time = datetime.now().strftime('%Y-%m-%d/%H:%M')
+        ai_message = Message(
+            content=Content(f"{BotSettings.BOT_NAME}[{current_time}]: {reply_text}"),
+            role=ROLE_TYPE.ASSIST
+        )
+        self.memory_manager.add_message(conv_key, ai_message)
+        
+        return AIResponse(
+            content=reply_text,
+            response_id=self.memory_manager.get_conversation(conv_key).response_id,
+            contains_memory_tag=memory_content is not None,
+            memory_content=memory_content
+        )
+    
+    async def get_response(
+        self, 
+        message: str, 
+        user_info: dict, 
+        group_id: Optional[str] = None,
+        bot_api = None
+    ) -> AIResponse:
+        """获取AI响应"""
+        conv_key, conv, apimodel, fingerprint = await self._prepare_request(message, user_info, group_id, bot_api)
+        
         try:
             # 调用AI接口
-            response = self.client.responses.create(**apimodel)
+            response, apimodel, fingerprint, model = await self._create_main(conv_key, conv, group_id is not None, apimodel, fingerprint)
             
             # 更新response_id
             conv.response_id = response.id # type: ignore
+            conv.response_model = model
             
             # 提取回复内容
             reply_text = self._extract_reply_text(response)
             
-            # 检查是否包含长期记忆标记
-            memory_content = None
-            if is_group:
-                memory_content = self.memory_manager.long_term_memory.extract_memory_tags(reply_text)
-                if memory_content:
-                    self.memory_manager.long_term_memory.add_memory(group_id, memory_content)
-                    # 从回复中移除标记
-                    for pattern in [r"【长期记忆】.+?【/长期记忆】", r"\[长期记忆\].+?\[/长期记忆\]"]:
-                        reply_text = re.sub(pattern, "", reply_text, flags=re.DOTALL)
-                    reply_text = reply_text.strip()
-            
-            # 添加AI回复到记忆
-            # 添加时间戳，格式：2025-12-19/22:45
-            current_time = datetime.now().strftime('%Y-%m-%d/%H:%M')
-            ai_message = Message(
-                content=Content(f"{BotSettings.BOT_NAME}[{current_time}]: {reply_text}"),
-                role=ROLE_TYPE.ASSIST
-            )
-            self.memory_manager.add_message(conv_key, ai_message)
-            
-            return AIResponse(
-                content=reply_text,
-                response_id=conv.response_id,
-                contains_memory_tag=memory_content is not None,
-                memory_content=memory_content
-            )
+            reply = self._complete_reply(conv_key, group_id, reply_text)
+            self._advance_response_chain(conv_key, conv, apimodel, fingerprint, getattr(response, "usage", None))
+            return reply
             
         except Exception as e:
             logger.error(language_manager.get("error.ai_call_failed", error=str(e)))
             return AIResponse(content=language_manager.get("error.ai_unavailable"))
     
+    def stream_response(
+        self,
+        message: str,
+        user_info: dict,
+        group_id: Optional[str] = None,
+        bot_api = None
+    ) -> "ResponseStream":
+        """以流式方式获取AI响应，逐行返回已生成完整的回复行"""
+        stream = ResponseStream()
+        stream._lines = self._stream_lines(stream, message, user_info, group_id, bot_api)
+        return stream
+    
+    async def _stream_lines(
+        self,
+        stream: "ResponseStream",
+        message: str,
+        user_info: dict,
+        group_id: Optional[str],
+        bot_api
+    ) -> AsyncIterator[str]:
+        conv_key, conv, apimodel, fingerprint = await self._prepare_request(message, user_info, group_id, bot_api, stream=True)
+        splitter = ReplyLineSplitter(strip_tags=group_id is not None)
+        parts = []
+        sent_lines = []
+        response_id = None
+        usage = None
+        
+        try:
+            # 只有建立流之前的失败会重试，已发出的行无法撤回
+            events, apimodel, fingerprint, model = await self._create_main(conv_key, conv, group_id is not None, apimodel, fingerprint, stream=True)
+            async for event in iterate_with_timeout(events, CallPolicy.for_role("main").timeout):
+                if event.type == "response.output_text.delta":
+                    parts.append(event.delta)
+                    for line in splitter.feed(event.delta):
+                        sent_lines.append(line)
+                        yield line
+                elif event.type in ("response.created", "response.completed"):
+                    response_id = event.response.id
+                    usage = event.response.usage or usage
+                elif event.type in ("response.failed", "response.incomplete", "error"):
+                    raise RuntimeError(f"流式响应异常结束: {event.type}")
+            for line in splitter.close():
+                sent_lines.append(line)
+                yield line
+        except Exception as e:
+            logger.error(language_manager.get("error.ai_call_failed", error=str(e)))
+            if not sent_lines:
+                stream.response = AIResponse(content=language_manager.get("error.ai_unavailable"))
+                return
+            # 已发出的行存入记忆，保证下次请求的上下文与群里看到的一致；
+            # 服务端的响应不完整，丢弃 response_id 链，下次请求重新发送完整上下文
+            conv.reset_response_chain()
+            self.memory_manager.mark_dirty(conv_key)
+            stream.response = self._complete_reply(conv_key, group_id, "\n".join(sent_lines).strip())
+            stream.response.interrupted = True
+            return
+        
+        # 更新response_id
+        conv.response_id = response_id
+        conv.response_model = model
+        stream.response = self._complete_reply(conv_key, group_id, "".join(parts).strip())
+        self._advance_response_chain(conv_key, conv, apimodel, fingerprint, usage)
+    
     async def _fetch_and_integrate_history(self, bot_api, user_info: dict, group_id: Optional[str], conv_key: str):
         """获取并整合历史记录"""
         is_group = group_id is not None
@@ -249,9 +549,10 @@ class AIClient:
             # 将历史记录添加到记忆管理器
             for msg in filtered_messages:
                 self.memory_manager.add_message(conv_key, msg)
+            self.memory_manager.get_conversation(conv_key).history_retrieved = True
             
-            # 在获取历史记录后生成对话摘要
-            await self.memory_manager.generate_conversation_summary(conv_key, self)
+            # 在获取历史记录后安排生成对话摘要
+            self.summary_scheduler.schedule(conv_key)
             
             logger.info(language_manager.get("info.history_integrated", count=len(filtered_messages)))
             
@@ -269,9 +570,14 @@ class AIClient:
         message: str, 
         user_info: dict, 
         group_id: Optional[str] = None,
-        conversation_history: List[Message] = None
+        conversation_history: List[Message] = None,
+        use_cache: bool = True
     ) -> bool:
-        """询问AI是否应该回复当前消息"""
+        """询问AI是否应该回复当前消息
+
+        use_cache 为False时不读取决策缓存（例如机器人刚被@过，上下文已经变化），
+        但仍会写入本次的决策结果。
+        """
         conversation_history = conversation_history or []
         
         # 获取对话键名
@@ -292,9 +598,21 @@ class AIClient:
             role=ROLE_TYPE.USER
         )
         
-        # 构建请求消息列表，包含历史上下文和当前消息
-        limit = min(BotSettings.HISTORY_RETRIEVAL_LIMIT, len(conversation_history))
-        messages = [decision_prompt] + conversation_history[-limit:] + [user_msg]
+        # 构建请求消息列表：决策提示词与当前消息必定发送，历史上下文从最新的开始在预算内放入
+        assembler = ContextAssembler(context_budget("decision"))
+        assembler.require("system", estimate_message_tokens(decision_prompt))
+        assembler.require("message", estimate_message_tokens(user_msg))
+        context = assembler.pack_recent("history", conversation_history)
+        messages = [decision_prompt] + context + [user_msg]
+        
+        cache_key = None
+        if self.decision_cache is not None:
+            cache_key = self.decision_cache.make_key(message, context)
+            if use_cache:
+                cached = self.decision_cache.get(cache_key)
+                if cached is not None:
+                    logger.debug(f"回复决策命中缓存: {cached}，命中率 {self.decision_cache.hit_rate:.1%}")
+                    return cached
         
         # 构建API请求
         # 只在支持的情况下使用reasoning参数
@@ -313,22 +631,28 @@ class AIClient:
             stop=BotSettings.DECISION_STOP,
         ).export
         
+        self._record_context("decision", assembler)
+        
         try:
             # 调用AI接口
-            response = self.client.responses.create(**apimodel)
+            with metrics.stage("decision"):
+                response = await self.router.call("decision", lambda model: self.client.responses.create(**{**apimodel, "model": model}), estimate_tokens(apimodel))
             
             # 提取回复内容
             reply_text = self._extract_reply_text(response).strip().upper()
             
             # 返回判断结果
-            return reply_text == "YES"
+            decision = reply_text == "YES"
+            if cache_key is not None:
+                self.decision_cache.set(cache_key, decision)
+            return decision
         except Exception as e:
             logger.error(language_manager.get("error.ai_decision_failed", error=str(e)))
             # 失败时默认不回复
             return False
     
-    async def generate_summary(self, messages: List[Message]) -> str:
-        """生成聊天信息摘要"""
+    async def generate_summary(self, messages: List[Message], previous_summary: Optional[str] = None) -> str:
+        """生成聊天信息摘要，提供已有摘要时只需将新消息合并进去"""
         # 如果摘要系统未启用，返回空字符串
         if not BotSettings.SUMMARY_ENABLED:
             logger.debug(language_manager.get("debug.summary_system_disabled"))
@@ -342,13 +666,22 @@ class AIClient:
             logger.debug(f"  {i}. {msg.content.msg[:50]}...")
         
         # 构建摘要提示词
-        summary_prompt = Message(
-            content=Content("你是一个智能对话助手，需要对以下聊天记录进行摘要。请用简洁明了的语言概括聊天的主要内容和关键信息，确保可以分清不同用户的发言，不要添加任何主观评论或解释。"),
-            role=ROLE_TYPE.SYSTEM
-        )
-        
-        # 构建请求消息列表
-        prompt_messages = [summary_prompt] + messages
+        if previous_summary:
+            summary_prompt = Message(
+                content=Content("你是一个智能对话助手，需要更新一份聊天记录摘要。下面先给出已有摘要，随后是摘要之后的新聊天记录。请将新内容合并进已有摘要，输出一份完整的新摘要，用简洁明了的语言概括聊天的主要内容和关键信息，确保可以分清不同用户的发言，不要添加任何主观评论或解释。"),
+                role=ROLE_TYPE.SYSTEM
+            )
+            previous_message = Message(
+                content=Content(f"[已有摘要] {previous_summary}"),
+                role=ROLE_TYPE.SYSTEM
+            )
+            prompt_messages = [summary_prompt, previous_message] + list(messages)
+        else:
+            summary_prompt = Message(
+                content=Content("你是一个智能对话助手，需要对以下聊天记录进行摘要。请用简洁明了的语言概括聊天的主要内容和关键信息，确保可以分清不同用户的发言，不要添加任何主观评论或解释。"),
+                role=ROLE_TYPE.SYSTEM
+            )
+            prompt_messages = [summary_prompt] + list(messages)
         
         # 构建API请求
         apimodel = ApiModel(
@@ -363,7 +696,7 @@ class AIClient:
         
         try:
             # 调用AI接口
-            response = self.client.responses.create(**apimodel)
+            response = await self.router.call("summary", lambda model: self.client.responses.create(**{**apimodel, "model": model}), estimate_tokens(apimodel))
             
             # 提取回复内容
             summary = self._extract_reply_text(response).strip()
@@ -378,19 +711,67 @@ class AIClient:
             traceback.print_exc()
             return ""
     
+    async def interpret_images(
+        self,
+        images: List[dict],
+        text_content: str = "",
+        user_info: dict = None
+    ) -> List[AIResponse]:
+        """并发解读一条消息中的多张图片，结果按images的顺序返回
+
+        单条消息最多同时解读 IMAGE_MAX_CONCURRENCY_PER_MESSAGE 张，
+        所有消息合计不超过 IMAGE_MAX_CONCURRENCY 张。
+        """
+        message_semaphore = asyncio.Semaphore(BotSettings.IMAGE_MAX_CONCURRENCY_PER_MESSAGE)
+        
+        async def interpret(img: dict) -> AIResponse:
+            async with message_semaphore, self.image_semaphore:
+                with metrics.stage("image_interpretation"):
+                    return await self.get_image_response(
+                        image_url=img['url'],
+                        text_content=text_content,
+                        user_info=user_info,
+                        image_file=img.get('file')
+                    )
+        
+        return list(await asyncio.gather(*(interpret(img) for img in images)))
+    
+    async def _image_cache_key(self, image_url: str, image_file: Optional[str]) -> Optional[str]:
+        """获取图片缓存键：按配置使用图片内容哈希或图片段的file标识"""
+        if BotSettings.IMAGE_CACHE_HASH_CONTENT:
+            try:
+                response = await self.http_client.get(image_url)
+                response.raise_for_status()
+                return f"sha256:{hashlib.sha256(response.content).hexdigest()}"
+            except httpx.HTTPError as e:
+                logger.warning(f"下载图片计算哈希失败，改用file标识: {e}")
+        return f"file:{image_file}" if image_file else None
+    
     async def get_image_response(
         self,
         image_url: str,
         text_content: str = "",
-        user_info: dict = None
+        user_info: dict = None,
+        image_file: Optional[str] = None
     ) -> AIResponse:
-        """获取图片解读的AI响应"""
+        """获取图片解读的AI响应
+
+        image_file 为图片段的file标识，启用缓存时用作缓存键。
+        """
+        cache_key = await self._image_cache_key(image_url, image_file) if self.image_cache is not None else None
+        if cache_key:
+            cached = self.image_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"图片解读缓存命中: 命中率 {self.image_cache.hit_rate:.1%}, 累计节省 {self.image_cache.saved_seconds:.1f} 秒")
+                return AIResponse(content=cached)
+        
         try:
+            start_time = time.monotonic()
             user_question = "请解读此图片，如果你认为这是一个表情包图片，请强调其表达的情绪或者状态，不要超过30字；若认为只是普通图片，请直接解读内容，不要超过100字"
             
             # 直接调用API，使用图片解读模型
-            response = self.client.responses.create(
-                model=BotSettings.IMAGE_MODEL,
+            response = await self.router.call("image", lambda model: self.client.responses.create(
+                model=model,
                 input=[
                     {
                         "role": "user",
@@ -406,7 +787,7 @@ class AIClient:
                         ],
                     }
                 ]
-            )
+            ))
             
             # 提取AI回复
             reply_text = self._extract_reply_text(response)
@@ -414,6 +795,9 @@ class AIClient:
             if not reply_text:
                 raise ValueError("无法提取AI回复内容")
             
+            if cache_key:
+                self.image_cache.set(cache_key, reply_text, time.monotonic() - start_time)
+            
             return AIResponse(
                 content=reply_text,
                 response_id=getattr(response, 'id', None)
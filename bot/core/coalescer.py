@@ -0,0 +1,86 @@
+# core/coalescer.py
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from ncatbot.utils import get_log
+from bot.core.model import Message
+
+logger = get_log("DecisionCoalescer")
+
+
+@dataclass
+class CoalescedBatch:
+    """合并后的一批消息"""
+    # 被合并的较早消息，按到达顺序排列，不含触发决策的最后一条
+    messages: List[Message] = field(default_factory=list)
+    # 批次中是否有消息通过了随机概率判断
+    eligible: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self.messages) + 1
+
+
+class DecisionCoalescer:
+    """合并突发消息的回复决策
+
+    消息到达后先等待一个合并窗口；若窗口结束时同一对话的信箱中已有新消息排队，
+    当前消息并入批次而不单独请求决策模型，由突发中的最后一条消息为整批做一次决策。
+    已有新消息排队时不再等待，直接并入批次。批次达到 max_batch_size 条时
+    立即决策，避免持续不断的聊天一直得不到决策。当前消息与批次都没有通过随机概率判断时
+    不会请求决策模型，也就不必等待。
+    依赖 ConversationDispatcher 的串行信箱：同一对话的消息按顺序处理，
+    排队数量即为尚未处理的新消息数。排队的消息可能不经过 collect（@、关键词、图片、空消息），
+    处理这些消息时调用方需用 release 取出批次，否则被合并的消息会滞留到下一条普通消息。
+    """
+
+    def __init__(self, window_seconds: float, pending: Callable[[str], int], max_batch_size: int = 20):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending = pending
+        self._batches: Dict[str, CoalescedBatch] = {}
+        # 被合并的消息数，以及其中原本会请求决策模型的数量
+        self.coalesced_messages = 0
+        self.saved_calls = 0
+        self.batches = 0
+
+    async def collect(self, key: str, message: Message, eligible: bool) -> Optional[CoalescedBatch]:
+        """等待合并窗口
+
+        有更新的消息排队时返回None，当前消息已并入批次；
+        否则返回包含之前被合并消息的批次，由调用方做一次决策。
+        """
+        batch = self._batches.get(key)
+        may_decide = eligible or (batch is not None and batch.eligible)
+        if self.window_seconds > 0 and may_decide and self._pending(key) == 0:
+            await asyncio.sleep(self.window_seconds)
+
+        batch = self._batches.get(key)
+        if self._pending(key) > 0 and (batch is None or batch.size < self.max_batch_size):
+            batch = self._batches.setdefault(key, CoalescedBatch())
+            batch.messages.append(message)
+            batch.eligible = batch.eligible or eligible
+            self.coalesced_messages += 1
+            if eligible:
+                self.saved_calls += 1
+            return None
+
+        batch = self._batches.pop(key, None) or CoalescedBatch()
+        batch.eligible = batch.eligible or eligible
+        self.batches += 1
+        if batch.messages:
+            logger.info(f"对话 {key} 合并 {batch.size} 条消息做一次决策，累计节省 {self.saved_calls} 次决策调用")
+        return batch
+
+    def release(self, key: str) -> List[Message]:
+        """取出对话中被合并、尚未决策的消息（按到达顺序），用于不经过 collect 的消息"""
+        batch = self._batches.pop(key, None)
+        return batch.messages if batch else []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batches": self.batches,
+            "coalesced_messages": self.coalesced_messages,
+            "saved_calls": self.saved_calls,
+        }
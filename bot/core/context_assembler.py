@@ -0,0 +1,109 @@
+# core/context_assembler.py
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from bot.config.settings import BotSettings, DEFAULT_CONFIG
+from bot.core.model import Message
+
+# 中日韩文字、全角符号：大约一个字一个token
+_CJK_PATTERN = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+# 英文单词与数字：大约四个字符一个token
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+_SPACE_PATTERN = re.compile(r"\s")
+
+# 每条消息的角色标记等固定开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_text_tokens(text: str) -> int:
+    """本地快速估计文本的token数，不调用分词器
+
+    中文按一字一token，英文单词与数字按四个字符一token，其余标点符号各算一个token，空白不计。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    words = _WORD_PATTERN.findall(text)
+    word_chars = sum(len(word) for word in words)
+    spaces = len(_SPACE_PATTERN.findall(text))
+    others = len(text) - cjk - word_chars - spaces
+    return cjk + sum((len(word) + 3) // 4 for word in words) + max(0, others)
+
+
+def estimate_message_tokens(message: Message) -> int:
+    return estimate_text_tokens(message.content.msg) + MESSAGE_OVERHEAD_TOKENS
+
+
+def context_budget(role: str) -> int:
+    """模型调用类型（main/decision）的输入token预算"""
+    return BotSettings.CONTEXT_TOKEN_BUDGETS.get(role, DEFAULT_CONFIG["context_token_budgets"][role])
+
+
+class ContextAssembler:
+    """在token预算内贪心地拼装请求上下文
+
+    调用方按优先级依次加入各部分：必需的部分（系统提示词、当前消息）总是加入，
+    其余部分放得下才加入，放不下的计入舍弃数量。
+    parts 记录各部分实际占用的token数，用于统计与日志。
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.tokens = 0
+        self.parts: Dict[str, int] = Counter()
+        self.dropped: Dict[str, int] = Counter()
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.tokens
+
+    @property
+    def overflow(self) -> bool:
+        """必需的部分已超出预算"""
+        return self.tokens > self.budget
+
+    def require(self, part: str, tokens: int):
+        """加入必需的部分，即使超出预算"""
+        self.tokens += tokens
+        self.parts[part] += tokens
+
+    def offer(self, part: str, tokens: int) -> bool:
+        """放得下时加入可选的部分"""
+        if tokens > self.remaining:
+            self.dropped[part] += 1
+            return False
+        self.require(part, tokens)
+        return True
+
+    def pack_texts(self, part: str, texts: Sequence[str], overhead: int = 0) -> List[str]:
+        """从最后一条开始尽量多地放入文本，保持原有顺序返回"""
+        packed = []
+        for text in reversed(texts):
+            if self.offer(part, estimate_text_tokens(text) + overhead):
+                packed.append(text)
+        packed.reverse()
+        return packed
+
+    def pack_recent(self, part: str, messages: Sequence[Message], limit: Optional[int] = None) -> List[Message]:
+        """从最新的消息开始放入，遇到第一条放不下的消息即停止，保证对话连续
+
+        limit 为最多放入的消息数，预算有余时也不超过该数量，超出的较早消息计入舍弃数量。
+        """
+        packed = []
+        stop = -1
+        if limit is not None and len(messages) > limit:
+            stop = len(messages) - max(limit, 0) - 1
+            self.dropped[part] += stop + 1
+        for index in range(len(messages) - 1, stop, -1):
+            if not self.offer(part, estimate_message_tokens(messages[index])):
+                self.dropped[part] += index - stop - 1
+                break
+            packed.append(messages[index])
+        packed.reverse()
+        return packed
+
+    def describe(self) -> str:
+        parts = "，".join(f"{part} {tokens}" for part, tokens in self.parts.items())
+        dropped = "，".join(f"{part} {count}" for part, count in self.dropped.items() if count)
+        return f"{self.tokens}/{self.budget} tokens（{parts}）" + (f"，舍弃 {dropped}" if dropped else "")
@@ -0,0 +1,54 @@
+# core/conversation_store.py
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ncatbot.utils import get_log
+
+logger = get_log("ConversationStore")
+
+
+class ConversationStore:
+    """短期对话状态的磁盘存储
+
+    每个对话键单独保存为一个 JSON 文件，只在需要时读取单个文件，
+    启动时不扫描目录，因此启动耗时与对话数量无关。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取对话状态，不存在或损坏时返回None"""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"读取对话状态失败: {key}, 错误: {e}")
+            return None
+
+    def save(self, key: str, data: Dict[str, Any]):
+        """保存对话状态：写入临时文件后原子替换"""
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except IOError as e:
+            logger.error(f"保存对话状态失败: {key}, 错误: {e}")
+
+    def delete(self, key: str):
+        """删除对话状态"""
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except IOError as e:
+            logger.error(f"删除对话状态失败: {key}, 错误: {e}")
@@ -0,0 +1,87 @@
+# core/decision_cache.py
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from ncatbot.utils import get_log
+from bot.core.model import Message
+
+logger = get_log("DecisionCache")
+
+# 对话记忆中消息的时间戳，如 "[2025-01-01/12:00]"，不参与上下文指纹
+TIMESTAMP_PATTERN = re.compile(r"\[\d{4}-\d{2}-\d{2}/\d{2}:\d{2}\]")
+# 连续重复超过3次的字符压缩为3个，"哈哈哈哈哈" 与 "哈哈哈哈" 视为同一条消息
+CHAR_RUN_PATTERN = re.compile(r"(.)\1{3,}")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """规范化消息文本：全半角统一、小写、合并空白与重复字符"""
+    text = unicodedata.normalize("NFKC", text).lower().strip()
+    text = WHITESPACE_PATTERN.sub(" ", text)
+    return CHAR_RUN_PATTERN.sub(r"\1\1\1", text)
+
+
+def context_fingerprint(messages: List[Message]) -> str:
+    """决策模型可见的上下文窗口的指纹"""
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(f"{message.role}:{TIMESTAMP_PATTERN.sub('', message.content.msg)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DecisionCache:
+    """回复决策结果缓存（LRU + 短TTL）
+
+    以规范化的消息文本和上下文窗口指纹为键。同一句话（"早"、"晚安"、复读接龙）
+    在相同上下文下反复出现时直接返回之前的决策结果，不再调用决策模型。
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # 键 -> (决策结果, 过期时间戳)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[bool, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(message: str, context: List[Message]) -> Tuple[str, str]:
+        return normalize_message(message), context_fingerprint(context)
+
+    def get(self, key: Tuple[str, str]) -> Optional[bool]:
+        """获取缓存的决策结果，未命中或已过期时返回None"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Tuple[str, str], decision: bool):
+        self._entries[key] = (decision, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
@@ -0,0 +1,81 @@
+# core/dispatcher.py
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+from ncatbot.utils import get_log
+
+logger = get_log("Dispatcher")
+
+
+class ConversationDispatcher:
+    """对话分发器
+
+    每个对话键（``group_<id>``/``user_<id>``）拥有独立的串行信箱，保证同一对话内的消息按到达顺序处理；
+    不同对话之间并行处理，并受全局并发上限约束。
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._mailboxes: Dict[str, Deque[Tuple[Callable[..., Awaitable[Any]], tuple, asyncio.Future]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._running = 0
+
+    def dispatch(self, key: str, handler: Callable[..., Awaitable[Any]], *args) -> asyncio.Future:
+        """将处理任务投递到对话信箱，返回处理结果的 Future"""
+        future = asyncio.get_running_loop().create_future()
+        self._mailboxes.setdefault(key, deque()).append((handler, args, future))
+
+        # 该对话没有正在运行的工作协程时启动一个
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+        return future
+
+    def pending(self, key: str) -> int:
+        """获取对话信箱中等待处理的消息数量"""
+        mailbox = self._mailboxes.get(key)
+        return len(mailbox) if mailbox else 0
+
+    @property
+    def queue_depth(self) -> int:
+        """所有信箱中等待处理的消息总数"""
+        return sum(len(mailbox) for mailbox in self._mailboxes.values())
+
+    @property
+    def active_conversations(self) -> int:
+        """正在处理或等待处理的对话数量"""
+        return len(self._workers)
+
+    @property
+    def running(self) -> int:
+        """正在执行的处理任务数量"""
+        return self._running
+
+    async def _drain(self, key: str):
+        """依次处理对话信箱中的消息，信箱清空后退出"""
+        mailbox = self._mailboxes[key]
+        try:
+            while mailbox:
+                handler, args, future = mailbox.popleft()
+                async with self._semaphore:
+                    self._running += 1
+                    try:
+                        result = await handler(*args)
+                    except Exception as e:
+                        logger.error(f"对话 {key} 消息处理异常: {e}", exc_info=True)
+                        result = None
+                    finally:
+                        self._running -= 1
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # 被取消时信箱中可能仍有消息，保留信箱，下次投递时会重新启动工作协程
+            del self._workers[key]
+            if not mailbox:
+                del self._mailboxes[key]
+
+    async def join(self):
+        """等待所有信箱处理完成"""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
@@ -0,0 +1,110 @@
+# core/image_cache.py
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ncatbot.utils import get_log
+
+logger = get_log("ImageCache")
+
+
+class ImageInterpretationCache:
+    """图片解读结果缓存（LRU + TTL）
+
+    以图片段的 file 标识或图片内容哈希为键。热门表情包在各群反复出现时
+    直接返回缓存的解读，不再调用视觉模型。可选地保存到磁盘，重启后继续使用。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        persist_path: Optional[str] = None,
+        flush_interval: float = 60.0
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        # 键 -> {"content": 解读内容, "expires_at": 过期时间戳, "latency": 原始调用耗时}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        if persist_path:
+            self._load()
+
+    def get(self, key: str) -> Optional[str]:
+        """获取缓存的解读内容，未命中或已过期时返回None"""
+        entry = self._entries.get(key)
+        if entry is None or entry["expires_at"] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+                self._dirty = True
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry["latency"]
+        return entry["content"]
+
+    def set(self, key: str, content: str, latency: float = 0.0):
+        """缓存解读内容，latency 为本次模型调用耗时，用于统计节省的时间"""
+        self._entries[key] = {"content": content, "expires_at": time.time() + self.ttl_seconds, "latency": latency}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+        if self.persist_path and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def _load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"读取图片解读缓存失败: {e}")
+            return
+        now = time.time()
+        # 文件中按最近使用顺序保存，超出容量时保留最近使用的条目
+        for key, entry in list(data.items())[-self.max_entries:]:
+            if entry.get("expires_at", 0) > now:
+                self._entries[key] = entry
+        logger.info(f"已加载 {len(self._entries)} 条图片解读缓存")
+
+    def flush(self):
+        """将缓存写入磁盘：写入临时文件后原子替换"""
+        if not self.persist_path or not self._dirty:
+            return
+        self._last_flush = time.monotonic()
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+            self._dirty = False
+        except IOError as e:
+            logger.error(f"保存图片解读缓存失败: {e}")
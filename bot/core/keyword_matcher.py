@@ -0,0 +1,217 @@
+# core/keyword_matcher.py
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings
+
+logger = get_log("KeywordMatcher")
+
+# 包含这些字符的关键词视为正则表达式
+REGEX_SPECIAL_CHARS = frozenset("^$*+?.()[]{}|\\")
+
+# 含反向引用的正则在合并后分组编号会改变，需单独匹配
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _lower_with_offsets(text: str) -> Tuple[str, Optional[List[int]]]:
+    """小写化文本，个别字符小写后会变长（如 "İ" 变为两个字符），
+    此时同时返回小写文本每个位置对应的原文位置，长度不变时返回None
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered, None
+    offsets = []
+    for index, char in enumerate(text):
+        offsets.extend([index] * len(char.lower()))
+    return lowered, offsets
+
+
+@dataclass
+class KeywordMatch:
+    """关键词匹配结果，start/end 为原文中的位置"""
+    keyword: str
+    start: int
+    end: int
+    is_regex: bool = False
+
+
+class _AhoCorasick:
+    """小写字面关键词的 Aho–Corasick 自动机
+
+    扫描一次文本即可找出所有关键词，耗时与关键词数量无关。
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 每个状态命中的关键词（关键词下标, 长度），已合并失败链上的输出
+        self._output: List[List[Tuple[int, int]]] = [[]]
+        self._max_length = 0
+
+        for index, keyword in enumerate(keywords):
+            self._max_length = max(self._max_length, len(keyword))
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((index, len(keyword)))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text: str, first_only: bool = False) -> List[Tuple[int, int, int]]:
+        """返回 (关键词下标, 起始位置, 结束位置)，按结束位置排序
+
+        first_only 时找到起始位置最靠前的匹配即停止：匹配按结束位置产生，
+        先结束的匹配不一定先开始（如 "abcd" 中的 "bc" 与 "abcd"），
+        要继续扫描到不可能再有更早开始的匹配为止。
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        earliest = None
+        state = 0
+        for position, char in enumerate(text):
+            # 此后的匹配至少从 position - 最长关键词长度 + 1 开始
+            if earliest is not None and position - self._max_length + 1 >= earliest:
+                break
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                end = position + 1
+                for index, length in output[state]:
+                    matches.append((index, end - length, end))
+                if first_only:
+                    earliest = min(start for _, start, _ in matches)
+        return matches
+
+
+class KeywordMatcher:
+    """预编译的触发关键词匹配器
+
+    启动时构建一次：字面关键词编入 Aho–Corasick 自动机，
+    正则关键词合并为一个预编译的分支表达式，匹配均忽略大小写。
+    无效的正则表达式按字面关键词处理。
+    """
+
+    def __init__(self, keywords: Iterable[str], enable_regex: bool = True):
+        self.keywords: List[str] = [keyword for keyword in keywords if keyword]
+        literals: List[str] = []
+        regexes: List[Tuple[str, re.Pattern]] = []
+
+        for keyword in self.keywords:
+            if enable_regex and any(char in REGEX_SPECIAL_CHARS for char in keyword):
+                try:
+                    regexes.append((keyword, re.compile(keyword, re.IGNORECASE)))
+                    continue
+                except re.error as e:
+                    logger.warning(f"无效的正则关键词，将按普通关键词匹配: {keyword}, 错误: {e}")
+            literals.append(keyword)
+
+        self._literals = literals
+        self._automaton = _AhoCorasick(keyword.lower() for keyword in literals) if literals else None
+
+        # 合并后的分支表达式用命名分组区分命中的关键词。以 ^ 开头且不含 | 的
+        # 表达式只可能在文本开头命中，单独合并后只在位置0尝试一次，
+        # 避免在每个位置都逐个尝试这些分支
+        self._regex_keywords: Dict[str, str] = {}
+        self._separate_regexes: List[Tuple[str, re.Pattern]] = []
+        branches: List[str] = []
+        anchored_branches: List[str] = []
+        for keyword, pattern in regexes:
+            if _BACKREFERENCE.search(keyword):
+                self._separate_regexes.append((keyword, pattern))
+                continue
+            group = f"_kw{len(self._regex_keywords)}"
+            self._regex_keywords[group] = keyword
+            target = anchored_branches if keyword.startswith("^") and "|" not in keyword else branches
+            target.append(f"(?P<{group}>{keyword})")
+
+        try:
+            self._combined_regex = re.compile("|".join(branches), re.IGNORECASE) if branches else None
+            self._anchored_regex = re.compile("|".join(anchored_branches), re.IGNORECASE) if anchored_branches else None
+        except re.error as e:
+            # 例如各表达式定义了同名分组或使用了局部标志，无法合并
+            logger.warning(f"正则关键词无法合并，将逐个匹配: {e}")
+            self._regex_keywords = {}
+            self._separate_regexes = regexes
+            self._combined_regex = None
+            self._anchored_regex = None
+
+    @classmethod
+    def from_settings(cls) -> "KeywordMatcher":
+        """根据当前配置构建匹配器"""
+        return cls(BotSettings.TRIGGER_KEYWORDS, BotSettings.ENABLE_REGEX_KEYWORDS)
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    @property
+    def literal_count(self) -> int:
+        return len(self._literals)
+
+    @property
+    def regex_count(self) -> int:
+        return len(self._regex_keywords) + len(self._separate_regexes)
+
+    def find(self, text: str) -> Optional[KeywordMatch]:
+        """返回最先出现的关键词匹配，没有匹配时返回None"""
+        matches = self._search(text, first_only=True)
+        return min(matches, key=lambda match: (match.start, match.end)) if matches else None
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """返回所有关键词匹配，按出现位置排序"""
+        return sorted(self._search(text, first_only=False), key=lambda match: (match.start, match.end))
+
+    def contains(self, text: str) -> bool:
+        """检查文本是否包含任一关键词"""
+        return self.find(text) is not None
+
+    def _search(self, text: str, first_only: bool) -> List[KeywordMatch]:
+        if not text or not self.keywords:
+            return []
+
+        matches = []
+        if self._automaton:
+            lowered, offsets = _lower_with_offsets(text)
+            for index, start, end in self._automaton.search(lowered, first_only):
+                if offsets is not None:
+                    start, end = offsets[start], offsets[end - 1] + 1
+                matches.append(KeywordMatch(self._literals[index], start, end))
+
+        if self._anchored_regex:
+            match = self._anchored_regex.match(text)
+            if match:
+                matches.append(KeywordMatch(self._regex_keywords[match.lastgroup], match.start(), match.end(), True))
+
+        if self._combined_regex:
+            found = self._combined_regex.finditer(text)
+            for match in found:
+                matches.append(KeywordMatch(self._regex_keywords[match.lastgroup], match.start(), match.end(), True))
+                if first_only:
+                    break
+
+        for keyword, pattern in self._separate_regexes:
+            found = pattern.finditer(text)
+            for match in found:
+                matches.append(KeywordMatch(keyword, match.start(), match.end(), True))
+                if first_only:
+                    break
+        return matches
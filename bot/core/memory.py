@@ -1,7 +1,8 @@
 # core/memory.py
-import json
+import asyncio
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import hashlib
@@ -12,22 +13,58 @@ from bot.utils.helpers import mask_sensitive_data
 from bot.config.settings import BotSettings
 from bot.core.model import Content, Message, ROLE_TYPE
 from bot.core.conversation_manager import ConversationManager, ConversationThread
+from bot.core.memory_storage import MemoryStorage, JsonMemoryStorage, SqliteMemoryStorage
+from bot.core.conversation_store import ConversationStore
+from bot.core.message_buffer import MessageBuffer
+from bot.core.prompt_cache import SystemPromptCache, LONG_TERM_MEMORY_INSTRUCTION
+from bot.core.context_assembler import ContextAssembler, MESSAGE_OVERHEAD_TOKENS, estimate_message_tokens, estimate_text_tokens
 
 logger = get_log("MemoryManager")
 
+# 系统提示词中长期记忆部分的标题
+MEMORY_SECTION_HEADER = "\n## 记忆内容:"
+
+
+def _message_to_dict(message: Message) -> Dict[str, str]:
+    return {"role": message.role, "content": message.content.msg}
+
+
+def _message_from_dict(data: Dict[str, str]) -> Message:
+    return Message(content=Content(data["content"]), role=data.get("role", ROLE_TYPE.USER))
+
+
+def _new_message_buffer(messages: Iterable[Message] = ()) -> MessageBuffer:
+    """创建容量为短期记忆上限的消息缓冲区"""
+    return MessageBuffer(BotSettings.SHORT_TERM_MEMORY_LIMIT, messages)
+
 
 @dataclass
 class UserContext:
     """用户上下文"""
-    messages: List[Message] = field(default_factory=list)
+    messages: MessageBuffer = field(default_factory=_new_message_buffer)
     last_active: datetime = field(default_factory=datetime.now)
     context_id: Optional[str] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": [_message_to_dict(msg) for msg in self.messages],
+            "last_active": self.last_active.isoformat(),
+            "context_id": self.context_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserContext":
+        return cls(
+            messages=_new_message_buffer(_message_from_dict(msg) for msg in data.get("messages", [])),
+            last_active=datetime.fromisoformat(data["last_active"]),
+            context_id=data.get("context_id"),
+        )
+
 @dataclass
 class Conversation:
     """单次对话上下文"""
     # 全局消息（群聊所有消息）
-    global_messages: List[Message] = field(default_factory=list)
+    global_messages: MessageBuffer = field(default_factory=_new_message_buffer)
     # 按用户区分的上下文
     user_contexts: Dict[str, UserContext] = field(default_factory=dict)
     response_id: Optional[str] = None
@@ -36,57 +73,114 @@ class Conversation:
     summary: Optional[str] = None
     # 上次生成摘要的时间
     last_summarized: datetime = field(default_factory=datetime.now)
+    # 累计添加的消息数（不受短期记忆截断影响）
+    message_count: int = 0
+    # 上次生成摘要时的消息计数，之后的消息即为摘要尚未覆盖的增量
+    summary_watermark: int = 0
+
+    # 是否已经获取过聊天历史记录
+    history_retrieved: bool = False
+
+    # response_id 链：上次回复后的消息计数（之前的消息已在链中）、
+    # 建链时系统提示词与摘要的指纹、链上增量请求的次数、建链时间以及生成上次回复的模型
+    # （response_id 只在该模型下有效）
+    response_watermark: Optional[int] = None
+    response_fingerprint: Optional[str] = None
+    response_chain_turns: int = 0
+    response_chain_started: Optional[datetime] = None
+    response_model: Optional[str] = None
+
+    @property
+    def unsummarized_count(self) -> int:
+        """摘要尚未覆盖的消息数量"""
+        return self.message_count - self.summary_watermark
+
+    def reset_response_chain(self):
+        """丢弃 response_id 链，下次请求重新发送完整上下文"""
+        self.response_id = None
+        self.response_watermark = None
+        self.response_fingerprint = None
+        self.response_chain_turns = 0
+        self.response_chain_started = None
+        self.response_model = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可持久化的字典"""
+        return {
+            "global_messages": [_message_to_dict(msg) for msg in self.global_messages],
+            "user_contexts": {user_id: ctx.to_dict() for user_id, ctx in self.user_contexts.items()},
+            "response_id": self.response_id,
+            "last_active": self.last_active.isoformat(),
+            "summary": self.summary,
+            "last_summarized": self.last_summarized.isoformat(),
+            "message_count": self.message_count,
+            "summary_watermark": self.summary_watermark,
+            "history_retrieved": self.history_retrieved,
+            "response_watermark": self.response_watermark,
+            "response_fingerprint": self.response_fingerprint,
+            "response_chain_turns": self.response_chain_turns,
+            "response_chain_started": self.response_chain_started.isoformat() if self.response_chain_started else None,
+            "response_model": self.response_model,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Conversation":
+        """从持久化的字典恢复"""
+        return cls(
+            global_messages=_new_message_buffer(_message_from_dict(msg) for msg in data.get("global_messages", [])),
+            user_contexts={user_id: UserContext.from_dict(ctx) for user_id, ctx in data.get("user_contexts", {}).items()},
+            response_id=data.get("response_id"),
+            last_active=datetime.fromisoformat(data["last_active"]),
+            summary=data.get("summary"),
+            last_summarized=datetime.fromisoformat(data["last_summarized"]),
+            message_count=data.get("message_count", 0),
+            summary_watermark=data.get("summary_watermark", 0),
+            history_retrieved=data.get("history_retrieved", False),
+            response_watermark=data.get("response_watermark"),
+            response_fingerprint=data.get("response_fingerprint"),
+            response_chain_turns=data.get("response_chain_turns", 0),
+            response_chain_started=datetime.fromisoformat(data["response_chain_started"]) if data.get("response_chain_started") else None,
+            response_model=data.get("response_model"),
+        )
 
 
 class LongTermMemory:
-    """增强的长期记忆管理"""
+    """增强的长期记忆管理
 
-    def __init__(self, storage_path: str = None):  # type: ignore
+    具体存储由可插拔的后端负责（见 ``memory_storage``），通过 ``long_term_memory_backend`` 配置选择：
+    ``json`` 为 JSON 快照 + 追加日志，``sqlite`` 为带索引的 SQLite 数据库。
+    """
+
+    def __init__(self, storage_path: str = None, backend: str = None):  # type: ignore
         self.storage_path = storage_path or BotSettings.LONG_TERM_MEMORY_PATH
-        self.memory: Dict[str, List[Dict]] = self._load_memory()
+        self.backend = backend or BotSettings.LONG_TERM_MEMORY_BACKEND
+        self.storage: MemoryStorage = self._create_storage()
+
+    def _create_storage(self) -> MemoryStorage:
+        """根据配置创建存储后端"""
+        if self.backend == "sqlite":
+            db_path = os.path.splitext(self.storage_path)[0] + ".db"
+            return SqliteMemoryStorage(db_path, migrate_from=self.storage_path)
+        return JsonMemoryStorage(
+            self.storage_path,
+            fsync_batch=BotSettings.LONG_TERM_MEMORY_FSYNC_BATCH,
+            fsync_interval=BotSettings.LONG_TERM_MEMORY_FSYNC_INTERVAL,
+            compact_threshold=BotSettings.LONG_TERM_MEMORY_COMPACT_THRESHOLD,
+        )
 
-    def _load_memory(self) -> Dict[str, List[Dict]]:
-        """加载长期记忆"""
-        if os.path.exists(self.storage_path):
-            try:
-                with open(self.storage_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"加载长期记忆失败: {e}")
-                return {}
-        return {}
-
-    def _save_memory(self):
-        """保存长期记忆"""
-        try:
-            with open(self.storage_path, "w", encoding="utf-8") as f:
-                json.dump(self.memory, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            print(f"保存长期记忆失败: {e}")
+    def close(self):
+        """关闭存储，确保数据落盘"""
+        self.storage.close()
 
     def get_memory(self, group_id: str, limit: int = 10) -> List[str]:
         """获取指定群的长期记忆"""
-        if group_id not in self.memory:
-            return []
-
-        memories = (
-            self.memory[group_id][-limit:] if limit > 0 else self.memory[group_id]
-        )
-        return [mem["content"] for mem in memories]
+        return [mem["content"] for mem in self.storage.get_memory(group_id, limit)]
 
     def add_memory(self, group_id: str, content: str, importance: float = 1.0):
         """添加长期记忆"""
-        if group_id not in self.memory:
-            self.memory[group_id] = []
-
         # 生成内容哈希，避免重复
         content_hash = hashlib.md5(content.encode()).hexdigest()[:8]
 
-        # 检查是否已存在
-        existing_hashes = {mem.get("hash", "") for mem in self.memory[group_id]}
-        if content_hash in existing_hashes:
-            return
-
         memory_entry = {
             "content": content,
             "timestamp": datetime.now().isoformat(),
@@ -94,13 +188,8 @@ class LongTermMemory:
             "hash": content_hash,
         }
 
-        self.memory[group_id].append(memory_entry)
-
-        # 限制每个群的记忆数量
-        if len(self.memory[group_id]) > 100:
-            self.memory[group_id] = self.memory[group_id][-100:]
-
-        self._save_memory()
+        # 存储后端负责去重和限制每个群的记忆数量
+        self.storage.add(group_id, memory_entry)
 
     @staticmethod
     def extract_memory_tags(text: str) -> Optional[str]:
@@ -130,64 +219,148 @@ class MemoryManager:
         self.conversations: Dict[str, Conversation] = {}
         self.conversation_manager = ConversationManager()
         self.context_timeout = timedelta(hours=BotSettings.CONTEXT_TIMEOUT_HOURS)  # 上下文过期时间
+        # 短期对话状态持久化：启动时不加载，首次访问某个对话时再从磁盘恢复
+        self.conversation_store = ConversationStore(BotSettings.CONVERSATION_STATE_DIR) if BotSettings.CONVERSATION_PERSISTENCE_ENABLED else None
+        self._dirty_keys: set = set()
+        # 后台定期写盘的任务，以及防止后台写盘与关闭时的写盘同时写同一文件的锁
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = threading.Lock()
+        self.prompt_cache = SystemPromptCache()
 
     def get_conversation(self, key: str) -> Conversation:
         """获取或创建对话上下文"""
         if key not in self.conversations:
-            self.conversations[key] = Conversation()
+            self.conversations[key] = self._restore_conversation(key) or Conversation()
         return self.conversations[key]
+
+    def _restore_conversation(self, key: str) -> Optional[Conversation]:
+        """从磁盘恢复对话状态，已过期的状态直接丢弃"""
+        if self.conversation_store is None:
+            return None
+        data = self.conversation_store.load(key)
+        if data is None:
+            return None
+        try:
+            conv = Conversation.from_dict(data)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"对话状态格式错误，已忽略: {key}, 错误: {e}")
+            return None
+        if datetime.now() - conv.last_active > self.context_timeout:
+            self.conversation_store.delete(key)
+            return None
+        logger.debug(f"已从磁盘恢复对话状态: {key}, 消息数量={len(conv.global_messages)}")
+        return conv
+
+    def mark_dirty(self, key: str):
+        """标记对话状态已变更，等待下次写盘"""
+        if self.conversation_store is not None:
+            self._dirty_keys.add(key)
+
+    def _take_dirty_snapshots(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """取出有变更的对话状态的快照并清空变更标记"""
+        snapshots = [(key, self.conversations[key].to_dict()) for key in self._dirty_keys if key in self.conversations]
+        self._dirty_keys.clear()
+        return snapshots
+
+    def _save_snapshots(self, snapshots: List[Tuple[str, Dict[str, Any]]]):
+        with self._flush_lock:
+            for key, data in snapshots:
+                self.conversation_store.save(key, data)
+
+    def flush(self):
+        """将有变更的对话状态写入磁盘（同步，用于关闭时）"""
+        if self.conversation_store is None:
+            return
+        self._save_snapshots(self._take_dirty_snapshots())
+
+    async def flush_async(self):
+        """在线程中写盘，不阻塞事件循环
+
+        快照在事件循环线程中生成，保证写入的是一致的状态，线程只负责序列化与磁盘 I/O。
+        """
+        if self.conversation_store is None or not self._dirty_keys:
+            return
+        await asyncio.to_thread(self._save_snapshots, self._take_dirty_snapshots())
+
+    def start_flusher(self):
+        """在事件循环中首次调用时启动定期写盘的后台任务"""
+        if self.conversation_store is None or (self._flush_task is not None and not self._flush_task.done()):
+            return
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(BotSettings.CONVERSATION_FLUSH_INTERVAL)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                logger.error(f"对话状态写盘失败: {e}", exc_info=True)
         
     async def generate_conversation_summary(self, key: str, ai_client) -> Optional[str]:
-        """生成对话摘要"""
+        """生成对话摘要，增量模式下只发送已有摘要和之后的新消息"""
         conv = self.get_conversation(key)
         
         # 如果没有足够的消息，不需要生成摘要
         if len(conv.global_messages) < BotSettings.SUMMARY_MIN_MESSAGES:
             return None
         
-        # 生成摘要
-        limit = min(BotSettings.SUMMARY_MAX_MESSAGES, len(conv.global_messages))
-        summary = await ai_client.generate_summary(conv.global_messages[-limit:])  # 使用最近消息生成摘要
+        # 记录本次摘要覆盖到的位置，生成期间新到的消息留给下一次
+        watermark = conv.message_count
+        incremental = BotSettings.SUMMARY_INCREMENTAL and conv.summary is not None
+        
+        if incremental:
+            new_count = min(conv.unsummarized_count, len(conv.global_messages), BotSettings.SUMMARY_MAX_MESSAGES)
+            if new_count <= 0:
+                # 没有新消息，已有摘要仍然有效
+                conv.last_summarized = datetime.now()
+                return conv.summary
+            summary = await ai_client.generate_summary(conv.global_messages[-new_count:], previous_summary=conv.summary)
+        else:
+            limit = min(BotSettings.SUMMARY_MAX_MESSAGES, len(conv.global_messages))
+            summary = await ai_client.generate_summary(conv.global_messages[-limit:])  # 使用最近消息生成摘要
+        
         if summary:
             conv.summary = summary
             conv.last_summarized = datetime.now()
-            logger.info(f"成功生成对话摘要: {key}")
+            conv.summary_watermark = watermark
+            self.mark_dirty(key)
+            logger.info(f"成功生成对话摘要: {key}{'（增量）' if incremental else ''}")
             logger.debug(f"摘要内容: {summary}")
             return summary
         
         return None
     
+    def needs_summary(self, conv: Conversation) -> Optional[str]:
+        """判断对话是否需要生成摘要，需要时返回原因，否则返回None"""
+        # 1. 没有摘要
+        # 2. 距离上次生成摘要超过指定小时数
+        # 3. 消息数量超过指定数量且距离上次生成摘要超过指定分钟数
+        time_since_last = datetime.now() - conv.last_summarized
+        message_count = len(conv.global_messages)
+        
+        if not conv.summary:
+            return "没有现有摘要"
+        if time_since_last > timedelta(hours=BotSettings.SUMMARY_INTERVAL_HOURS):
+            return f"距离上次摘要已超过 {BotSettings.SUMMARY_INTERVAL_HOURS} 小时"
+        if message_count > BotSettings.SUMMARY_MAX_MESSAGES and time_since_last > timedelta(minutes=BotSettings.SUMMARY_SHORT_INTERVAL_MINUTES):
+            return f"消息数量({message_count})超过限制，且距离上次摘要已超过 {BotSettings.SUMMARY_SHORT_INTERVAL_MINUTES} 分钟"
+        return None
+    
     async def check_and_generate_summaries(self, ai_client):
-        """检查并生成所有需要的对话摘要"""
+        """检查并依次生成所有需要的对话摘要（阻塞式，回复流程中请使用SummaryScheduler）"""
         logger.info("开始检查并生成对话摘要")
-        for key, conv in self.conversations.items():
-            # 检查是否需要生成摘要：
-            # 1. 没有摘要
-            # 2. 距离上次生成摘要超过指定小时数
-            # 3. 消息数量超过指定数量且距离上次生成摘要超过指定分钟数
-            need_summary = False
-            time_since_last = datetime.now() - conv.last_summarized
-            message_count = len(conv.global_messages)
-            
-            logger.debug(f"检查对话 {key}: 消息数量={message_count}, 上次摘要时间={time_since_last}")
+        for key, conv in list(self.conversations.items()):
+            reason = self.needs_summary(conv)
+            if not reason:
+                continue
             
-            if not conv.summary:
-                need_summary = True
-                logger.debug(f"对话 {key}: 需要生成摘要，原因: 没有现有摘要")
-            elif time_since_last > timedelta(hours=BotSettings.SUMMARY_INTERVAL_HOURS):
-                need_summary = True
-                logger.debug(f"对话 {key}: 需要生成摘要，原因: 距离上次摘要已超过 {BotSettings.SUMMARY_INTERVAL_HOURS} 小时")
-            elif message_count > BotSettings.SUMMARY_MAX_MESSAGES and time_since_last > timedelta(minutes=BotSettings.SUMMARY_SHORT_INTERVAL_MINUTES):
-                need_summary = True
-                logger.debug(f"对话 {key}: 需要生成摘要，原因: 消息数量({message_count})超过限制，且距离上次摘要已超过 {BotSettings.SUMMARY_SHORT_INTERVAL_MINUTES} 分钟")
-            
-            if need_summary:
-                logger.info(f"开始生成对话 {key} 的摘要")
-                result = await self.generate_conversation_summary(key, ai_client)
-                if result:
-                    logger.info(f"对话 {key} 摘要生成完成")
-                else:
-                    logger.warning(f"对话 {key} 摘要生成失败")
+            logger.debug(f"对话 {key}: 需要生成摘要，原因: {reason}")
+            logger.info(f"开始生成对话 {key} 的摘要")
+            result = await self.generate_conversation_summary(key, ai_client)
+            if result:
+                logger.info(f"对话 {key} 摘要生成完成")
+            else:
+                logger.warning(f"对话 {key} 摘要生成失败")
         
         logger.info("所有对话摘要检查和生成完成")
     
@@ -200,6 +373,9 @@ class MemoryManager:
         
         for key in expired_keys:
             del self.conversations[key]
+            self._dirty_keys.discard(key)
+            if self.conversation_store is not None:
+                self.conversation_store.delete(key)
         
         # 清理不活跃的对话线程
         self.conversation_manager.cleanup_inactive_threads()
@@ -255,15 +431,11 @@ class MemoryManager:
         """添加消息到对话，支持按用户区分上下文和上下文切换检测"""
         conv = self.get_conversation(key)
         
-        # 添加到全局消息列表
+        # 添加到全局消息缓冲区，超过短期记忆上限时自动覆盖最旧的消息
         conv.global_messages.append(message)
+        conv.message_count += 1
         conv.last_active = datetime.now()
         
-        # 限制全局消息数量
-        if len(conv.global_messages) > BotSettings.SHORT_TERM_MEMORY_LIMIT:
-            conv.global_messages = conv.global_messages[-BotSettings.SHORT_TERM_MEMORY_LIMIT :]
-            logger.debug(f"上下文消息数量超过限制，已截取最近{BotSettings.SHORT_TERM_MEMORY_LIMIT}条消息")
-        
         # 如果提供了user_id，添加到用户特定上下文
         if user_id:
             # 检测是否需要切换上下文
@@ -276,15 +448,14 @@ class MemoryManager:
             user_context = conv.user_contexts[user_id]
             user_context.messages.append(message)
             user_context.last_active = datetime.now()
-            
-            # 限制用户上下文消息数量
-            if len(user_context.messages) > BotSettings.SHORT_TERM_MEMORY_LIMIT:
-                user_context.messages = user_context.messages[-BotSettings.SHORT_TERM_MEMORY_LIMIT :]
         
+        self.mark_dirty(key)
 
-
-    def get_messages(self, key: str, limit: int = None, user_id: str = None) -> List[Message]:  # type: ignore
-        """获取对话消息，支持获取全局消息或用户特定消息，当有摘要时使用摘要+最近消息来减少tokens消耗"""
+    def get_messages(self, key: str, limit: int = None, user_id: str = None) -> Sequence[Message]:  # type: ignore
+        """获取对话消息，支持获取全局消息或用户特定消息，当有摘要时使用摘要+最近消息来减少tokens消耗
+        
+        无摘要时返回消息缓冲区的只读视图，不复制消息
+        """
         conv = self.get_conversation(key)
         
         if user_id and user_id in conv.user_contexts:
@@ -304,60 +475,79 @@ class MemoryManager:
             
             # 获取最近的几条消息，数量为限制的一半或固定数量
             recent_count = limit // 2 if limit and limit > 2 else 5
-            recent_messages = messages[-recent_count:] if recent_count > 0 else []
+            recent_messages = messages.window(recent_count) if recent_count > 0 else []
             
-            return [summary_message] + recent_messages
+            return [summary_message, *recent_messages]
         
-        if limit and len(messages) > limit:
-            return messages[-limit:]
-        return messages.copy()
+        return messages.window(limit or None)
 
-    def build_system_prompt(self, key: str, is_group: bool = True) -> Message:
-        """构建系统提示词"""
-        # 读取灵魂文档
-        try:
-            with open(BotSettings.SOUL_DOC_PATH, "r", encoding="utf-8") as f:
-                soul_content = f.read()
-        except FileNotFoundError:
-            logger.warning("灵魂文档未找到，使用默认描述")
-            soul_content = f"你是一个名为 Bionic 的 AI 助手，乐于助人且知识渊博。"
-
-        # 基础系统提示（原本有时间，改为每条消息提供）
-        base_content = soul_content
-
-        # 构建昵称映射表内容
-        nickname_address_content = ""
-        if BotSettings.ENABLE_NICKNAME_ADDRESS_INJECTION and BotSettings.NICKNAME_ADDRESS_MAPPING:
-            nickname_address_content += "\n## 以下是多个用户的【称呼】与其【昵称】，请在回复中参考，用【称呼】来指代该用户："
-            for address, mapping in BotSettings.NICKNAME_ADDRESS_MAPPING.items():
-                # 处理新格式：称呼 -> {nicknames: [], qq: ""}
-                if isinstance(mapping, dict) and "nicknames" in mapping:
-                    nicknames = mapping["nicknames"]
-                    # 格式化显示：【称呼】：昵称1, 昵称2, 昵称3
-                    nicknames_str = ", ".join(nicknames)
-                    nickname_address_content += f"\n* 【{address}】: {nicknames_str};"
-
-        # 根据配置的位置注入映射表
-        system_content = ""
-        if nickname_address_content:
-            if BotSettings.NICKNAME_ADDRESS_INJECTION_POSITION == "top":
-                system_content = f"{nickname_address_content}\n\n{base_content}"
-            else:  # bottom
-                system_content = f"{base_content}{nickname_address_content}"
-        else:
-            system_content = base_content
+    def get_group_memories(self, key: str, is_group: bool = True) -> List[str]:
+        """群聊的长期记忆（已掩码敏感数据），私聊返回空列表"""
+        if not (is_group and hasattr(key, "startswith") and key.startswith("group_")):
+            return []
+        group_id = key.replace("group_", "")
+        long_memories = self.long_term_memory.get_memory(group_id, limit=BotSettings.LONG_TERM_MEMORY_LIMIT)
+        # 掩码处理记忆中的敏感数据
+        return [mask_sensitive_data(memory) for memory in long_memories]
+
+    def build_system_prompt(
+        self, key: str, is_group: bool = True, memories: Optional[List[str]] = None, static_content: Optional[str] = None
+    ) -> Message:
+        """构建系统提示词
+
+        灵魂文档与昵称映射表取自缓存，每次只拼接群长期记忆部分。
+        memories 为要写入的长期记忆，未提供时读取该群最近的 long_term_memory_limit 条记忆。
+        static_content 为调用方已从缓存取得的静态部分，未提供时从缓存读取。
+        """
+        system_content = self.prompt_cache.get_static_content() if static_content is None else static_content
 
         # 如果是群聊，添加长期记忆
-        if is_group and hasattr(key, "startswith") and key.startswith("group_"):
-            group_id = key.replace("group_", "")
-            long_memories = self.long_term_memory.get_memory(group_id, limit=BotSettings.LONG_TERM_MEMORY_LIMIT)
-            if long_memories:
-                system_content += "\n## 记忆内容:"
-                for i, memory in enumerate[str](long_memories, 1):
-                    # 掩码处理记忆中的敏感数据
-                    masked_memory = mask_sensitive_data(memory)
-                    system_content += f"\n{i}. {masked_memory}"
-
-        system_content += """\n如果有需要长期记住的信息，请在回复中使用“【长期记忆】内容【/长期记忆】“的格式标记"""
+        if memories is None:
+            memories = self.get_group_memories(key, is_group)
+        if memories:
+            system_content += MEMORY_SECTION_HEADER
+            for i, memory in enumerate[str](memories, 1):
+                system_content += f"\n{i}. {memory}"
+
+        system_content += LONG_TERM_MEMORY_INSTRUCTION
 
         return Message(content=Content(system_content), role=ROLE_TYPE.SYSTEM)
+
+    def assemble_context(self, key: str, is_group: bool, budget: int) -> Tuple[List[Message], ContextAssembler]:
+        """在token预算内拼装主模型请求的上下文
+
+        灵魂文档与最新一条消息（当前用户消息）必定发送；之后依次放入摘要、长期记忆（从最新的开始）
+        和最近的对话，放不下的部分舍弃。有摘要时只放入摘要尚未覆盖的消息（至少5条）；
+        最近的对话连同当前消息不超过 context_max_messages 条。
+        返回 [系统提示词, 摘要, *最近的消息] 以及记录了各部分token数的拼装器。
+        """
+        conv = self.get_conversation(key)
+        messages = conv.global_messages
+        assembler = ContextAssembler(budget)
+
+        static_content = self.prompt_cache.get_static_content()
+        assembler.require("system", estimate_text_tokens(static_content + LONG_TERM_MEMORY_INSTRUCTION) + MESSAGE_OVERHEAD_TOKENS)
+        if messages:
+            assembler.require("history", estimate_message_tokens(messages[-1]))
+
+        summary_message = None
+        if conv.summary:
+            summary_message = Message(content=Content(f"[对话摘要] {conv.summary}"), role=ROLE_TYPE.SYSTEM)
+            if not assembler.offer("summary", estimate_message_tokens(summary_message)):
+                summary_message = None
+
+        memories = self.get_group_memories(key, is_group)
+        if memories and assembler.offer("memories", estimate_text_tokens(MEMORY_SECTION_HEADER)):
+            memories = assembler.pack_texts("memories", memories, overhead=2)
+        else:
+            memories = []
+
+        history: List[Message] = []
+        if messages:
+            candidates = messages.window(max(conv.unsummarized_count, 5) if summary_message else None)
+            recent = assembler.pack_recent("history", candidates[:-1], limit=BotSettings.CONTEXT_MAX_MESSAGES - 1)
+            history = [*recent, messages[-1]]
+
+        system_message = self.build_system_prompt(key, is_group, memories, static_content)
+        context = [system_message, *([summary_message] if summary_message else []), *history]
+        return context, assembler
@@ -0,0 +1,295 @@
+# core/memory_storage.py
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Set
+
+from ncatbot.utils import get_log
+
+logger = get_log("MemoryStorage")
+
+# 每个群保留的记忆数量上限
+MAX_MEMORIES_PER_GROUP = 100
+
+
+def _ends_with_newline(path: str) -> bool:
+    """检查文件是否以换行符结尾"""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _fsync_directory(path: str):
+    """同步目录项，保证原子替换后的文件名落盘（Windows不支持，忽略）"""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MemoryStorage(ABC):
+    """长期记忆存储后端
+
+    记忆条目为字典：``{"content", "timestamp", "importance", "hash"}``。
+    """
+
+    @abstractmethod
+    def get_memory(self, group_id: str, limit: int = 10) -> List[Dict]:
+        """按时间顺序返回指定群最近的 limit 条记忆，limit<=0 时返回全部"""
+
+    @abstractmethod
+    def add(self, group_id: str, entry: Dict) -> bool:
+        """添加一条记忆，同一群中哈希重复时忽略并返回False"""
+
+    def close(self):
+        """关闭存储，确保数据落盘"""
+
+
+class JsonMemoryStorage(MemoryStorage):
+    """JSON 快照 + 追加日志存储
+
+    新增记忆以 JSON Lines 追加写入日志文件（``<storage_path>.journal``），批量 fsync；
+    日志条目达到阈值后压缩进快照文件（``storage_path``），快照通过临时文件原子替换。
+    启动时先加载快照，再重放日志。
+    """
+
+    def __init__(self, storage_path: str, fsync_batch: int = 16, fsync_interval: float = 1.0, compact_threshold: int = 1000):
+        self.storage_path = storage_path
+        self.journal_path = f"{self.storage_path}.journal"
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self._journal = None
+        self._journal_entries = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.memory: Dict[str, List[Dict]] = self._load_memory()
+        # 每个群已有记忆的哈希集合，用于去重
+        self._hashes: Dict[str, Set[str]] = {
+            group_id: {mem.get("hash", "") for mem in memories}
+            for group_id, memories in self.memory.items()
+        }
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+
+    def _load_memory(self) -> Dict[str, List[Dict]]:
+        """加载长期记忆：读取快照并重放日志"""
+        memory: Dict[str, List[Dict]] = {}
+        if os.path.exists(self.storage_path):
+            try:
+                with open(self.storage_path, "r", encoding="utf-8") as f:
+                    memory = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                logger.error(f"加载长期记忆失败: {e}")
+                memory = {}
+
+        if os.path.exists(self.journal_path):
+            try:
+                with open(self.journal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # 崩溃时最后一行可能只写了一半，忽略
+                            logger.warning("长期记忆日志存在不完整的记录，已跳过")
+                            continue
+                        group_id = record.pop("group_id")
+                        group_memory = memory.setdefault(group_id, [])
+                        if all(mem.get("hash") != record.get("hash") for mem in group_memory):
+                            group_memory.append(record)
+                            if len(group_memory) > MAX_MEMORIES_PER_GROUP:
+                                memory[group_id] = group_memory[-MAX_MEMORIES_PER_GROUP:]
+                        self._journal_entries += 1
+            except IOError as e:
+                logger.error(f"重放长期记忆日志失败: {e}")
+
+        return memory
+
+    def _save_memory(self) -> bool:
+        """保存长期记忆快照：写入临时文件后原子替换"""
+        tmp_path = f"{self.storage_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.memory, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.storage_path)
+            _fsync_directory(os.path.dirname(os.path.abspath(self.storage_path)))
+            return True
+        except IOError as e:
+            logger.error(f"保存长期记忆失败: {e}")
+            return False
+
+    def _append_journal(self, group_id: str, entry: Dict):
+        """追加一条日志记录，按批次或时间间隔 fsync"""
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+                # 上次崩溃留下的半行记录没有换行符，先补上，避免与新记录拼接
+                if self._journal.tell() > 0 and not _ends_with_newline(self.journal_path):
+                    self._journal.write("\n")
+            self._journal.write(json.dumps({"group_id": group_id, **entry}, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self._journal_entries += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+        except IOError as e:
+            logger.error(f"写入长期记忆日志失败: {e}")
+
+    def get_memory(self, group_id: str, limit: int = 10) -> List[Dict]:
+        memories = self.memory.get(group_id, [])
+        return memories[-limit:] if limit > 0 else list(memories)
+
+    def add(self, group_id: str, entry: Dict) -> bool:
+        hashes = self._hashes.setdefault(group_id, set())
+        if entry["hash"] in hashes:
+            return False
+
+        group_memory = self.memory.setdefault(group_id, [])
+        group_memory.append(entry)
+        hashes.add(entry["hash"])
+
+        # 限制每个群的记忆数量
+        if len(group_memory) > MAX_MEMORIES_PER_GROUP:
+            for removed in group_memory[:-MAX_MEMORIES_PER_GROUP]:
+                hashes.discard(removed.get("hash", ""))
+            self.memory[group_id] = group_memory[-MAX_MEMORIES_PER_GROUP:]
+
+        self._append_journal(group_id, entry)
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+        return True
+
+    def sync(self):
+        """将已写入的日志落盘"""
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """将日志压缩进快照并清空日志"""
+        if not self._save_memory():
+            return
+        # 快照已包含日志中的所有记录，可以安全截断日志
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+        self._journal_entries = 0
+        self._unsynced = 0
+
+    def close(self):
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+
+class SqliteMemoryStorage(MemoryStorage):
+    """SQLite 存储
+
+    ``(group_id, hash)`` 唯一索引负责去重，``(group_id, timestamp)`` 索引支持按群查询最近的记忆，
+    均为 O(log n) 的索引查询。首次打开时若存在旧的 JSON 存储，会自动迁移。
+
+    ``(group_id, timestamp)`` 有意不设为唯一索引：时间戳只是写入时刻，同一群内容不同的两条记忆
+    （同一时刻连续写入、时钟回拨或旧 JSON 中手工编辑的记录）可能时间戳相同，唯一约束会让
+    INSERT OR IGNORE 静默丢弃其中一条。同一时间戳的记忆按自增 id 排序。
+    """
+
+    def __init__(self, db_path: str, migrate_from: str = None):  # type: ignore
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS memories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_id TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                importance REAL NOT NULL DEFAULT 1.0,
+                hash TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_memories_group_hash ON memories (group_id, hash);
+            CREATE INDEX IF NOT EXISTS idx_memories_group_time ON memories (group_id, timestamp);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        self.conn.commit()
+        if migrate_from:
+            self.migrate_from_json(migrate_from)
+
+    def migrate_from_json(self, storage_path: str) -> int:
+        """从 JSON 快照和日志迁移记忆，只执行一次，返回迁移的条目数"""
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+            return 0
+        if not os.path.exists(storage_path) and not os.path.exists(f"{storage_path}.journal"):
+            return 0
+
+        source = JsonMemoryStorage(storage_path, compact_threshold=float("inf"))  # type: ignore
+        rows = [
+            (group_id, mem["content"], mem.get("timestamp", ""), mem.get("importance", 1.0), mem.get("hash", ""))
+            for group_id, memories in source.memory.items()
+            for mem in memories
+        ]
+        source.close()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO memories (group_id, content, timestamp, importance, hash) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)", (storage_path,)
+            )
+        logger.info(f"已从 {storage_path} 迁移 {len(rows)} 条长期记忆到 {self.db_path}")
+        return len(rows)
+
+    def get_memory(self, group_id: str, limit: int = 10) -> List[Dict]:
+        sql = "SELECT content, timestamp, importance, hash FROM memories WHERE group_id = ? ORDER BY timestamp DESC, id DESC"
+        params: tuple = (group_id,)
+        if limit > 0:
+            sql += " LIMIT ?"
+            params = (group_id, limit)
+        rows = self.conn.execute(sql, params).fetchall()
+        return [
+            {"content": content, "timestamp": timestamp, "importance": importance, "hash": content_hash}
+            for content, timestamp, importance, content_hash in reversed(rows)
+        ]
+
+    def add(self, group_id: str, entry: Dict) -> bool:
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO memories (group_id, content, timestamp, importance, hash) VALUES (?, ?, ?, ?, ?)",
+                (group_id, entry["content"], entry["timestamp"], entry["importance"], entry["hash"]),
+            )
+            if cursor.rowcount == 0:
+                return False
+            # 限制每个群的记忆数量，删除超出上限的最旧记忆
+            self.conn.execute(
+                """
+                DELETE FROM memories WHERE group_id = ? AND id IN (
+                    SELECT id FROM memories WHERE group_id = ?
+                    ORDER BY timestamp DESC, id DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (group_id, group_id, MAX_MEMORIES_PER_GROUP),
+            )
+        return True
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,116 @@
+# core/message_buffer.py
+from collections.abc import Sequence
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Union, overload
+
+from bot.core.model import Message
+
+
+class MessageBuffer(Sequence):
+    """定长环形消息缓冲区
+
+    追加为 O(1)，超过容量时覆盖最旧的消息，无需像列表截取那样重新分配。
+    ``window(limit)`` 返回最近 limit 条消息的只读视图，不复制消息。
+    """
+
+    __slots__ = ("maxlen", "_items", "_start", "_size")
+
+    def __init__(self, maxlen: int, messages: Iterable[Message] = ()):
+        if maxlen <= 0:
+            raise ValueError("maxlen必须大于0")
+        self.maxlen = maxlen
+        self._items: List[Optional[Message]] = [None] * maxlen
+        self._start = 0
+        self._size = 0
+        for message in messages:
+            self.append(message)
+
+    def append(self, message: Message):
+        """追加消息，缓冲区已满时覆盖最旧的消息"""
+        if self._size < self.maxlen:
+            self._items[(self._start + self._size) % self.maxlen] = message
+            self._size += 1
+        else:
+            self._items[self._start] = message
+            self._start = (self._start + 1) % self.maxlen
+
+    @property
+    def full(self) -> bool:
+        return self._size == self.maxlen
+
+    def clear(self):
+        self._items = [None] * self.maxlen
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _get(self, index: int) -> Message:
+        return self._items[(self._start + index) % self.maxlen]  # type: ignore
+
+    @overload
+    def __getitem__(self, index: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Message]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("MessageBuffer index out of range")
+        return self._get(index)
+
+    def _iter_range(self, offset: int, length: int) -> Iterator[Message]:
+        """按顺序遍历第 offset 条起的 length 条消息，至多拆分为底层列表的两段"""
+        begin = (self._start + offset) % self.maxlen
+        end = begin + length
+        if end <= self.maxlen:
+            return islice(self._items, begin, end)  # type: ignore
+        return chain(islice(self._items, begin, None), islice(self._items, 0, end - self.maxlen))  # type: ignore
+
+    def __iter__(self) -> Iterator[Message]:
+        return self._iter_range(0, self._size)
+
+    def window(self, limit: Optional[int] = None) -> "MessageWindow":
+        """获取最近 limit 条消息的视图，limit 为空时包含全部消息"""
+        length = self._size if limit is None else min(max(limit, 0), self._size)
+        return MessageWindow(self, self._size - length, length)
+
+    def __repr__(self) -> str:
+        return f"MessageBuffer(maxlen={self.maxlen}, size={self._size})"
+
+
+class MessageWindow(Sequence):
+    """MessageBuffer 中一段连续消息的只读视图
+
+    视图不复制消息，应在缓冲区再次追加消息前使用完毕。
+    """
+
+    __slots__ = ("_buffer", "_offset", "_length")
+
+    def __init__(self, buffer: MessageBuffer, offset: int, length: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._buffer._get(self._offset + i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MessageWindow index out of range")
+        return self._buffer._get(self._offset + index)
+
+    def __iter__(self) -> Iterator[Message]:
+        return self._buffer._iter_range(self._offset, self._length)
+
+    def __repr__(self) -> str:
+        return f"MessageWindow(length={self._length})"
@@ -0,0 +1,255 @@
+# core/metrics.py
+import bisect
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings
+
+logger = get_log("Metrics")
+
+# 导出的指标名前缀
+METRIC_PREFIX = "bionicbot_"
+
+# 各处理阶段耗时直方图的桶上界（秒），覆盖微秒级的本地处理到分钟级的模型调用，最后一个桶为 +Inf
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# 处理阶段 -> 说明
+STAGES = {
+    "event_parse": "解析消息事件：提取用户信息、文本与图片并清理消息",
+    "keyword_check": "关键词匹配",
+    "decision": "AI回复决策请求（不含缓存命中）",
+    "history_fetch": "拉取并整合历史消息",
+    "prompt_build": "拼装主模型请求",
+    "main_model": "主模型请求，流式请求为建立响应流的耗时",
+    "image_interpretation": "单张图片解读（含缓存查询）",
+    "send_bubble": "发送一个消息气泡（BotAPI调用，不含打字延迟）",
+    "summary": "生成一个对话的摘要",
+}
+
+# 指标名（不含前缀） -> 说明
+METRIC_HELP = {
+    "stage_seconds": "各处理阶段的耗时",
+    "model_request_seconds": "单个模型的请求耗时",
+    "model_requests_total": "各模型的请求次数",
+    "model_tokens_total": "各模型服务端统计的token数",
+    "conversation_messages_total": "各对话收到的消息数",
+    "conversation_replies_total": "各对话决定回复的次数",
+    "conversation_bubbles_total": "各对话发出的消息气泡数",
+    "conversations": "记忆中的对话数",
+    "dispatcher_queue_depth": "所有对话信箱中等待处理的消息数",
+    "dispatcher_active_conversations": "正在处理或等待处理的对话数",
+    "dispatcher_running": "正在执行的处理任务数",
+    "model_queue_depth": "各模型请求队列中等待的请求数",
+    "summary_queue_depth": "排队等待生成摘要的对话数",
+    "summary_lag_seconds": "摘要队列中最早入队的对话已等待的秒数",
+    "cache_hit_rate": "决策缓存与图片解读缓存的命中率",
+}
+
+LabelSet = Tuple[Tuple[str, str], ...]
+# 采集函数返回 (指标名, 标签, 数值) 形式的瞬时值
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+
+def _labels(labels: Dict[str, object]) -> LabelSet:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [*labels, extra] if extra else list(labels)
+    if not pairs:
+        return ""
+    escape = lambda value: value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """累计耗时直方图，格式与 Prometheus 的 histogram 一致"""
+
+    def __init__(self, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """各桶上界 -> 不超过该上界的观测数"""
+        result, total = [], 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.bucket_counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q 分位数的估计（桶内线性插值），没有观测时返回None"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.bucket_counts):
+            if count and cumulative + count >= target:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1] * 2
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return self.buckets[-1] * 2
+
+
+class MetricsRegistry:
+    """进程内的指标注册表
+
+    直方图与计数器在调用处即时更新；队列深度、对话数等瞬时值由采集函数在导出时读取。
+    所有更新都在事件循环线程中进行，不需要加锁。
+    max_conversations 限制按对话统计的计数器中不同对话的数量，超出的对话合并为 other。
+    """
+
+    def __init__(self, max_conversations: int = 200):
+        self.max_conversations = max_conversations
+        self.histograms: Dict[Tuple[str, LabelSet], Histogram] = {}
+        self.counters: Dict[Tuple[str, LabelSet], float] = Counter()
+        self._collectors: List[Collector] = []
+        self._conversations = set()
+
+    def reset(self):
+        """清空直方图与计数器，保留采集函数"""
+        self.histograms.clear()
+        self.counters.clear()
+        self._conversations.clear()
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.observe("stage_seconds", seconds, stage=stage)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """记录 with 块的耗时，异常退出时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        self.counters[(name, _labels(labels))] += amount
+
+    def inc_conversation(self, name: str, conversation: str, amount: float = 1):
+        """按对话计数，对话数量超过上限后新出现的对话计入 other"""
+        if conversation not in self._conversations:
+            if len(self._conversations) >= self.max_conversations:
+                conversation = "other"
+            else:
+                self._conversations.add(conversation)
+        self.inc(name, amount, conversation=conversation)
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的次数、总耗时、平均耗时与 p50/p95 估计"""
+        summary = {}
+        for (name, labels), histogram in self.histograms.items():
+            if name != "stage_seconds" or not histogram.count:
+                continue
+            summary[dict(labels)["stage"]] = {
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "mean": histogram.sum / histogram.count,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+            }
+        return summary
+
+    def _collect(self) -> Dict[Tuple[str, LabelSet], float]:
+        gauges = {}
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges[(name, _labels(labels))] = value
+            except Exception as e:
+                logger.warning(f"指标采集失败: {e}")
+        return gauges
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+
+        def header(name: str, kind: str):
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+        for kind, values in (("counter", dict(self.counters)), ("gauge", self._collect())):
+            current = None
+            for (name, labels), value in sorted(values.items()):
+                if name != current:
+                    header(name, kind)
+                    current = name
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+        current = None
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            if name != current:
+                header(name, "histogram")
+                current = name
+            for bound, count in histogram.cumulative():
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, ('le', bound))} {count}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """在本地HTTP端口上以 Prometheus 文本格式导出指标（GET /metrics）"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", headers={"X-Prometheus-Format": "0.0.4"})
+
+    async def start(self) -> bool:
+        """启动HTTP服务，端口被占用等失败时只记录日志"""
+        if self._runner is not None:
+            return True
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError as e:
+            await runner.cleanup()
+            logger.warning(f"指标服务启动失败（{self.host}:{self.port}）: {e}")
+            return False
+        self._runner = runner
+        logger.info(f"指标服务已启动: http://{self.host}:{self.port}/metrics")
+        return True
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# 全局指标注册表
+metrics = MetricsRegistry(BotSettings.METRICS_MAX_CONVERSATIONS)
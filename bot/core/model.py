@@ -56,7 +56,7 @@ class _Bubble:
         return {"type": self.msg_type, self.msg_type: self.msg}
 
 
-@dataclass
+@dataclass(slots=True)
 class Content:
 
     msg: str
@@ -66,7 +66,7 @@ class Content:
         return self.msg
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """以特定身份发出的消息，包含一个 Content"""
 
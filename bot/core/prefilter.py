@@ -0,0 +1,145 @@
+# core/prefilter.py
+import json
+import math
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional, Sequence
+
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings
+
+logger = get_log("DecisionPrefilter")
+
+# 疑问与延续对话的常见说法
+QUESTION_PATTERN = re.compile(r"[?？]|吗|呢|什么|怎么|为什么|为啥|啥|咋|如何|哪|谁|几")
+CONTINUATION_PHRASES = ("接着说", "继续", "然后呢", "后来呢", "还有吗")
+
+# 特征权重（logit），正值倾向回复，负值倾向不回复
+FEATURE_WEIGHTS: Dict[str, float] = {
+    "bias": -1.0,
+    "very_short": -2.0,
+    "long": 0.5,
+    "symbol_only": -3.0,
+    "char_run": -2.0,
+    "echo": -2.5,
+    "question": 1.0,
+    "continuation": 1.0,
+    "mentions_bot": 2.5,
+    "bot_recent": 1.5,
+}
+
+# 机器人上次回复在该时间内（秒）视为仍在对话中
+BOT_RECENT_SECONDS = 120
+
+
+class Verdict(Enum):
+    """预筛结论"""
+    YES = "yes"
+    NO = "no"
+    UNSURE = "unsure"
+
+
+@dataclass
+class PrefilterResult:
+    """预筛结果"""
+    verdict: Verdict
+    score: float
+    features: Dict[str, float] = field(default_factory=dict)
+
+
+def _is_symbol(char: str) -> bool:
+    """标点、符号与表情等不含文字信息的字符"""
+    return unicodedata.category(char)[0] in ("P", "S", "Z", "C")
+
+
+class DecisionPrefilter:
+    """AI决策前的本地预筛
+
+    根据消息长度、字符类别、复读、机器人上次回复的时间、是否提到机器人等特征
+    计算回复倾向分数。分数足够高或足够低时直接得出结论，只有不确定的消息才请求决策模型。
+    """
+
+    def __init__(self, yes_threshold: float = 0.9, no_threshold: float = 0.1, bot_name: Optional[str] = None):
+        self.yes_threshold = yes_threshold
+        self.no_threshold = no_threshold
+        self.bot_name = (bot_name or BotSettings.BOT_NAME).lower()
+
+    def extract_features(
+        self,
+        message: str,
+        recent_messages: Sequence[str] = (),
+        seconds_since_reply: Optional[float] = None
+    ) -> Dict[str, float]:
+        """提取特征，recent_messages 为同一对话中之前的几条消息"""
+        text = message.strip()
+        visible = [char for char in text if not char.isspace()]
+        symbols = sum(1 for char in visible if _is_symbol(char))
+        return {
+            "bias": 1.0,
+            "very_short": float(len(visible) <= 2),
+            "long": float(len(visible) >= 15),
+            "symbol_only": float(not visible or symbols == len(visible)),
+            "char_run": float(len(visible) >= 2 and len(set(visible)) == 1),
+            "echo": float(bool(text) and any(text == recent.strip() for recent in recent_messages)),
+            "question": float(bool(QUESTION_PATTERN.search(text))),
+            "continuation": float(any(phrase in text for phrase in CONTINUATION_PHRASES)),
+            "mentions_bot": float(bool(self.bot_name) and self.bot_name in text.lower()),
+            "bot_recent": float(seconds_since_reply is not None and seconds_since_reply <= BOT_RECENT_SECONDS),
+        }
+
+    @staticmethod
+    def score(features: Dict[str, float]) -> float:
+        """回复倾向分数（0-1）"""
+        logit = sum(FEATURE_WEIGHTS.get(name, 0.0) * value for name, value in features.items())
+        return 1 / (1 + math.exp(-logit))
+
+    def classify(
+        self,
+        message: str,
+        recent_messages: Sequence[str] = (),
+        seconds_since_reply: Optional[float] = None
+    ) -> PrefilterResult:
+        features = self.extract_features(message, recent_messages, seconds_since_reply)
+        score = self.score(features)
+        if score >= self.yes_threshold:
+            verdict = Verdict.YES
+        elif score <= self.no_threshold:
+            verdict = Verdict.NO
+        else:
+            verdict = Verdict.UNSURE
+        return PrefilterResult(verdict, score, features)
+
+
+class DecisionRecorder:
+    """把回复决策按行追加到 JSONL 文件，供离线评估预筛效果"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def record(
+        self,
+        group_id: Optional[str],
+        message: str,
+        recent_messages: Sequence[str],
+        seconds_since_reply: Optional[float],
+        prefilter_result: Optional[PrefilterResult],
+        model_decision: Optional[bool]
+    ):
+        entry: Dict[str, Any] = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "group_id": group_id,
+            "message": message,
+            "recent": list(recent_messages),
+            "seconds_since_reply": seconds_since_reply,
+            "prefilter": prefilter_result.verdict.value if prefilter_result else None,
+            "score": round(prefilter_result.score, 4) if prefilter_result else None,
+            "model_decision": model_decision,
+        }
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except IOError as e:
+            logger.error(f"写入决策记录失败: {e}")
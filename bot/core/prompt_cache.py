@@ -0,0 +1,108 @@
+# core/prompt_cache.py
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings
+
+logger = get_log("PromptCache")
+
+DEFAULT_SOUL_CONTENT = "你是一个名为 Bionic 的 AI 助手，乐于助人且知识渊博。"
+
+LONG_TERM_MEMORY_INSTRUCTION = "\n如果有需要长期记住的信息，请在回复中使用“【长期记忆】内容【/长期记忆】“的格式标记"
+
+
+class SystemPromptCache:
+    """系统提示词静态部分的缓存
+
+    灵魂文档和昵称映射表只在首次使用、灵魂文档修改或相关配置变化时重新拼装。
+    灵魂文档的修改时间与昵称映射表的内容每隔 SOUL_DOC_CHECK_INTERVAL 秒才检查一次，
+    稳定运行时构建提示词不产生磁盘 I/O，也不重复序列化映射表。
+    """
+
+    def __init__(self):
+        self._static_content: Optional[str] = None
+        self._soul_mtime: Optional[float] = None
+        self._config_key: Optional[Tuple[Any, ...]] = None
+        self._mapping_key: Optional[str] = None
+        self._last_check = 0.0
+        self.hits = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def _current_config_key() -> Tuple[Any, ...]:
+        return (
+            BotSettings.SOUL_DOC_PATH,
+            BotSettings.ENABLE_NICKNAME_ADDRESS_INJECTION,
+            BotSettings.NICKNAME_ADDRESS_INJECTION_POSITION,
+        )
+
+    @staticmethod
+    def _current_mapping_key() -> str:
+        # 映射表按内容比较：对象标识在旧对象被回收后可能被新对象复用，原地修改也不会改变标识
+        return json.dumps(BotSettings.NICKNAME_ADDRESS_MAPPING, sort_keys=True, ensure_ascii=False)
+
+    @staticmethod
+    def _soul_doc_mtime() -> Optional[float]:
+        try:
+            return os.stat(BotSettings.SOUL_DOC_PATH).st_mtime
+        except OSError:
+            return None
+
+    def _is_stale(self) -> bool:
+        if self._static_content is None or self._config_key != self._current_config_key():
+            return True
+        now = time.monotonic()
+        if now - self._last_check < BotSettings.SOUL_DOC_CHECK_INTERVAL:
+            return False
+        self._last_check = now
+        return self._soul_doc_mtime() != self._soul_mtime or self._current_mapping_key() != self._mapping_key
+
+    def get_static_content(self) -> str:
+        """获取灵魂文档与昵称映射表拼装后的内容"""
+        if self._is_stale():
+            self._rebuild()
+        else:
+            self.hits += 1
+        return self._static_content
+
+    def _rebuild(self):
+        self._config_key = self._current_config_key()
+        self._mapping_key = self._current_mapping_key()
+        self._soul_mtime = self._soul_doc_mtime()
+        self._last_check = time.monotonic()
+
+        # 读取灵魂文档
+        try:
+            with open(BotSettings.SOUL_DOC_PATH, "r", encoding="utf-8") as f:
+                soul_content = f.read()
+        except FileNotFoundError:
+            logger.warning("灵魂文档未找到，使用默认描述")
+            soul_content = DEFAULT_SOUL_CONTENT
+
+        # 构建昵称映射表内容
+        nickname_address_content = ""
+        if BotSettings.ENABLE_NICKNAME_ADDRESS_INJECTION and BotSettings.NICKNAME_ADDRESS_MAPPING:
+            nickname_address_content += "\n## 以下是多个用户的【称呼】与其【昵称】，请在回复中参考，用【称呼】来指代该用户："
+            for address, mapping in BotSettings.NICKNAME_ADDRESS_MAPPING.items():
+                # 处理新格式：称呼 -> {nicknames: [], qq: ""}
+                if isinstance(mapping, dict) and "nicknames" in mapping:
+                    nicknames_str = ", ".join(mapping["nicknames"])
+                    nickname_address_content += f"\n* 【{address}】: {nicknames_str};"
+
+        # 根据配置的位置注入映射表
+        if nickname_address_content:
+            if BotSettings.NICKNAME_ADDRESS_INJECTION_POSITION == "top":
+                self._static_content = f"{nickname_address_content}\n\n{soul_content}"
+            else:  # bottom
+                self._static_content = f"{soul_content}{nickname_address_content}"
+        else:
+            self._static_content = soul_content
+
+        self.rebuilds += 1
+        logger.debug(f"系统提示词缓存已重建，共 {self.rebuilds} 次")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "rebuilds": self.rebuilds}
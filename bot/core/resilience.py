@@ -0,0 +1,227 @@
+# core/resilience.py
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from volcenginesdkarkruntime._exceptions import ArkAPIConnectionError, ArkAPIStatusError
+
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings, DEFAULT_CONFIG
+from bot.core.scheduler import ROLE_PRIORITY, RequestScheduler
+
+logger = get_log("Resilience")
+
+T = TypeVar("T")
+
+# 可重试的HTTP状态码：请求超时、冲突、限流与服务端错误
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开期间快速失败，不再请求模型"""
+
+
+class ModelCallTimeout(Exception):
+    """模型调用超过单次或总时限"""
+
+
+@dataclass
+class CallPolicy:
+    """一类模型调用的时间预算与重试策略"""
+    # 单次请求的时限（秒）
+    timeout: float
+    # 失败后最多重试的次数
+    max_retries: int
+    # 包括所有重试与等待在内的总时限（秒）
+    deadline: float
+    # 指数退避的基础间隔与上限（秒）
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    @classmethod
+    def for_role(cls, role: str) -> "CallPolicy":
+        """读取模型角色（main/decision/summary/image）的策略，未配置的字段使用默认值"""
+        defaults = DEFAULT_CONFIG["model_call_policies"].get(role, DEFAULT_CONFIG["model_call_policies"]["main"])
+        policy = {**defaults, **BotSettings.MODEL_CALL_POLICIES.get(role, {})}
+        return cls(
+            timeout=policy["timeout"],
+            max_retries=policy["max_retries"],
+            deadline=policy["deadline"],
+            base_delay=BotSettings.RETRY_BASE_DELAY,
+            max_delay=BotSettings.RETRY_MAX_DELAY,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（全抖动指数退避）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """连接错误、超时、限流与服务端错误可以重试，其余错误（参数错误、鉴权失败等）重试也不会成功"""
+    if isinstance(error, (ArkAPIConnectionError, ModelCallTimeout, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, ArkAPIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """服务端通过 Retry-After 头要求的等待时间（秒）"""
+    if not isinstance(error, ArkAPIStatusError):
+        return None
+    try:
+        return float(error.response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续 failure_threshold 次可重试的失败后打开，reset_seconds 内的调用直接失败；
+    之后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+
+    @property
+    def retry_in(self) -> float:
+        """距离允许探测请求还有多少秒"""
+        return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_started_at = None
+        if self.state == self.HALF_OPEN:
+            # 探测请求被取消时不会回报结果，超过 reset_seconds 后允许新的探测
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_seconds:
+                return False
+            self._probe_started_at = now
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"模型 {self.name} 恢复，熔断器关闭")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"模型 {self.name} 连续失败 {self.failures} 次，熔断 {self.reset_seconds:.0f} 秒")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+
+class ResilientCaller:
+    """所有模型调用共用的包装：准入排队、单次时限、总时限、可重试错误的退避重试以及按模型熔断"""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0, scheduler: Optional[RequestScheduler] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.scheduler = scheduler
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # attempts/retries/timeouts/failures/short_circuits
+        self.counters = Counter()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers[model] = CircuitBreaker(model, self.failure_threshold, self.reset_seconds)
+        return breaker
+
+    async def call(self, role: str, model: str, factory: Callable[[], Awaitable[T]], cost: int = 1) -> T:
+        """按 role 的策略调用 factory()，失败时抛出最后一次的异常
+
+        factory 每次重试都会被重新调用，必须能重复发起同一个请求。
+        cost 为请求的估计token数，用于按 tpm 限速；每次重试都会重新排队。
+        """
+        policy = CallPolicy.for_role(role)
+        breaker = self.breaker(model)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            if self.scheduler:
+                # 排队时间计入总时限，超时视为丢弃而不是模型故障
+                remaining = policy.deadline - (time.monotonic() - start)
+                try:
+                    await asyncio.wait_for(self.scheduler.acquire(model, ROLE_PRIORITY[role], cost), timeout=remaining)
+                except asyncio.TimeoutError:
+                    self.counters["queue_timeouts"] += 1
+                    raise ModelCallTimeout(f"{role} 模型 {model} 排队超过总时限 {policy.deadline:.1f} 秒")
+
+            if not breaker.allow():
+                self.counters["short_circuits"] += 1
+                raise CircuitOpenError(f"模型 {model} 熔断中，{breaker.retry_in:.0f} 秒后恢复探测")
+
+            remaining = policy.deadline - (time.monotonic() - start)
+            timeout = min(policy.timeout, remaining)
+            self.counters["attempts"] += 1
+            try:
+                result = await asyncio.wait_for(factory(), timeout=timeout)
+            except Exception as e:
+                error = e
+                if isinstance(e, asyncio.TimeoutError):
+                    self.counters["timeouts"] += 1
+                    error = ModelCallTimeout(f"{role} 模型 {model} 调用超过 {timeout:.1f} 秒")
+                if not is_retryable(error):
+                    # 服务端有响应，说明模型本身可用
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+
+                delay = retry_after(error)
+                if delay is None:
+                    delay = policy.backoff(attempt)
+                attempt += 1
+                if attempt > policy.max_retries or time.monotonic() - start + delay >= policy.deadline:
+                    self.counters["failures"] += 1
+                    if error is e:
+                        raise
+                    raise error from e
+                self.counters["retries"] += 1
+                logger.warning(f"{role} 模型 {model} 调用失败（{error}），{delay:.2f} 秒后第 {attempt} 次重试")
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self.counters,
+            "breakers": {name: breaker.state for name, breaker in self.breakers.items()},
+        }
+
+
+async def iterate_with_timeout(events: AsyncIterable[T], timeout: float) -> AsyncIterator[T]:
+    """逐个产出流式事件，相邻两个事件间隔超过 timeout 秒时抛出 ModelCallTimeout"""
+    iterator = events.__aiter__()
+    while True:
+        try:
+            event = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise ModelCallTimeout(f"流式响应超过 {timeout:.1f} 秒没有新内容")
+        yield event
@@ -0,0 +1,266 @@
+# core/router.py
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings
+from bot.core.metrics import metrics
+from bot.core.resilience import CircuitBreaker, CircuitOpenError, ModelCallTimeout, ResilientCaller, is_retryable
+from bot.core.scheduler import RequestShed
+
+logger = get_log("ModelRouter")
+
+T = TypeVar("T")
+
+# 延迟直方图的桶上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0)
+
+
+def role_model(role: str) -> str:
+    """模型调用类型对应的主模型"""
+    return {
+        "main": BotSettings.MODEL,
+        "decision": BotSettings.DECISION_MODEL,
+        "summary": BotSettings.SUMMARY_MODEL,
+        "image": BotSettings.IMAGE_MODEL,
+    }[role]
+
+
+def can_fall_back(error: BaseException) -> bool:
+    """换一个模型可能成功的失败：可重试的错误或熔断。参数错误、鉴权失败等换模型也会同样失败"""
+    return isinstance(error, CircuitOpenError) or is_retryable(error)
+
+
+class LatencyTracker:
+    """单个模型的调用延迟
+
+    同时维护两份直方图：累计直方图用于导出，指数衰减的直方图用于估计近期的 p50/p95，
+    每次观测时旧样本的权重乘以 (1 - alpha)。
+    updated_at 为最近一次观测或探测的时间，用于判断估计是否过时。
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._weights = [0.0] * (len(LATENCY_BUCKETS) + 1)
+        self.updated_at: Optional[float] = None
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                return index
+        return len(LATENCY_BUCKETS)
+
+    def observe(self, seconds: float):
+        bucket = self._bucket(seconds)
+        self.bucket_counts[bucket] += 1
+        self.count += 1
+        self.sum += seconds
+        self._weights = [weight * (1 - self.alpha) for weight in self._weights]
+        self._weights[bucket] += self.alpha
+        self.updated_at = time.monotonic()
+
+    def stale(self, max_age: float, now: float) -> bool:
+        """已有样本但超过 max_age 秒没有更新"""
+        return self.updated_at is not None and now - self.updated_at >= max_age
+
+    def quantile(self, q: float) -> Optional[float]:
+        """近期延迟的 q 分位数估计（桶内线性插值），没有样本时返回None"""
+        total = sum(self._weights)
+        if not total:
+            return None
+        target = q * total
+        cumulative = 0.0
+        for index, weight in enumerate(self._weights):
+            if weight and cumulative + weight >= target:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1] * 2
+                return lower + (upper - lower) * (target - cumulative) / weight
+            cumulative += weight
+        return LATENCY_BUCKETS[-1] * 2
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.quantile(0.5)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.quantile(0.95)
+
+    def histogram(self) -> Dict[str, object]:
+        """累计直方图：各桶上界 -> 不超过该上界的调用数"""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.bucket_counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class ModelRouter:
+    """按模型调用类型在多个模型间路由
+
+    每类调用的候选模型分为若干档：主模型为第0档，model_fallbacks 中依次是后备的各档，
+    一档可以是一个模型名或同等质量的模型名列表（把主模型写进第一档即可与其他模型竞争）。
+    同一档内优先选择近期 p50 延迟最低的健康模型（未熔断），没有延迟数据的模型先试；
+    延迟估计超过 probe_seconds 未更新的同档模型视同没有数据，由下一次调用探测，
+    避免一次偶然的慢请求让较快的模型再也不被选中。当前模型失败时依次换下一个候选模型。配置了 model_hedge_ms 的调用类型，
+    请求超过该时间仍未完成时并发请求下一个候选模型，先成功的结果生效。
+    """
+
+    def __init__(self, caller: ResilientCaller, alpha: float = 0.1, probe_seconds: float = 30.0):
+        self.caller = caller
+        self.alpha = alpha
+        self.probe_seconds = probe_seconds
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def tiers(cls, role: str) -> List[List[str]]:
+        """调用类型的候选模型，按档次排列"""
+        primary = role_model(role)
+        tiers = [[tier] if isinstance(tier, str) else list(tier) for tier in BotSettings.MODEL_FALLBACKS.get(role, [])]
+        if not tiers or primary not in tiers[0]:
+            tiers.insert(0, [primary])
+        return tiers
+
+    def tracker(self, model: str) -> LatencyTracker:
+        tracker = self.latency.get(model)
+        if tracker is None:
+            tracker = self.latency[model] = LatencyTracker(self.alpha)
+        return tracker
+
+    def _healthy(self, model: str) -> bool:
+        breaker = self.caller.breakers.get(model)
+        return breaker is None or breaker.state != CircuitBreaker.OPEN
+
+    def _estimate(self, model: str, now: float) -> float:
+        """排序用的延迟估计，没有数据或已过时的模型为0，排在同档最前"""
+        tracker = self.tracker(model)
+        if tracker.stale(self.probe_seconds, now):
+            return 0.0
+        return tracker.p50 or 0.0
+
+    def candidates(self, role: str) -> List[str]:
+        """按尝试顺序排列的候选模型，已熔断的模型排在最后"""
+        ordered, unhealthy, seen = [], [], set()
+        now = time.monotonic()
+        for tier in self.tiers(role):
+            models = [model for model in tier if model not in seen]
+            seen.update(models)
+            models.sort(key=lambda model: self._estimate(model, now))
+            healthy = [model for model in models if self._healthy(model)]
+            if len(models) > 1 and healthy and self.tracker(healthy[0]).stale(self.probe_seconds, now):
+                # 由本次调用探测过时的模型，同时发起的其他调用仍按原有估计排序
+                self.tracker(healthy[0]).updated_at = now
+            ordered.extend(healthy)
+            unhealthy.extend(model for model in models if not self._healthy(model))
+        return ordered + unhealthy
+
+    async def _attempt(self, role: str, model: str, factory: Callable[[str], Awaitable[T]], cost: int) -> T:
+        start = time.monotonic()
+        try:
+            result = await self.caller.call(role, model, lambda: factory(model), cost)
+        except ModelCallTimeout:
+            # 超时也是延迟样本，让持续变慢的模型排到后面
+            self._observe(role, model, time.monotonic() - start, "timeout")
+            raise
+        except RequestShed:
+            metrics.inc("model_requests_total", role=role, model=model, outcome="shed")
+            raise
+        except Exception:
+            metrics.inc("model_requests_total", role=role, model=model, outcome="error")
+            raise
+        self._observe(role, model, time.monotonic() - start, "success")
+        usage = getattr(result, "usage", None)
+        for direction in ("input", "output"):
+            tokens = getattr(usage, f"{direction}_tokens", None)
+            if isinstance(tokens, int):
+                metrics.inc("model_tokens_total", tokens, model=model, direction=direction)
+        return result
+
+    def _observe(self, role: str, model: str, seconds: float, outcome: str):
+        self.tracker(model).observe(seconds)
+        metrics.observe("model_request_seconds", seconds, role=role, model=model)
+        metrics.inc("model_requests_total", role=role, model=model, outcome=outcome)
+
+    async def _hedged(self, role: str, primary: str, backup: str, factory: Callable[[str], Awaitable[T]], cost: int, hedge_after: float) -> T:
+        """先请求 primary，超过 hedge_after 秒仍未完成时并发请求 backup，返回先成功的结果"""
+        tasks = {asyncio.create_task(self._attempt(role, primary, factory, cost)): primary}
+        last_error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self.hedges += 1
+                logger.info(f"{role} 模型 {primary} 超过 {hedge_after:.2f} 秒未完成，并发请求 {backup}")
+            elif next(iter(done)).exception() is None:
+                return next(iter(done)).result()
+            elif not can_fall_back(next(iter(done)).exception()):
+                raise next(iter(done)).exception()
+            tasks[asyncio.create_task(self._attempt(role, backup, factory, cost))] = backup
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        # 备用模型在主模型仍在进行时先完成
+                        if tasks[task] == backup and pending:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    if not can_fall_back(last_error):
+                        raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        raise last_error
+
+    async def call(self, role: str, factory: Callable[[str], Awaitable[T]], cost: int = 1, hedge: bool = True, model: Optional[str] = None) -> T:
+        """依次尝试候选模型调用 factory(model)，全部失败时抛出最后一个异常
+
+        只有可重试的错误与熔断才换下一个模型，其余错误（参数错误、鉴权失败等）
+        与负载过高被丢弃的请求（RequestShed）直接抛出。
+        hedge 为False时不并发请求，用于建立流式响应等不能重复的调用。
+        指定 model 时只请求该模型，不对冲也不换模型，用于带 previous_response_id 的请求。
+        """
+        candidates = [model] if model else self.candidates(role)
+        hedge_after = BotSettings.MODEL_HEDGE_MS.get(role, 0) / 1000 if hedge and not model else 0
+        last_error: Optional[BaseException] = None
+        index = 0
+        while index < len(candidates):
+            model = candidates[index]
+            try:
+                if hedge_after and index + 1 < len(candidates):
+                    index += 2
+                    return await self._hedged(role, model, candidates[index - 1], factory, cost, hedge_after)
+                index += 1
+                return await self._attempt(role, model, factory, cost)
+            except RequestShed:
+                raise
+            except Exception as e:
+                if not can_fall_back(e):
+                    raise
+                last_error = e
+                if index < len(candidates):
+                    self.fallbacks += 1
+                    logger.warning(f"{role} 模型 {model} 调用失败（{e}），改用 {candidates[index]}")
+        raise last_error
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "fallbacks": self.fallbacks,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "models": {
+                model: {"p50": tracker.p50, "p95": tracker.p95, **tracker.histogram()}
+                for model, tracker in self.latency.items()
+            },
+        }
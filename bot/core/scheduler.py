@@ -0,0 +1,214 @@
+# core/scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from ncatbot.utils import get_log
+from bot.config.settings import BotSettings
+from bot.core.context_assembler import MESSAGE_OVERHEAD_TOKENS, estimate_text_tokens
+
+logger = get_log("RequestScheduler")
+
+
+class Priority(IntEnum):
+    """模型请求优先级，数值越小越先执行"""
+    REPLY = 0
+    DECISION = 1
+    IMAGE = 2
+    SUMMARY = 3
+
+
+# 模型调用类型对应的优先级
+ROLE_PRIORITY: Dict[str, Priority] = {
+    "main": Priority.REPLY,
+    "decision": Priority.DECISION,
+    "image": Priority.IMAGE,
+    "summary": Priority.SUMMARY,
+}
+
+
+class RequestShed(Exception):
+    """负载过高时丢弃的低优先级请求"""
+
+
+def estimate_tokens(payload: dict) -> int:
+    """粗略估计请求输入的token数，见 estimate_text_tokens"""
+    total = 0
+    for item in payload.get("input", []):
+        content = item.get("content", "")
+        if isinstance(content, str):
+            total += estimate_text_tokens(content)
+        else:
+            total += sum(estimate_text_tokens(part.get("text", "")) for part in content if isinstance(part, dict))
+        total += MESSAGE_OVERHEAD_TOKENS
+    return max(1, total)
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 capacity 个
+
+    单次消耗超过 capacity 时，只要桶是满的就放行并记为欠账，之后的请求相应地多等一会。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """还需等待多少秒才能消耗 cost 个令牌"""
+        self._refill()
+        needed = min(cost, self.capacity) - self._tokens
+        return max(0.0, needed / self.rate)
+
+    def consume(self, cost: float):
+        self._refill()
+        self._tokens -= cost
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    cost: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class _ModelQueue:
+    """单个模型的限速桶与等待队列"""
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float], burst: Optional[float] = None):
+        # 桶容量默认为10秒的配额，允许短时突发
+        self.request_bucket = TokenBucket(rpm / 60, burst or max(1.0, rpm / 6)) if rpm else None
+        self.token_bucket = TokenBucket(tpm / 60, max(1.0, tpm / 6)) if tpm else None
+        self.waiters: List[_Waiter] = []
+        self.pump: Optional[asyncio.Task] = None
+        self.max_depth = 0
+
+    @property
+    def limited(self) -> bool:
+        return self.request_bucket is not None or self.token_bucket is not None
+
+    def wait_time(self, cost: int) -> float:
+        return max(
+            self.request_bucket.wait_time(1) if self.request_bucket else 0.0,
+            self.token_bucket.wait_time(cost) if self.token_bucket else 0.0,
+        )
+
+    def consume(self, cost: int):
+        if self.request_bucket:
+            self.request_bucket.consume(1)
+        if self.token_bucket:
+            self.token_bucket.consume(cost)
+
+
+class RequestScheduler:
+    """模型请求的准入控制
+
+    每个模型按配置的每分钟请求数（rpm）与每分钟token数（tpm）限速，
+    超出配额的请求按优先级排队：@回复最先，其次是回复决策、图片解读，最后是后台摘要。
+    排队过长时直接丢弃新到的低优先级请求（抛出 RequestShed）。
+    未配置限速的模型不排队。
+    """
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        shed_queue_depth: Optional[Dict[str, int]] = None
+    ):
+        self.rate_limits = rate_limits or {}
+        # 优先级 -> 队列长度达到多少时丢弃该优先级的新请求
+        self.shed_queue_depth = {
+            ROLE_PRIORITY[role]: depth for role, depth in (shed_queue_depth or {}).items()
+        }
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+        self.admitted = Counter()
+        self.shed = Counter()
+        self.wait_seconds: Dict[Priority, float] = defaultdict(float)
+
+    @classmethod
+    def from_settings(cls) -> "RequestScheduler":
+        return cls(BotSettings.MODEL_RATE_LIMITS, BotSettings.SCHEDULER_SHED_QUEUE_DEPTH)
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            limits = self.rate_limits.get(model, {})
+            queue = self._queues[model] = _ModelQueue(limits.get("rpm"), limits.get("tpm"), limits.get("burst"))
+        return queue
+
+    def queue_depth(self, model: Optional[str] = None) -> int:
+        """等待中的请求数，不指定模型时为所有模型之和"""
+        if model is not None:
+            queue = self._queues.get(model)
+            return len(queue.waiters) if queue else 0
+        return sum(len(queue.waiters) for queue in self._queues.values())
+
+    async def acquire(self, model: str, priority: Priority, cost: int = 1):
+        """等待 model 的配额，按 priority 排队；负载过高时抛出 RequestShed"""
+        queue = self._queue(model)
+        if not queue.limited:
+            self.admitted[priority] += 1
+            return
+
+        if not queue.waiters and queue.wait_time(cost) == 0:
+            queue.consume(cost)
+            self.admitted[priority] += 1
+            return
+
+        depth = len(queue.waiters)
+        shed_depth = self.shed_queue_depth.get(priority)
+        if shed_depth is not None and depth >= shed_depth:
+            self.shed[priority] += 1
+            raise RequestShed(f"模型 {model} 排队 {depth} 个请求，丢弃 {priority.name.lower()} 请求")
+
+        waiter = _Waiter(priority, next(self._seq), cost, asyncio.get_running_loop().create_future(), time.monotonic())
+        heapq.heappush(queue.waiters, waiter)
+        queue.max_depth = max(queue.max_depth, len(queue.waiters))
+        if queue.pump is None or queue.pump.done():
+            queue.pump = asyncio.create_task(self._pump(queue))
+        # 取消等待时future随之取消，_pump 会跳过它
+        await waiter.future
+        self.admitted[priority] += 1
+        self.wait_seconds[priority] += time.monotonic() - waiter.enqueued_at
+
+    async def _pump(self, queue: _ModelQueue):
+        """按优先级依次放行排队的请求"""
+        while queue.waiters:
+            waiter = queue.waiters[0]
+            if waiter.future.done():
+                heapq.heappop(queue.waiters)
+                continue
+            delay = queue.wait_time(waiter.cost)
+            if delay > 0:
+                # 等待期间到达的更高优先级请求会排到队首，醒来后重新检查
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(queue.waiters)
+            queue.consume(waiter.cost)
+            waiter.future.set_result(None)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "queue_depth": {model: len(queue.waiters) for model, queue in self._queues.items()},
+            "max_queue_depth": {model: queue.max_depth for model, queue in self._queues.items()},
+            "admitted": {priority.name.lower(): count for priority, count in self.admitted.items()},
+            "shed": {priority.name.lower(): count for priority, count in self.shed.items()},
+            "mean_wait_seconds": {
+                priority.name.lower(): self.wait_seconds[priority] / self.admitted[priority]
+                for priority in self.wait_seconds if self.admitted[priority]
+            },
+        }
@@ -0,0 +1,127 @@
+# core/summary_scheduler.py
+import asyncio
+import itertools
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ncatbot.utils import get_log
+from bot.core.metrics import metrics
+
+logger = get_log("SummaryScheduler")
+
+
+class SummaryScheduler:
+    """后台摘要调度器
+
+    需要生成摘要的对话进入优先队列，由固定数量的后台工作协程消费，
+    摘要生成不再阻塞回复流程。越久未摘要、消息越多的对话越先处理。
+    """
+
+    def __init__(self, memory_manager, ai_client, max_concurrency: int = 2):
+        self.memory_manager = memory_manager
+        self.ai_client = ai_client
+        self.max_concurrency = max_concurrency
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._counter = itertools.count()
+        # 已入队或正在生成摘要的对话键 -> 入队时间
+        self._queued: Dict[str, float] = {}
+        self._in_progress: Dict[str, float] = {}
+        self.completed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def _priority(self, key: str) -> float:
+        """计算优先级，数值越小越先处理"""
+        conv = self.memory_manager.conversations.get(key)
+        if conv is None:
+            return 0.0
+        staleness_minutes = (datetime.now() - conv.last_summarized).total_seconds() / 60
+        return -(staleness_minutes + conv.unsummarized_count)
+
+    def _ensure_workers(self):
+        """在事件循环中首次使用时启动工作协程"""
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def schedule(self, key: str) -> bool:
+        """将对话加入摘要队列，已在队列中或正在生成时忽略"""
+        if key in self._queued or key in self._in_progress:
+            return False
+        self._ensure_workers()
+        self._queued[key] = time.monotonic()
+        self._queue.put_nowait((self._priority(key), next(self._counter), key))
+        logger.debug(f"对话 {key} 已加入摘要队列，当前队列长度: {len(self._queued)}")
+        return True
+
+    def schedule_due(self) -> int:
+        """检查所有对话，将需要生成摘要的对话加入队列，返回新入队数量"""
+        scheduled = 0
+        for key, conv in list(self.memory_manager.conversations.items()):
+            reason = self.memory_manager.needs_summary(conv)
+            if reason and self.schedule(key):
+                logger.debug(f"对话 {key}: 需要生成摘要，原因: {reason}")
+                scheduled += 1
+        return scheduled
+
+    async def _worker(self):
+        while True:
+            _, _, key = await self._queue.get()
+            enqueued_at = self._queued.pop(key, time.monotonic())
+            started_at = time.monotonic()
+            self.last_lag = started_at - enqueued_at
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self._in_progress[key] = started_at
+            try:
+                # 对话可能在排队期间已过期被清理
+                if key not in self.memory_manager.conversations:
+                    continue
+                logger.info(f"开始生成对话 {key} 的摘要")
+                with metrics.stage("summary"):
+                    result = await self.memory_manager.generate_conversation_summary(key, self.ai_client)
+                if result:
+                    self.completed += 1
+                    logger.info(f"对话 {key} 摘要生成完成")
+                else:
+                    self.failed += 1
+                    logger.warning(f"对话 {key} 摘要生成失败")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"对话 {key} 摘要生成异常: {e}", exc_info=True)
+            finally:
+                self._in_progress.pop(key, None)
+                self._queue.task_done()
+
+    async def join(self):
+        """等待队列中的摘要全部生成完成"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    @property
+    def queue_depth(self) -> int:
+        """排队等待生成摘要的对话数量"""
+        return len(self._queued)
+
+    @property
+    def lag(self) -> float:
+        """队列中最早入队的对话已等待的秒数"""
+        if not self._queued:
+            return 0.0
+        return time.monotonic() - min(self._queued.values())
+
+    def stats(self) -> Dict[str, float]:
+        """获取调度器指标"""
+        return {
+            "queue_depth": self.queue_depth,
+            "in_progress": len(self._in_progress),
+            "lag_seconds": self.lag,
+            "last_lag_seconds": self.last_lag,
+            "max_lag_seconds": self.max_lag,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
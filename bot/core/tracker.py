@@ -1,6 +1,7 @@
 # core/tracker.py
 import random
-from typing import Union, Optional, Dict, List, Tuple
+from collections import deque
+from typing import Callable, Deque, Union, Optional, Dict, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime, timedelta
@@ -8,7 +9,11 @@ import re
 
 from ncatbot.core.event import BaseMessageEvent, GroupMessageEvent, PrivateMessageEvent
 from ncatbot.utils import get_log
-from bot.core.model import Message, ResponseMode
+from bot.core.model import Content, Message, ResponseMode, ROLE_TYPE
+from bot.core.keyword_matcher import KeywordMatcher, KeywordMatch
+from bot.core.coalescer import DecisionCoalescer
+from bot.core.metrics import metrics
+from bot.core.prefilter import DecisionPrefilter, DecisionRecorder, Verdict
 from bot.config.settings import BotSettings
 from bot.core.language_manager import language_manager
 
@@ -33,8 +38,64 @@ class UserInfo:
 class TargetTracker:
     """目标追踪与触发判断"""
     
-    def __init__(self):
+    def __init__(self, pending_messages: Optional[Callable[[str], int]] = None):
+        """pending_messages 返回对话信箱中排队的消息数，提供时启用AI决策的突发消息合并"""
         self.mode = ResponseMode(BotSettings.DEFAULT_RESPONSE_MODE)
+        self.keyword_matcher = KeywordMatcher.from_settings()
+        self.coalescer = None
+        if pending_messages and BotSettings.DECISION_COALESCE_WINDOW_MS > 0:
+            self.coalescer = DecisionCoalescer(BotSettings.DECISION_COALESCE_WINDOW_MS / 1000, pending_messages)
+        self.prefilter = None
+        if BotSettings.DECISION_PREFILTER_ENABLED:
+            self.prefilter = DecisionPrefilter(BotSettings.DECISION_PREFILTER_YES_THRESHOLD, BotSettings.DECISION_PREFILTER_NO_THRESHOLD)
+        self.decision_recorder = DecisionRecorder(BotSettings.DECISION_LOG_PATH) if BotSettings.DECISION_LOG_PATH else None
+        # 每个群最近的几条消息与机器人上次决定回复的时间，作为预筛特征
+        self._recent_texts: Dict[str, Deque[str]] = {}
+        self._last_reply_times: Dict[str, datetime] = {}
+        # 每个群机器人上次被@的时间，之后一段时间内不使用决策缓存
+        self._last_at_times: Dict[str, datetime] = {}
+    
+    def match_keyword(self, text: str) -> Optional[KeywordMatch]:
+        """返回消息中最先出现的触发关键词，没有时返回None"""
+        with metrics.stage("keyword_check"):
+            return self.keyword_matcher.find(text)
+    
+    def release_coalesced(self, group_id: str, ai_client=None) -> int:
+        """取出群中被合并、尚未决策的消息
+
+        提供 ai_client 时（随后会回复）把这些消息按顺序存入上下文，否则丢弃，
+        与决策为不回复的消息一样不进入记忆。返回取出的消息数。
+        """
+        if not self.coalescer:
+            return 0
+        key = f"group_{group_id}"
+        messages = self.coalescer.release(key)
+        if messages and ai_client is not None:
+            for message in messages:
+                ai_client.memory_manager.add_message(key, message)
+        if messages:
+            logger.debug(f"对话 {key} 取出 {len(messages)} 条被合并的消息")
+        return len(messages)
+    
+    def record_reply(self, group_id: str):
+        """记录机器人在群中决定回复的时间"""
+        self._last_reply_times[str(group_id)] = datetime.now()
+    
+    def _remember_text(self, group_id: str, text: str) -> List[str]:
+        """记录群消息，返回此前最近的几条消息"""
+        recent = self._recent_texts.setdefault(str(group_id), deque(maxlen=5))
+        previous = list(recent)
+        recent.append(text)
+        return previous
+    
+    def _recently_mentioned(self, group_id: Optional[str]) -> bool:
+        """机器人是否在决策缓存的有效期内被@过"""
+        last_at = self._last_at_times.get(str(group_id)) if group_id else None
+        return bool(last_at) and (datetime.now() - last_at).total_seconds() <= BotSettings.DECISION_RESULT_CACHE_TTL_SECONDS
+    
+    def _seconds_since_reply(self, group_id: str) -> Optional[float]:
+        last_reply = self._last_reply_times.get(str(group_id))
+        return (datetime.now() - last_reply).total_seconds() if last_reply else None
         
     def is_target(self, event: BaseMessageEvent) -> bool:
         """判断是否为目标对象"""
@@ -53,17 +114,25 @@ class TargetTracker:
         last_response_time: datetime = None,
         ai_client = None,
         user_info = None,
-        group_id = None
+        group_id = None,
+        keyword_match: Optional[KeywordMatch] = None
     ) -> bool:
-        """判断是否需要响应"""
+        """判断是否需要响应
+
+        keyword_match 为调用方已得到的关键词匹配结果，未提供时在此匹配一次。
+        """
         conversation_history = conversation_history or []
+        if keyword_match is None:
+            keyword_match = self.match_keyword(message_text)
+        contains_keyword = keyword_match is not None
         
         # 回复决策日志字典
         decision_log = {
             "mode": self.mode.value,
             "is_at": is_at,
             "is_private": is_private,
-            "contains_keyword": self._contains_keyword(message_text),
+            "contains_keyword": contains_keyword,
+            "keyword": keyword_match.keyword if keyword_match else None,
             "random_result": None,
             "context_related": None,
             "final_decision": False,
@@ -84,8 +153,6 @@ class TargetTracker:
             return False
         
         elif self.mode == ResponseMode.KEYWORD:
-            contains_keyword = self._contains_keyword(message_text)
-            decision_log["contains_keyword"] = contains_keyword
             decision_log["final_decision"] = contains_keyword
             logger.info(language_manager.get("info.reply_decision", decision=decision_log))
             return contains_keyword
@@ -96,7 +163,7 @@ class TargetTracker:
             return is_at
         
         elif self.mode == ResponseMode.AT_AND_KEYWORD:
-            decision = is_at or self._contains_keyword(message_text)
+            decision = is_at or contains_keyword
             decision_log["final_decision"] = decision
             logger.info(language_manager.get("info.reply_decision", decision=decision_log))
             return decision
@@ -118,8 +185,15 @@ class TargetTracker:
             return decision
         
         elif self.mode == ResponseMode.AI_DECIDE:
+            recent_texts = self._remember_text(group_id, message_text) if group_id else []
+            
             # 快速判断：如果被@或包含关键词，直接回复
-            if is_at or self._contains_keyword(message_text):
+            if is_at and group_id:
+                self._last_at_times[str(group_id)] = datetime.now()
+            if is_at or contains_keyword:
+                # 之前被合并的消息随这次回复一起进入上下文
+                if group_id:
+                    self.release_coalesced(group_id, ai_client)
                 decision_log["final_decision"] = True
                 logger.info(language_manager.get("info.reply_decision", decision=decision_log))
                 return True
@@ -130,13 +204,42 @@ class TargetTracker:
                 "value": random_value,
                 "threshold": BotSettings.RANDOM_THRESHOLD
             }
+            passed_random = random_value < BotSettings.RANDOM_THRESHOLD
+            
+            # 合并突发消息：窗口内有新消息时当前消息并入批次，由最后一条消息统一决策
+            batch = None
+            if self.coalescer and group_id and user_info:
+                batch = await self.coalescer.collect(f"group_{group_id}", self._format_message(message_text, user_info), passed_random)
+                if batch is None:
+                    decision_log["coalesced"] = True
+                    decision_log["final_decision"] = False
+                    logger.info(language_manager.get("info.reply_decision", decision=decision_log))
+                    return False
+                decision_log["batch_size"] = batch.size
+                passed_random = batch.eligible
+                conversation_history = [*conversation_history, *batch.messages]
             
             # 如果随机值大于阈值，直接返回不回复
-            if random_value >= BotSettings.RANDOM_THRESHOLD:
+            if not passed_random:
                 decision_log["final_decision"] = False
                 logger.info(language_manager.get("info.reply_decision", decision=decision_log))
                 return False
             
+            # 本地预筛：明显的消息直接得出结论，不请求决策模型。
+            # 合并了多条消息的批次交给决策模型，避免只凭最后一条消息丢弃整批
+            prefilter_result = None
+            seconds_since_reply = self._seconds_since_reply(group_id) if group_id else None
+            if self.prefilter and not (batch and batch.messages):
+                prefilter_result = self.prefilter.classify(message_text, recent_texts, seconds_since_reply)
+                decision_log["prefilter"] = {"verdict": prefilter_result.verdict.value, "score": round(prefilter_result.score, 3)}
+                if prefilter_result.verdict != Verdict.UNSURE and not BotSettings.DECISION_PREFILTER_SHADOW:
+                    decision = prefilter_result.verdict == Verdict.YES
+                    decision_log["final_decision"] = decision
+                    logger.info(language_manager.get("info.reply_decision", decision=decision_log))
+                    if self.decision_recorder:
+                        self.decision_recorder.record(group_id, message_text, recent_texts, seconds_since_reply, prefilter_result, None)
+                    return decision
+            
             # 检查是否有AI客户端，否则使用本地上下文判断
             if ai_client and user_info:
                 # 调用AI客户端判断是否应该回复
@@ -144,11 +247,18 @@ class TargetTracker:
                     message=message_text,
                     user_info=user_info,
                     group_id=group_id,
-                    conversation_history=conversation_history
+                    conversation_history=conversation_history,
+                    use_cache=not self._recently_mentioned(group_id)
                 )
+                if self.decision_recorder:
+                    self.decision_recorder.record(group_id, message_text, recent_texts, seconds_since_reply, prefilter_result, ai_decision)
                 decision_log["ai_decision"] = ai_decision
                 decision_log["final_decision"] = ai_decision
                 logger.info(language_manager.get("info.reply_decision", decision=decision_log))
+                if ai_decision and batch and batch.messages:
+                    # 回复整批消息：先把被合并的消息存入上下文
+                    for message in batch.messages:
+                        ai_client.memory_manager.add_message(f"group_{group_id}", message)
                 return ai_decision
             
             # 备用方案：本地上下文关联判断
@@ -209,32 +319,16 @@ class TargetTracker:
         
         return False
     
+    @staticmethod
+    def _format_message(message_text: str, user_info: dict) -> Message:
+        """按对话记忆的格式构建用户消息：昵称[时间]: 内容"""
+        display_name = user_info.get('card', '') or user_info.get('nickname', '未知用户')
+        current_time = datetime.now().strftime('%Y-%m-%d/%H:%M')
+        return Message(content=Content(f"{display_name}[{current_time}]: {message_text}"), role=ROLE_TYPE.USER)
+    
     def _contains_keyword(self, text: str) -> bool:
-        """检查是否包含关键词，支持正则表达式和模糊匹配"""
-        if not text or not BotSettings.TRIGGER_KEYWORDS:
-            return False
-            
-        text_lower = text.lower()
-        
-        for keyword in BotSettings.TRIGGER_KEYWORDS:
-            keyword_lower = keyword.lower()
-            
-            # 检查是否为正则表达式（以^开头或$结尾或包含特殊字符）
-            is_regex = any(special_char in keyword for special_char in ['^', '$', '*', '+', '?', '.', '(', ')', '[', ']', '{', '}', '|', '\\'])
-            
-            if BotSettings.ENABLE_REGEX_KEYWORDS and is_regex:
-                try:
-                    if re.search(keyword, text, re.IGNORECASE):
-                        return True
-                except re.error:
-                    # 如果正则表达式无效，回退到普通匹配
-                    if keyword_lower in text_lower:
-                        return True
-            else:
-                # 普通关键词匹配
-                if keyword_lower in text_lower:
-                    return True
-        return False
+        """检查是否包含关键词，支持正则表达式"""
+        return self.keyword_matcher.contains(text)
     
     def extract_user_info(self, event: BaseMessageEvent) -> UserInfo:
         """提取用户信息"""
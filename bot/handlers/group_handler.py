@@ -8,6 +8,7 @@ from ncatbot.core.event.message_segment import At, Text, Image, PlainText
 from ncatbot.utils import get_log
 
 from bot.core.ai_client import AIClient
+from bot.core.metrics import metrics
 from bot.core.model import Message, Content, ROLE_TYPE
 from bot.core.tracker import TargetTracker
 from bot.config.settings import BotSettings
@@ -30,6 +31,9 @@ class GroupMessageHandler:
         # 检查是否是目标群
         if not self.tracker.is_target(event):
             return False
+        conv_key = f"group_{event.group_id}"
+        metrics.inc_conversation("conversation_messages_total", conv_key)
+        parse_start = time.perf_counter()
         
         # 提取用户信息
         user_info = self.tracker.extract_user_info(event)
@@ -58,9 +62,12 @@ class GroupMessageHandler:
         else:
             # 兼容旧格式
             cleaned_message = self.tracker.clean_message(event.raw_message)
+        metrics.observe_stage("event_parse", time.perf_counter() - parse_start)
         
         # 跳过空消息（除非有图片）
         if not cleaned_message and not images:
+            # 不经过回复决策的消息不能留下等待它的合并批次
+            self.tracker.release_coalesced(user_info.group_id)
             logger.debug(language_manager.get("debug.message_ignored", mode="空消息"))
             return False
         
@@ -108,43 +115,41 @@ class GroupMessageHandler:
         
         # 处理图片消息
         if images:
+            self.tracker.release_coalesced(user_info.group_id)
             try:
                 # 检查是否启用了图片解读
                 if not BotSettings.ENABLE_IMAGE_INTERPRETATION:
                     logger.info(language_manager.get("info.image_interpretation_disabled", count=len(images)))
                     return True
                 
-                # 遍历每张图片
+                # 根据概率决定解读哪些图片
+                import random
+                selected_images = []
                 for i, img in enumerate(images, 1):
-                    # 根据概率决定是否解读该图片
-                    import random
                     if random.random() > BotSettings.IMAGE_INTERPRETATION_PROBABILITY:
                         logger.info(language_manager.get("info.image_skipped_by_probability", index=i))
                         continue
-                    
                     logger.info(language_manager.get("info.image_interpreting", index=i, url=img['url']))
-                    
-                    # 获取AI图片解读
-                    ai_response = await self.ai_client.get_image_response(
-                        image_url=img['url'],
-                        text_content=cleaned_message,
-                        user_info=user_info.__dict__
-                    )
-                    
+                    selected_images.append((i, img))
+                
+                # 并发获取AI图片解读，结果与图片顺序一致
+                ai_responses = await self.ai_client.interpret_images(
+                    [img for _, img in selected_images],
+                    text_content=cleaned_message,
+                    user_info=user_info.__dict__
+                )
+                
+                # 按原消息中的图片顺序存入上下文
+                for (i, img), ai_response in zip(selected_images, ai_responses):
                     # 格式化解读内容
                     formatted_content = f"[{user_info.display_name}发送了图片/表情]解读内容：{ai_response.content}"
                     
-                    # 构建系统消息，存入上下文
-                    
                     # 生成系统消息
                     system_message = Message(
                         content=Content(formatted_content),
                         role=ROLE_TYPE.SYSTEM
                     )
                     
-                    # 获取对话键名
-                    conv_key = f"group_{user_info.group_id}"
-                    
                     # 将消息添加到记忆管理器
                     self.ai_client.memory_manager.add_message(
                         key=conv_key,
@@ -161,21 +166,29 @@ class GroupMessageHandler:
                 return False
         
         # 判断是否需要回复文本消息
+        keyword_match = self.tracker.match_keyword(event.raw_message)
         should_reply = await self.tracker.should_respond(
             message_text=event.raw_message,
             is_at=is_at,
             is_private=False,
             ai_client=self.ai_client,
             user_info=user_info.__dict__,
-            group_id=user_info.group_id
+            group_id=user_info.group_id,
+            keyword_match=keyword_match
         )
         
-        logger.debug(language_manager.get("debug.reply_judgment", should_reply=should_reply, mode=self.tracker.mode.value, is_at=is_at, keyword=self.tracker._contains_keyword(cleaned_message)))
+        logger.debug(language_manager.get("debug.reply_judgment", should_reply=should_reply, mode=self.tracker.mode.value, is_at=is_at, keyword=keyword_match is not None))
         
         if not should_reply:
                 logger.debug(language_manager.get("debug.message_ignored", mode=self.tracker.mode.value))
                 return False
         
+        self.tracker.record_reply(user_info.group_id)
+        metrics.inc_conversation("conversation_replies_total", conv_key)
+        
+        if BotSettings.ENABLE_STREAMING:
+            return await self._send_streaming_reply(event, bot_api, cleaned_message, user_info, is_at)
+        
         try:
             # 记录API调用开始时间
             api_start_time = time.time()
@@ -199,22 +212,7 @@ class GroupMessageHandler:
                 return False
             
             # 清理AI回复中的@信息，避免重复@
-            cleaned_content = ai_response.content
-            
-            # 智能清理@信息 - 保留有意义的@，移除重复的@
-            # 1. 移除CQ码格式的@（避免格式冲突）
-            cleaned_content = re.sub(r'\[CQ:at,qq=\d+\]', '', cleaned_content)
-            
-            # 2. 移除@机器人自身的信息（避免自我@）
-            if self.bot_user_id:
-                cleaned_content = re.sub(fr'@{BotSettings.BOT_NAME}', '', cleaned_content, flags=re.IGNORECASE)
-            
-            # 3. 移除无意义的@（如@空、@连续空格等）
-            cleaned_content = re.sub(r'@\s+', '', cleaned_content)
-            
-            # 4. 移除重复的@（同一个用户被多次@）
-            # 这里保持简单，只移除明显的重复@
-            cleaned_content = re.sub(r'(@[\w\u4e00-\u9fa5]+)\s*\1', r'\1', cleaned_content, flags=re.IGNORECASE)
+            cleaned_content = self._clean_reply_text(ai_response.content)
             
             # 处理多行消息(\n)
             msgs = cleaned_content.splitlines()
@@ -232,49 +230,10 @@ class GroupMessageHandler:
             
             # 发送首行消息（智能@）
             if msgs:
-                # 构建首行消息
-                first_line_segments = []
-                
-                # 智能@策略
-                should_at = BotSettings.ENABLE_AT_REPLY and is_at
-                
-                # 调试信息
-                logger.debug(language_manager.get("debug.at_reply_strategy", should_at=should_at, enable_at=BotSettings.ENABLE_AT_REPLY, is_at=is_at))
-                
-                # 只有在被@的情况下才@回复用户，避免不必要的@
-                if should_at:
-                    first_line_segments.append(At(user_info.user_id))
-                    first_line_segments.append(Text(" "))
-                    logger.debug(language_manager.get("debug.at_user_added", qq=user_info.user_id))
-                
-                # 根据昵称映射表添加@
-                if BotSettings.ENABLE_NICKNAME_ADDRESS_INJECTION and BotSettings.NICKNAME_ADDRESS_MAPPING:
-                    first_msg = msgs[0]
-                    
-                    # 遍历昵称映射表，检查消息中是否包含映射的昵称
-                    for address, mapping in BotSettings.NICKNAME_ADDRESS_MAPPING.items():
-                        # 获取昵称列表
-                        nicknames = mapping.get("nicknames", []) if isinstance(mapping, dict) else []
-                        
-                        # 检查消息中是否包含该称呼或对应的任何昵称
-                        if address in first_msg or any(nickname in first_msg for nickname in nicknames):
-                            logger.debug(language_manager.get("debug.nickname_detected", address=address, nicknames=nicknames))
-                            
-                            # 如果映射中包含QQ号，添加@
-                            if isinstance(mapping, dict) and "qq" in mapping and mapping["qq"]:
-                                qq_number = mapping["qq"]
-                                # 避免@发送者两次
-                                if qq_number != str(user_info.user_id):
-                                    first_line_segments.append(At(qq_number))
-                                    first_line_segments.append(Text(" "))
-                                    logger.debug(language_manager.get("debug.nickname_mapped_at", qq=qq_number, address=address))
-                
-                first_line_segments.append(Text(msgs[0]))
-                
                 # 发送首行
-                first_line_msg = MessageArray(first_line_segments)
+                first_line_segments = self._build_first_line_segments(msgs[0], user_info, is_at)
                 await asyncio.sleep(delay_seconds)
-                await bot_api.post_group_array_msg(event.group_id, first_line_msg)
+                await self._send_bubble(bot_api, event.group_id, first_line_segments)
                 
                 # 发送后续行（不带@）
                 for i in range(1, len(msgs)):
@@ -286,10 +245,8 @@ class GroupMessageHandler:
                     # 添加延迟
                     await asyncio.sleep(msg_delay)
                     
-                    # 构建后续行消息（只包含文本）
-                    next_line_segments = [Text(msg)]
-                    next_line_msg = MessageArray(next_line_segments)
-                    await bot_api.post_group_array_msg(event.group_id, next_line_msg)
+                    # 发送后续行消息（只包含文本）
+                    await self._send_bubble(bot_api, event.group_id, [Text(msg)])
             
             # 记录记忆添加情况
             if ai_response.contains_memory_tag:
@@ -300,4 +257,113 @@ class GroupMessageHandler:
             
         except Exception as e:
             logger.error(language_manager.get("error.message_processing_failed", error=str(e)), exc_info=True)
-            return False
\ No newline at end of file
+            return False
+    
+    async def _send_streaming_reply(self, event: GroupMessageEvent, bot_api: BotAPI, cleaned_message: str, user_info, is_at: bool) -> bool:
+        """流式获取AI回复，每生成完整的一行就作为一个气泡发送"""
+        try:
+            stream = self.ai_client.stream_response(
+                message=cleaned_message,
+                user_info=user_info.__dict__,
+                group_id=user_info.group_id,
+                bot_api=bot_api
+            )
+            
+            sent_count = 0
+            last_sent_time = time.time()
+            async for line in stream:
+                msg = self._clean_reply_text(line).strip()
+                if not msg:
+                    continue
+                
+                # 打字延迟：等待该行生成的时间计入延迟，确保延迟不会为负数
+                msg_delay = BotSettings.BASE_DELAY_SECONDS + len(msg) * BotSettings.DELAY_PER_CHARACTER
+                await asyncio.sleep(max(BotSettings.MIN_DELAY_SECONDS, msg_delay - (time.time() - last_sent_time)))
+                
+                # 首行智能@，后续行只包含文本
+                segments = self._build_first_line_segments(msg, user_info, is_at) if sent_count == 0 else [Text(msg)]
+                await self._send_bubble(bot_api, event.group_id, segments)
+                last_sent_time = time.time()
+                sent_count += 1
+            
+            ai_response = stream.response
+            if not ai_response or not ai_response.content or ai_response.content.startswith("[错误]"):
+                logger.error(language_manager.get("error.ai_reply_failed", content=ai_response.content if ai_response else None))
+                return sent_count > 0
+            if ai_response.interrupted:
+                logger.error(f"流式回复中途失败，已发送的 {sent_count} 条消息已存入记忆")
+                return False
+            
+            # 记录记忆添加情况
+            if ai_response.contains_memory_tag:
+                logger.info(language_manager.get("info.memory_added", content=format_log_text(ai_response.memory_content, BotSettings.LOG_MAX_LENGTH))) # type: ignore
+            
+            logger.info(language_manager.get("info.message_sent", length=len(ai_response.content)))
+            return True
+            
+        except Exception as e:
+            logger.error(language_manager.get("error.message_processing_failed", error=str(e)), exc_info=True)
+            return False
+    
+    async def _send_bubble(self, bot_api: BotAPI, group_id, segments: list):
+        """发送一个消息气泡，记录发送耗时与对话的气泡数"""
+        with metrics.stage("send_bubble"):
+            await bot_api.post_group_array_msg(group_id, MessageArray(segments))
+        metrics.inc_conversation("conversation_bubbles_total", f"group_{group_id}")
+    
+    def _clean_reply_text(self, text: str) -> str:
+        """清理AI回复中的@信息，避免重复@"""
+        # 智能清理@信息 - 保留有意义的@，移除重复的@
+        # 1. 移除CQ码格式的@（避免格式冲突）
+        text = re.sub(r'\[CQ:at,qq=\d+\]', '', text)
+        
+        # 2. 移除@机器人自身的信息（避免自我@）
+        if self.bot_user_id:
+            text = re.sub(fr'@{BotSettings.BOT_NAME}', '', text, flags=re.IGNORECASE)
+        
+        # 3. 移除无意义的@（如@空、@连续空格等）
+        text = re.sub(r'@\s+', '', text)
+        
+        # 4. 移除重复的@（同一个用户被多次@）
+        # 这里保持简单，只移除明显的重复@
+        text = re.sub(r'(@[\w\u4e00-\u9fa5]+)\s*\1', r'\1', text, flags=re.IGNORECASE)
+        return text
+    
+    def _build_first_line_segments(self, first_msg: str, user_info, is_at: bool) -> list:
+        """构建首行消息段（智能@）"""
+        first_line_segments = []
+        
+        # 智能@策略
+        should_at = BotSettings.ENABLE_AT_REPLY and is_at
+        
+        # 调试信息
+        logger.debug(language_manager.get("debug.at_reply_strategy", should_at=should_at, enable_at=BotSettings.ENABLE_AT_REPLY, is_at=is_at))
+        
+        # 只有在被@的情况下才@回复用户，避免不必要的@
+        if should_at:
+            first_line_segments.append(At(user_info.user_id))
+            first_line_segments.append(Text(" "))
+            logger.debug(language_manager.get("debug.at_user_added", qq=user_info.user_id))
+        
+        # 根据昵称映射表添加@
+        if BotSettings.ENABLE_NICKNAME_ADDRESS_INJECTION and BotSettings.NICKNAME_ADDRESS_MAPPING:
+            # 遍历昵称映射表，检查消息中是否包含映射的昵称
+            for address, mapping in BotSettings.NICKNAME_ADDRESS_MAPPING.items():
+                # 获取昵称列表
+                nicknames = mapping.get("nicknames", []) if isinstance(mapping, dict) else []
+                
+                # 检查消息中是否包含该称呼或对应的任何昵称
+                if address in first_msg or any(nickname in first_msg for nickname in nicknames):
+                    logger.debug(language_manager.get("debug.nickname_detected", address=address, nicknames=nicknames))
+                    
+                    # 如果映射中包含QQ号，添加@
+                    if isinstance(mapping, dict) and "qq" in mapping and mapping["qq"]:
+                        qq_number = mapping["qq"]
+                        # 避免@发送者两次
+                        if qq_number != str(user_info.user_id):
+                            first_line_segments.append(At(qq_number))
+                            first_line_segments.append(Text(" "))
+                            logger.debug(language_manager.get("debug.nickname_mapped_at", qq=qq_number, address=address))
+        
+        first_line_segments.append(Text(first_msg))
+        return first_line_segments
@@ -8,6 +8,7 @@ from ncatbot.core.event.message_segment import Image, Text, PlainText
 from ncatbot.utils import get_log
 from bot.config.settings import BotSettings
 from bot.core.ai_client import AIClient
+from bot.core.metrics import metrics
 from bot.core.model import Message, Content, ROLE_TYPE
 from bot.core.tracker import TargetTracker
 from bot.utils.helpers import get_masked_display_name, format_log_text
@@ -28,6 +29,9 @@ class PrivateMessageHandler:
         # 检查是否是目标用户
         if not self.tracker.is_target(event):
             return False
+        conv_key = f"user_{event.user_id}"
+        metrics.inc_conversation("conversation_messages_total", conv_key)
+        parse_start = time.perf_counter()
         
         # 提取用户信息
         user_info = self.tracker.extract_user_info(event)
@@ -56,6 +60,7 @@ class PrivateMessageHandler:
         else:
             # 兼容旧格式
             cleaned_message = self.tracker.clean_message(event.raw_message, remove_at=False)
+        metrics.observe_stage("event_parse", time.perf_counter() - parse_start)
         
         # 跳过空消息（除非有图片）
         if not cleaned_message and not images:
@@ -77,36 +82,34 @@ class PrivateMessageHandler:
                     logger.info(language_manager.get("info.image_interpretation_disabled", count=len(images)))
                     return True
                 
+                # 根据概率决定解读哪些图片
+                import random
+                selected_images = []
                 for i, img in enumerate(images, 1):
-                    # 根据概率决定是否解读该图片
-                    import random
                     if random.random() > BotSettings.IMAGE_INTERPRETATION_PROBABILITY:
                         logger.info(language_manager.get("info.image_skipped_by_probability", index=i))
                         continue
-                    
                     logger.info(language_manager.get("info.image_interpreting", index=i, url=img['url']))
-                    
-                    # 获取AI图片解读
-                    ai_response = await self.ai_client.get_image_response(
-                        image_url=img['url'],
-                        text_content=cleaned_message,
-                        user_info=user_info.__dict__
-                    )
-                    
+                    selected_images.append((i, img))
+                
+                # 并发获取AI图片解读，结果与图片顺序一致
+                ai_responses = await self.ai_client.interpret_images(
+                    [img for _, img in selected_images],
+                    text_content=cleaned_message,
+                    user_info=user_info.__dict__
+                )
+                
+                # 按原消息中的图片顺序存入上下文
+                for (i, img), ai_response in zip(selected_images, ai_responses):
                     # 格式化解读内容
                     formatted_content = f"[{user_info.display_name}发送了图片/表情]解读内容：{ai_response.content}"
                     
-                    # 构建系统消息，存入上下文
-                    
                     # 生成系统消息
                     system_message = Message(
                         content=Content(formatted_content),
                         role=ROLE_TYPE.SYSTEM
                     )
                     
-                    # 获取对话键名
-                    conv_key = f"user_{user_info.user_id}"
-                    
                     # 将消息添加到记忆管理器
                     self.ai_client.memory_manager.add_message(
                         key=conv_key,
@@ -132,6 +135,10 @@ class PrivateMessageHandler:
             if not should_reply:
                 logger.debug(language_manager.get("debug.message_ignored", mode=self.tracker.mode.value))
                 return False
+            metrics.inc_conversation("conversation_replies_total", conv_key)
+            
+            if BotSettings.ENABLE_STREAMING:
+                return await self._send_streaming_reply(event, bot_api, cleaned_message, user_info)
             
             # 处理文本消息
             # 记录API调用开始时间
@@ -156,16 +163,7 @@ class PrivateMessageHandler:
                 return False
             
             # 清理AI回复中的@信息（私聊中通常不需要@）
-            cleaned_content = ai_response.content
-            
-            # 移除CQ码格式的@
-            cleaned_content = re.sub(r'\[CQ:at,qq=\d+\]', '', cleaned_content)
-            
-            # 移除@机器人自身的信息
-            cleaned_content = re.sub(fr'@{BotSettings.BOT_NAME}', '', cleaned_content, flags=re.IGNORECASE)
-            
-            # 移除无意义的@
-            cleaned_content = re.sub(r'@\s+', '', cleaned_content)
+            cleaned_content = self._clean_reply_text(ai_response.content)
             
             # 处理多行消息(\n)
             msgs = cleaned_content.splitlines()
@@ -174,7 +172,7 @@ class PrivateMessageHandler:
             
             # 发送消息，添加延迟
             for i, msg in enumerate(msgs):
-                await bot_api.send_private_text(event.user_id, msg)
+                await self._send_bubble(bot_api, event.user_id, msg)
                 
                 # 除了最后一行，其他行之间添加延迟
                 if i < len(msgs) - 1:
@@ -199,4 +197,62 @@ class PrivateMessageHandler:
             
         except Exception as e:
             logger.error(language_manager.get("error.message_processing_failed", error=str(e)), exc_info=True)
-            return False
\ No newline at end of file
+            return False
+    
+    async def _send_streaming_reply(self, event: PrivateMessageEvent, bot_api: BotAPI, cleaned_message: str, user_info) -> bool:
+        """流式获取AI回复，每生成完整的一行就作为一条消息发送"""
+        try:
+            stream = self.ai_client.stream_response(
+                message=cleaned_message,
+                user_info=user_info.__dict__,
+                group_id=None,  # 私聊无群ID
+                bot_api=bot_api
+            )
+            
+            sent_count = 0
+            last_sent_time = time.time()
+            async for line in stream:
+                msg = self._clean_reply_text(line).strip()
+                if not msg:
+                    continue
+                
+                # 打字延迟：等待该行生成的时间计入延迟，确保延迟不会为负数
+                msg_delay = BotSettings.BASE_DELAY_SECONDS + len(msg) * BotSettings.DELAY_PER_CHARACTER
+                await asyncio.sleep(max(BotSettings.MIN_DELAY_SECONDS, msg_delay - (time.time() - last_sent_time)))
+                
+                await self._send_bubble(bot_api, event.user_id, msg)
+                last_sent_time = time.time()
+                sent_count += 1
+                logger.info(language_manager.get("info.message_sent", length=len(msg)))
+            
+            ai_response = stream.response
+            if not ai_response or not ai_response.content or ai_response.content.startswith("[错误]"):
+                logger.error(language_manager.get("error.ai_response_failed", content=ai_response.content if ai_response else None))
+                return sent_count > 0
+            if ai_response.interrupted:
+                logger.error(f"流式回复中途失败，已发送的 {sent_count} 条消息已存入记忆")
+                return False
+            
+            return True
+            
+        except Exception as e:
+            logger.error(language_manager.get("error.message_processing_failed", error=str(e)), exc_info=True)
+            return False
+    
+    async def _send_bubble(self, bot_api: BotAPI, user_id, text: str):
+        """发送一条私聊消息，记录发送耗时与对话的气泡数"""
+        with metrics.stage("send_bubble"):
+            await bot_api.send_private_text(user_id, text)
+        metrics.inc_conversation("conversation_bubbles_total", f"user_{user_id}")
+    
+    def _clean_reply_text(self, text: str) -> str:
+        """清理AI回复中的@信息（私聊中通常不需要@）"""
+        # 移除CQ码格式的@
+        text = re.sub(r'\[CQ:at,qq=\d+\]', '', text)
+        
+        # 移除@机器人自身的信息
+        text = re.sub(fr'@{BotSettings.BOT_NAME}', '', text, flags=re.IGNORECASE)
+        
+        # 移除无意义的@
+        text = re.sub(r'@\s+', '', text)
+        return text